@@ -1,24 +1,101 @@
 #!/usr/bin/env python3
 import click
-from rich.console import Console
 import os
 import sys
-from src.simple_ebook_manager import SimpleEbookManager
+from src.lazy_imports import LazyConsole
 
-console = Console()
+# O gerenciador, a API e o rich são carregados apenas quando um comando é executado
+console = LazyConsole()
 
-@click.command()
+
+class DefaultCommandGroup(click.Group):
+    """Grupo de comandos que usa "format" quando nenhum subcomando é informado.
+
+    Mantém compatível a forma original de uso: simple_formatter.py documento.docx
+    """
+
+    def parse_args(self, ctx, args):
+        if args and args[0] not in self.commands and args[0] not in ('--help', '-h'):
+            args = ['format'] + args
+        return super().parse_args(ctx, args)
+
+
+def validate_output_formats(ctx, param, value):
+    """Aceita um formato, uma lista separada por vírgulas ou "all" """
+    formats = [fmt.strip().lower() for fmt in value.split(',') if fmt.strip()]
+    invalid = [fmt for fmt in formats if fmt not in ('epub', 'pdf', 'html', 'all')]
+    if not formats or invalid:
+        raise click.BadParameter(f"formato inválido: {', '.join(invalid) or value!r} "
+                                 "(use epub, pdf, html, uma lista separada por vírgulas ou all)")
+    return ','.join(formats)
+
+
+def common_options(function):
+    """Opções compartilhadas pelos comandos format e batch"""
+    options = [
+        click.option('--output-format', '-f',
+                     default='epub',
+                     callback=validate_output_formats,
+                     help='Formato de saída do ebook: epub, pdf, html, uma lista separada por vírgulas '
+                          '(ex.: epub,pdf) ou all'),
+        click.option('--headings-pattern', '-p',
+                     help='Padrão regex para identificar títulos de capítulos (opcional)'),
+        click.option('--no-cache', is_flag=True, default=False,
+                     help='Não usa o cache de respostas da IA (nem lê, nem grava)'),
+        click.option('--refresh-cache', is_flag=True, default=False,
+                     help='Ignora respostas em cache e as substitui por novas'),
+        click.option('--resume', is_flag=True, default=False,
+                     help='Retoma uma execução interrompida ou com falhas do mesmo documento, reenviando apenas '
+                          'as partes pendentes'),
+        click.option('--incremental', is_flag=True, default=False,
+                     help='Reformata apenas os trechos alterados desde a última execução deste documento '
+                          '(ou de outro arquivo com o mesmo título)'),
+        click.option('--consistency',
+                     type=click.Choice(['local', 'seams', 'llm', 'off']),
+                     default=None,
+                     help='Verificação final de consistência: local (padrão), seams (IA só nas fronteiras '
+                          'entre partes), llm (revisão do documento inteiro pela IA) ou off'),
+        click.option('--protocol',
+                     type=click.Choice(['markdown', 'edit_script']),
+                     default=None,
+                     help='Resposta da IA: markdown (texto formatado completo) ou edit_script '
+                          '(apenas instruções de formatação, aplicadas localmente)'),
+        click.option('--formatter',
+                     type=click.Choice(['ai', 'hybrid', 'local']),
+                     default=None,
+                     help='Formatador: ai (todo o texto pela IA, padrão), hybrid (regras locais para '
+                          'estruturas inequívocas e IA só nos trechos ambíguos) ou local (sem IA)'),
+        click.option('--stream/--no-stream', default=None,
+                     help='Lê, formata e grava o documento parte a parte, com memória limitada '
+                          '(padrão: automático acima de formatting.streaming_min_mb)'),
+    ]
+    for option in reversed(options):
+        function = option(function)
+    return function
+
+
+def ensure_api_key():
+    """Solicita a chave da API caso ela não esteja definida no ambiente"""
+    if not os.environ.get("ANTHROPIC_API_KEY"):
+        console.print("[bold yellow]⚠ ANTHROPIC_API_KEY não está definida no ambiente[/bold yellow]")
+        console.print("É necessário configurar a chave API para formatação com IA")
+        api_key = console.input("[bold]Forneça sua chave API agora: [/bold]")
+        os.environ["ANTHROPIC_API_KEY"] = api_key
+
+
+@click.group(cls=DefaultCommandGroup)
+def cli():
+    """Formatador de ebooks com IA."""
+
+
+@cli.command('format')
 @click.argument('filepath', type=click.Path(exists=True))
 @click.option('--title', '-t', help='Título do ebook (se não fornecido, será extraído do documento)')
 @click.option('--author', '-a', help='Autor do ebook')
-@click.option('--output-format', '-f', 
-              type=click.Choice(['epub', 'pdf', 'html']), 
-              default='epub', 
-              help='Formato de saída do ebook')
 @click.option('--output-file', '-o', help='Caminho para o arquivo de saída (opcional)')
-@click.option('--headings-pattern', '-p', 
-              help='Padrão regex para identificar títulos de capítulos (opcional)')
-def format_ebook(filepath, title, author, output_format, output_file, headings_pattern):
+@common_options
+def format_ebook(filepath, title, author, output_format, output_file, headings_pattern,
+                 no_cache, refresh_cache, resume, incremental, consistency, protocol, formatter, stream):
     """
     Converte um documento em um ebook formatado.
     
@@ -27,13 +104,6 @@ def format_ebook(filepath, title, author, output_format, output_file, headings_p
     
     FILEPATH: Caminho para o arquivo a ser convertido
     """
-    # Verifica se a chave API está configurada
-    if not os.environ.get("ANTHROPIC_API_KEY"):
-        console.print("[bold yellow]⚠ ANTHROPIC_API_KEY não está definida no ambiente[/bold yellow]")
-        console.print("É necessário configurar a chave API para formatação com IA")
-        api_key = console.input("[bold]Forneça sua chave API agora: [/bold]")
-        os.environ["ANTHROPIC_API_KEY"] = api_key
-
     console.print(f"\n[bold cyan]🔍 Verificando arquivo:[/bold cyan] {filepath}")
     
     # Verifica se o arquivo existe
@@ -42,9 +112,11 @@ def format_ebook(filepath, title, author, output_format, output_file, headings_p
         sys.exit(1)
         
     # Criando o gerenciador de ebook simplificado
+    from src.simple_ebook_manager import SimpleEbookManager
+    
     try:
         console.print("[cyan]ℹ Inicializando gerenciador de ebook...[/cyan]")
-        manager = SimpleEbookManager()
+        manager = SimpleEbookManager(use_cache=not no_cache, refresh_cache=refresh_cache)
     except Exception as e:
         console.print(f"[bold red]✘ Erro ao inicializar gerenciador:[/bold red] {str(e)}")
         sys.exit(1)
@@ -52,14 +124,25 @@ def format_ebook(filepath, title, author, output_format, output_file, headings_p
     # Executando o processo completo
     console.print("[bold cyan]📖 Iniciando processamento do documento...[/bold cyan]")
     
-    success = manager.process_document(
-        filepath=filepath,
-        title=title,
-        author=author,
-        output_format=output_format,
-        output_file=output_file,
-        headings_pattern=headings_pattern
-    )
+    try:
+        success = manager.process_document(
+            filepath=filepath,
+            title=title,
+            author=author,
+            output_format=output_format,
+            output_file=output_file,
+            headings_pattern=headings_pattern,
+            resume=resume,
+            incremental=incremental,
+            consistency_pass=consistency,
+            protocol=protocol,
+            formatter=formatter,
+            stream=stream
+        )
+    except KeyboardInterrupt:
+        console.print("\n[bold yellow]⚠ Processamento interrompido pelo usuário.[/bold yellow]")
+        console.print("Use --resume para continuar de onde parou.")
+        sys.exit(130)
     
     if success:
         console.print("\n[bold green]✅ Documento processado e ebook gerado com sucesso![/bold green]")
@@ -68,5 +151,74 @@ def format_ebook(filepath, title, author, output_format, output_file, headings_p
         console.print("Verifique os logs para mais detalhes.")
         sys.exit(1)
 
+
+@cli.command('batch')
+@click.argument('source')
+@click.option('--recursive', '-r', is_flag=True, default=False,
+              help='Inclui subdiretórios (ou ** no padrão glob)')
+@click.option('--workers', '-w', type=click.IntRange(min=1), default=2, show_default=True,
+              help='Documentos processados simultaneamente (um processo por documento)')
+@click.option('--max-in-flight', type=click.IntRange(min=1), default=None,
+              help='Máximo de requisições à API em andamento somando todos os processos '
+                   '(padrão: ai.concurrency)')
+@click.option('--summary', 'summary_path', type=click.Path(), default=None,
+              help='Arquivo CSV do resumo (padrão: logs/batch_<data>.csv)')
+@common_options
+def batch(source, recursive, workers, max_in_flight, summary_path, output_format, headings_pattern,
+          no_cache, refresh_cache, resume, incremental, consistency, protocol, formatter, stream):
+    """
+    Converte vários documentos em ebooks, em um pool de processos.
+    
+    SOURCE: Diretório ou padrão glob (ex.: "manuscritos/*.docx")
+    """
+    from src.batch import batch_needs_api, collect_documents, run_batch, default_summary_path
+    from src.simple_ebook_manager import read_config
+    
+    documents = collect_documents(source, recursive=recursive)
+    if not documents:
+        console.print(f"[bold red]✘ Nenhum documento DOCX, TXT ou MD encontrado em:[/bold red] {source}")
+        sys.exit(1)
+    
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    config, _ = read_config('config.yaml', base_dir)
+    config = config or {}
+    formatting = dict(config.get('formatting') or {})
+    if formatter:
+        formatting['formatter'] = formatter
+    if consistency:
+        formatting['consistency_pass'] = consistency
+    
+    # Os processos do lote não podem pedir a chave interativamente
+    if batch_needs_api(documents, {**config, 'formatting': formatting}, stream):
+        ensure_api_key()
+    
+    if max_in_flight is None:
+        max_in_flight = (config.get('ai') or {}).get('concurrency', 4)
+    
+    options = {
+        'output_format': output_format,
+        'headings_pattern': headings_pattern,
+        'resume': resume,
+        'incremental': incremental,
+        'consistency_pass': consistency,
+        'protocol': protocol,
+        'formatter': formatter,
+        'stream': stream,
+    }
+    try:
+        summary = run_batch(documents, options, workers=workers, max_in_flight=max_in_flight,
+                            use_cache=not no_cache, refresh_cache=refresh_cache,
+                            summary_path=summary_path or default_summary_path(base_dir))
+    except KeyboardInterrupt:
+        console.print("Use --resume para continuar os documentos interrompidos.")
+        sys.exit(130)
+    
+    failed = [row for row in summary if row['status'] != 'ok']
+    if failed:
+        console.print(f"\n[bold red]❌ {len(failed)} de {len(summary)} documentos não foram convertidos.[/bold red]")
+        sys.exit(1)
+    console.print(f"\n[bold green]✅ {len(summary)} documentos processados com sucesso![/bold green]")
+
+
 if __name__ == '__main__':
-    format_ebook()
\ No newline at end of file
+    cli()
\ No newline at end of file
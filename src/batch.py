@@ -0,0 +1,179 @@
+import csv
+import glob
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+from src.lazy_imports import LazyConsole
+
+console = LazyConsole()
+
+SUPPORTED_EXTENSIONS = ('.docx', '.txt', '.md')
+
+# Gerenciador criado uma única vez por processo do pool e reaproveitado entre documentos
+_worker_manager = None
+
+
+def collect_documents(source, recursive=False):
+    """Lista os documentos de um diretório ou de um padrão glob, em ordem alfabética"""
+    if os.path.isdir(source):
+        pattern = '**/*' if recursive else '*'
+        candidates = Path(source).glob(pattern)
+    else:
+        candidates = (Path(path) for path in glob.glob(source, recursive=recursive))
+    return sorted(str(path) for path in candidates
+                  if path.is_file() and path.suffix.lower() in SUPPORTED_EXTENSIONS)
+
+
+def batch_needs_api(documents, config, stream=None):
+    """Indica se algum documento do lote pode chamar a API com a configuração informada
+
+    Os processos do lote não podem pedir a chave interativamente, então ela é
+    exigida antes de iniciá-los, mas apenas quando o formatador, a verificação
+    de consistência ou o modo streaming (forçado ou pelo tamanho do arquivo)
+    usam a IA.
+    """
+    from src.simple_ebook_manager import needs_api
+    from src.streaming import file_size_mb
+
+    if stream is None:
+        threshold = ((config or {}).get('formatting') or {}).get('streaming_min_mb')
+        stream = bool(threshold) and any(file_size_mb(path) >= float(threshold) for path in documents)
+    return needs_api(config, stream)
+
+
+def _init_worker(request_limiter, use_cache, refresh_cache):
+    """Inicializa o processo do pool: um gerenciador e o limite global de requisições
+
+    Os arquivos temporários de cada documento já levam um hash do caminho de entrada;
+    os de saída também passam a levar, para que documentos com o mesmo título não se
+    sobrescrevam entre os processos.
+    """
+    global _worker_manager
+    from src.simple_ebook_manager import SimpleEbookManager
+
+    _worker_manager = SimpleEbookManager(use_cache=use_cache, refresh_cache=refresh_cache)
+    _worker_manager.request_limiter = request_limiter
+    _worker_manager.unique_output_names = True
+
+
+def _process_document(filepath, options):
+    """Processa um documento no processo do pool e retorna o resumo do resultado"""
+    manager = _worker_manager
+    usage_before = dict(manager.token_usage)
+    start_time = time.perf_counter()
+    status = 'ok'
+    error = ''
+    try:
+        if not manager.process_document(filepath, **options):
+            status = 'falhou'
+    except Exception as e:
+        status = 'erro'
+        error = str(e)
+
+    usage = {name: manager.token_usage[name] - usage_before.get(name, 0) for name in manager.token_usage}
+    return {
+        'document': filepath,
+        'status': status,
+        'duration': round(time.perf_counter() - start_time, 1),
+        'requests': usage['requests'],
+        'input_tokens': (usage['input_tokens'] + usage['cache_creation_input_tokens']
+                         + usage['cache_read_input_tokens']),
+        'cache_read_tokens': usage['cache_read_input_tokens'],
+        'output_tokens': usage['output_tokens'],
+        'error': error,
+    }
+
+
+def run_batch(documents, options, workers=2, max_in_flight=4, use_cache=True, refresh_cache=False,
+              summary_path=None):
+    """Processa vários documentos em um pool de processos
+
+    Args:
+        documents: caminhos dos documentos
+        options: argumentos repassados a SimpleEbookManager.process_document
+        workers: número de processos (documentos processados simultaneamente)
+        max_in_flight: máximo de requisições à API em andamento somando todos os processos
+        use_cache: usa o cache de respostas da IA
+        refresh_cache: substitui as respostas em cache
+        summary_path: arquivo CSV do resumo (opcional)
+
+    Returns:
+        list: resumo de cada documento, na ordem recebida
+    """
+    context = multiprocessing.get_context()
+    request_limiter = context.BoundedSemaphore(max_in_flight)
+    workers = max(1, min(workers, len(documents)))
+    console.print(f"[cyan]ℹ Processando {len(documents)} documentos com {workers} processos "
+                  f"(até {max_in_flight} requisições simultâneas)[/cyan]")
+
+    results = {}
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                   initargs=(request_limiter, use_cache, refresh_cache))
+    try:
+        futures = {executor.submit(_process_document, path, options): path for path in documents}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # O processo do pool terminou de forma inesperada
+                result = {'document': path, 'status': 'erro', 'duration': 0, 'requests': 0,
+                          'input_tokens': 0, 'cache_read_tokens': 0, 'output_tokens': 0, 'error': str(e)}
+            results[path] = result
+            console.print(f"[{'green' if result['status'] == 'ok' else 'red'}]"
+                          f"{'✓' if result['status'] == 'ok' else '✘'} [{len(results)}/{len(documents)}] "
+                          f"{path}[/]")
+    except KeyboardInterrupt:
+        executor.shutdown(wait=False, cancel_futures=True)
+        console.print("\n[bold yellow]⚠ Lote interrompido; documentos pendentes não foram processados[/bold yellow]")
+        raise
+    finally:
+        summary = [results.get(path) or {'document': path, 'status': 'pendente', 'duration': 0, 'requests': 0,
+                                         'input_tokens': 0, 'cache_read_tokens': 0, 'output_tokens': 0,
+                                         'error': ''}
+                   for path in documents]
+        print_summary(summary)
+        if summary_path:
+            write_summary(summary, summary_path)
+    executor.shutdown(wait=True)
+    return summary
+
+
+def print_summary(summary):
+    """Exibe a tabela de resumo do lote"""
+    from rich.table import Table
+
+    table = Table(title="Resumo do lote")
+    table.add_column("Documento")
+    table.add_column("Status")
+    table.add_column("Duração (s)", justify="right")
+    table.add_column("Requisições", justify="right")
+    table.add_column("Tokens de entrada", justify="right")
+    table.add_column("Lidos do cache", justify="right")
+    table.add_column("Tokens de saída", justify="right")
+    for row in summary:
+        color = 'green' if row['status'] == 'ok' else 'red'
+        table.add_row(os.path.basename(row['document']), f"[{color}]{row['status']}[/{color}]",
+                      f"{row['duration']:.1f}", str(row['requests']), str(row['input_tokens']),
+                      str(row['cache_read_tokens']), str(row['output_tokens']))
+    console.print(table)
+
+
+def write_summary(summary, summary_path):
+    """Grava o resumo do lote em CSV"""
+    summary_path = Path(summary_path)
+    summary_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(summary_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(summary[0].keys()) if summary else ['document'])
+        writer.writeheader()
+        writer.writerows(summary)
+    console.print(f"[blue]ℹ Resumo do lote salvo em:[/blue] {summary_path}")
+
+
+def default_summary_path(base_dir):
+    """Caminho padrão do resumo: logs/batch_<data>.csv"""
+    return Path(base_dir) / "logs" / f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
@@ -0,0 +1,131 @@
+import os
+import hashlib
+import threading
+from pathlib import Path
+
+
+class ChunkCache:
+    """Cache em disco, endereçado por conteúdo, para as respostas de formatação da IA.
+
+    Cada resposta é salva em um arquivo cujo nome é o hash SHA-256 dos parâmetros
+    da requisição. O tamanho total é limitado e as entradas menos usadas
+    recentemente são removidas primeiro (LRU, usando o mtime como data de acesso).
+    """
+
+    VERSION = "1"
+
+    def __init__(self, cache_dir, max_size_mb=500, enabled=True, refresh=False):
+        self.cache_dir = Path(cache_dir)
+        self.max_size_bytes = int(float(max_size_mb) * 1024 * 1024)
+        self.enabled = enabled
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._index = None  # caminho -> (mtime, tamanho), carregado sob demanda
+        self._total_size = 0
+
+        if self.enabled:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def make_key(cls, chunk_text, system_prompt, user_prompt, model, temperature):
+        """Gera a chave do cache a partir de tudo que influencia a resposta"""
+        digest = hashlib.sha256()
+        for part in (cls.VERSION, chunk_text, system_prompt, user_prompt, model, repr(temperature)):
+            data = str(part).encode('utf-8')
+            # O tamanho como prefixo evita colisões entre campos concatenados
+            digest.update(len(data).to_bytes(8, 'big'))
+            digest.update(data)
+        return digest.hexdigest()
+
+    def _path_for(self, key):
+        return self.cache_dir / key[:2] / f"{key}.md"
+
+    def get(self, key):
+        """Retorna a resposta armazenada ou None (conta acertos e falhas)"""
+        if not self.enabled:
+            return None
+
+        path = self._path_for(key)
+        with self._lock:
+            if self.refresh or not path.exists():
+                self.misses += 1
+                return None
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    value = f.read()
+                # Atualiza o mtime para marcar a entrada como usada recentemente
+                os.utime(path, None)
+                if self._index is not None and str(path) in self._index:
+                    self._index[str(path)] = (os.path.getmtime(path), self._index[str(path)][1])
+            except OSError:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Armazena uma resposta e aplica a política de remoção LRU"""
+        if not self.enabled or not value:
+            return
+
+        path = self._path_for(key)
+        with self._lock:
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(value)
+                os.replace(tmp_path, path)
+            except OSError:
+                return
+
+            self._load_index()
+            old_size = self._index.get(str(path), (0, 0))[1]
+            size = path.stat().st_size
+            self._index[str(path)] = (path.stat().st_mtime, size)
+            self._total_size += size - old_size
+            self.writes += 1
+            self._evict()
+
+    def _load_index(self):
+        """Carrega o índice de tamanhos na primeira escrita"""
+        if self._index is not None:
+            return
+        self._index = {}
+        self._total_size = 0
+        for path in self.cache_dir.glob('*/*.md'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            self._index[str(path)] = (stat.st_mtime, stat.st_size)
+            self._total_size += stat.st_size
+
+    def _evict(self):
+        """Remove as entradas usadas há mais tempo até respeitar o tamanho máximo"""
+        if self._total_size <= self.max_size_bytes:
+            return
+        for path, (mtime, size) in sorted(self._index.items(), key=lambda item: item[1][0]):
+            if self._total_size <= self.max_size_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            del self._index[path]
+            self._total_size -= size
+            self.evictions += 1
+
+    def stats(self):
+        """Retorna os contadores de uso do cache"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'writes': self.writes,
+                'evictions': self.evictions,
+            }
@@ -0,0 +1,236 @@
+import os
+import json
+import math
+import re
+import threading
+from pathlib import Path
+
+# Limite de tokens de saída por requisição de cada família de modelos.
+# A busca é feita por prefixo, do mais específico para o mais genérico.
+MODEL_OUTPUT_LIMITS = [
+    ('claude-3-7-sonnet', 64000),
+    ('claude-3-5-sonnet', 8192),
+    ('claude-3-5-haiku', 8192),
+    ('claude-3-opus', 4096),
+    ('claude-3-sonnet', 4096),
+    ('claude-3-haiku', 4096),
+    ('claude-opus-4', 32000),
+    ('claude-sonnet-4', 64000),
+    ('claude-haiku-4', 64000),
+]
+DEFAULT_OUTPUT_LIMIT = 4096
+
+# Tamanho mínimo do prefixo marcado para o cache de prompts da API
+PROMPT_CACHE_MIN_TOKENS = [
+    ('claude-3-haiku', 2048),
+    ('claude-3-5-haiku', 2048),
+    ('claude-haiku', 2048),
+]
+DEFAULT_PROMPT_CACHE_MIN_TOKENS = 1024
+
+_SENTENCE_END = re.compile(r'(?<=[.!?…])\s+')
+
+
+def model_output_limit(model):
+    """Retorna o máximo de tokens de saída aceito pelo modelo"""
+    for prefix, limit in MODEL_OUTPUT_LIMITS:
+        if model.startswith(prefix):
+            return limit
+    return DEFAULT_OUTPUT_LIMIT
+
+
+def prompt_cache_min_tokens(model):
+    """Retorna o menor prefixo (em tokens) que o modelo aceita no cache de prompts"""
+    for prefix, minimum in PROMPT_CACHE_MIN_TOKENS:
+        if model.startswith(prefix):
+            return minimum
+    return DEFAULT_PROMPT_CACHE_MIN_TOKENS
+
+
+class TokenEstimator:
+    """Estimador de tokens calibrado pelo uso real informado pela API.
+
+    Começa com uma razão de caracteres por token adequada para português e a
+    ajusta (média móvel) a cada resposta, persistindo a calibração por modelo
+    para as próximas execuções.
+    """
+
+    DEFAULT_CHARS_PER_TOKEN = 3.3
+    DEFAULT_OUTPUT_RATIO = 1.15  # tokens de saída por token do trecho original (Markdown acrescentado)
+    SMOOTHING = 0.2
+
+    def __init__(self, model, calibration_path=None, chars_per_token=None, output_ratio=None,
+                 default_output_ratio=None):
+        self.model = model
+        self.calibration_path = Path(calibration_path) if calibration_path else None
+        self.chars_per_token = chars_per_token or self.DEFAULT_CHARS_PER_TOKEN
+        self.output_ratio = output_ratio or default_output_ratio or self.DEFAULT_OUTPUT_RATIO
+        self._lock = threading.Lock()
+        # Valores explícitos da configuração têm prioridade sobre a calibração salva
+        if not chars_per_token and not output_ratio:
+            self._load()
+
+    def snapshot(self):
+        """Cópia congelada da calibração atual, que não lê nem grava o arquivo de calibração
+
+        Usada para dividir o documento: as fronteiras das partes não mudam quando
+        observe() recalibra o estimador no meio da execução.
+        """
+        return TokenEstimator(self.model, chars_per_token=self.chars_per_token, output_ratio=self.output_ratio)
+
+    def estimate(self, text):
+        """Número estimado de tokens de um texto"""
+        return int(math.ceil(len(text) / self.chars_per_token))
+
+    def estimate_output(self, text):
+        """Número estimado de tokens da versão formatada de um texto"""
+        return int(math.ceil(self.estimate(text) * self.output_ratio))
+
+    def observe(self, prompt_chars, input_tokens, source_tokens=None, output_tokens=None):
+        """Ajusta a calibração com os números reais de uma requisição"""
+        if not prompt_chars or not input_tokens:
+            return
+        with self._lock:
+            observed = prompt_chars / input_tokens
+            self.chars_per_token += self.SMOOTHING * (observed - self.chars_per_token)
+            if source_tokens and output_tokens:
+                ratio = output_tokens / source_tokens
+                self.output_ratio += self.SMOOTHING * (ratio - self.output_ratio)
+        self._save()
+
+    def _load(self):
+        if not self.calibration_path or not self.calibration_path.exists():
+            return
+        try:
+            with open(self.calibration_path, 'r', encoding='utf-8') as f:
+                data = json.load(f).get(self.model, {})
+        except (OSError, ValueError):
+            return
+        self.chars_per_token = data.get('chars_per_token', self.chars_per_token)
+        self.output_ratio = data.get('output_ratio', self.output_ratio)
+
+    def _save(self):
+        if not self.calibration_path:
+            return
+        with self._lock:
+            try:
+                data = {}
+                if self.calibration_path.exists():
+                    with open(self.calibration_path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                data[self.model] = {
+                    'chars_per_token': round(self.chars_per_token, 4),
+                    'output_ratio': round(self.output_ratio, 4),
+                }
+                self.calibration_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.calibration_path.with_name(
+                    f"{self.calibration_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=2)
+                os.replace(tmp_path, self.calibration_path)
+            except (OSError, ValueError):
+                pass
+
+
+class ChunkPlanner:
+    """Agrupa parágrafos em partes que cabem no orçamento real de saída do modelo"""
+
+    def __init__(self, estimator, output_budget, safety_margin=0.85, max_input_tokens=100000):
+        self.estimator = estimator
+        self.output_budget = output_budget
+        self.safety_margin = safety_margin
+        self.max_input_tokens = max_input_tokens
+
+    @property
+    def target_tokens(self):
+        """Tokens de entrada por parte para que a saída formatada caiba no orçamento"""
+        target = int(self.output_budget * self.safety_margin / self.estimator.output_ratio)
+        # Com saídas compactas (script de edição) o limite passa a ser a janela de contexto
+        return max(1, min(target, self.max_input_tokens))
+
+    def fits(self, text):
+        """Indica se o texto pode ser formatado em uma única requisição"""
+        return self.estimator.estimate(text) <= self.target_tokens
+
+    def iter_pack(self, paragraphs, is_heading=None, headings=None):
+        """Divide os parágrafos em partes, preferindo começar partes em títulos
+
+        Consome os parágrafos sob demanda e produz cada parte assim que ela fica
+        completa (usada no modo streaming).
+        """
+        for _, _, text in self.iter_spans(paragraphs, is_heading, headings):
+            yield text
+
+    def iter_spans(self, paragraphs, is_heading=None, headings=None):
+        """Partes com o intervalo de parágrafos que cada uma cobre
+
+        Produz tuplas (início, fim, texto), com os parágrafos paragraphs[início:fim].
+        Os pedaços de um parágrafo grande demais, quebrado em frases, vêm com
+        início == fim == índice do parágrafo.
+        """
+        target = self.target_tokens
+        current_chunk = []
+        current_flags = []
+        current_start = 0
+        current_size = 0
+
+        for index, para in enumerate(paragraphs):
+            para_size = self.estimator.estimate(para) + 1
+            if headings is not None:
+                heading = bool(headings[index])
+            else:
+                heading = bool(is_heading and is_heading(para))
+
+            # Parágrafos maiores que o orçamento inteiro são quebrados em frases
+            if para_size > target:
+                if current_chunk:
+                    yield current_start, index, '\n\n'.join(current_chunk)
+                    current_chunk, current_flags, current_size = [], [], 0
+                for piece in self._split_oversized(para, target):
+                    yield index, index, piece
+                current_start = index + 1
+                continue
+
+            # Um título com a parte já pela metade inicia uma nova parte
+            starts_section = heading and current_size > target // 2
+            if current_chunk and (starts_section or current_size + para_size > target):
+                # Evita deixar um título isolado no fim da parte anterior
+                carry, carry_flags = [], []
+                if not starts_section and len(current_chunk) > 1 and current_flags[-1]:
+                    carry, carry_flags = [current_chunk.pop()], [current_flags.pop()]
+                yield current_start, current_start + len(current_chunk), '\n\n'.join(current_chunk)
+                current_start += len(current_chunk)
+                current_chunk, current_flags = carry, carry_flags
+                current_size = sum(self.estimator.estimate(p) + 1 for p in carry)
+
+            if not current_chunk:
+                current_start = index
+            current_chunk.append(para)
+            current_flags.append(heading)
+            current_size += para_size
+
+        if current_chunk:
+            yield current_start, current_start + len(current_chunk), '\n\n'.join(current_chunk)
+
+    @staticmethod
+    def split_units(paragraph):
+        """Linhas ou frases de um parágrafo grande demais e o separador que as junta"""
+        if '\n' in paragraph:
+            return paragraph.split('\n'), '\n'
+        return _SENTENCE_END.split(paragraph), ' '
+
+    def _split_oversized(self, paragraph, target):
+        """Quebra um parágrafo muito longo em linhas ou frases que caibam no orçamento"""
+        pieces, separator = self.split_units(paragraph)
+        chunks = []
+        current, current_size = [], 0
+        for piece in pieces:
+            piece_size = self.estimator.estimate(piece) + 1
+            if current and current_size + piece_size > target:
+                chunks.append(separator.join(current))
+                current, current_size = [], 0
+            current.append(piece)
+            current_size += piece_size
+        if current:
+            chunks.append(separator.join(current))
+        return chunks
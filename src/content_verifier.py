@@ -0,0 +1,126 @@
+import re
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+# Marcador de item no início da linha (após # ou > opcionais): "1.", "2)", "-", "•"
+_LIST_MARKER = re.compile(r'^([ \t>]*(?:#{1,6}[ \t]+)?)(?:[-*+•–—]|\d{1,3}[.)])[ \t]+', re.MULTILINE)
+# Marcador de letra ("a)", "b)"), opcionalmente após um marcador de lista
+_LETTER_MARKER = re.compile(r'^([ \t>]*(?:[-*+•][ \t]+)?)[a-zA-Z]\)[ \t]+')
+
+
+def _strip_letter_markers(text):
+    """Remove os marcadores de letra apenas em sequências de itens (a), b), ...)
+
+    Uma linha isolada que começa com "e)" ou "a)" é prosa quebrada, e a letra é
+    uma palavra que a verificação precisa contar.
+    """
+    if ')' not in text:
+        return text
+    lines = text.split('\n')
+    items = [i for i, line in enumerate(lines) if line.strip()]
+    letters = {i for i in items if _LETTER_MARKER.match(lines[i])}
+    for position, i in enumerate(items):
+        if i not in letters:
+            continue
+        neighbours = items[max(position - 1, 0):position] + items[position + 1:position + 2]
+        if any(j in letters for j in neighbours):
+            lines[i] = _LETTER_MARKER.sub(r'\1', lines[i], count=1)
+    return '\n'.join(lines)
+
+
+def markdown_words(text):
+    """Sequência de palavras de um texto, ignorando a sintaxe Markdown e maiúsculas.
+
+    Marcadores como #, *, |, - e ``` não são palavras; o sublinhado é tratado
+    como separador para que _itálico_ e __negrito__ não alterem a contagem.
+    Os números e letras de itens de lista também são descartados, já que a
+    formatação pode renumerar ou criar listas ordenadas.
+    """
+    text = _LIST_MARKER.sub(r'\1', _strip_letter_markers(text))
+    return [word.casefold() for word in _WORD.findall(text.replace('_', ' '))]
+
+
+class VerificationResult:
+    """Resultado da comparação entre o texto de origem e o texto formatado"""
+
+    def __init__(self, source_words, output_words, insertions, deletions, samples):
+        self.source_words = source_words
+        self.output_words = output_words
+        self.insertions = insertions
+        self.deletions = deletions
+        self.samples = samples
+
+    @property
+    def difference_percent(self):
+        """Palavras inseridas ou removidas, em porcentagem do texto de origem"""
+        return (self.insertions + self.deletions) * 100.0 / max(self.source_words, 1)
+
+    def within(self, tolerance_percent):
+        return self.difference_percent <= tolerance_percent
+
+    def summary(self):
+        return (f"{self.deletions} palavras removidas, {self.insertions} inseridas "
+                f"({self.difference_percent:.1f}%)")
+
+
+def verify_content(source, formatted, window=32, anchor=3, max_samples=5, source_words=None):
+    """Alinha as palavras da origem e da saída formatada em tempo linear.
+
+    O alinhamento avança enquanto as palavras coincidem; numa divergência,
+    procura dentro de uma janela limitada o menor salto (remoção, inserção ou
+    substituição) após o qual `anchor` palavras voltam a coincidir. O custo é
+    O(n * window) no pior caso e praticamente O(n) em textos preservados.
+
+    Args:
+        source_words: palavras da origem já extraídas com markdown_words (opcional)
+
+    Returns:
+        VerificationResult: contagem de inserções, remoções e exemplos
+    """
+    src = source_words if source_words is not None else markdown_words(source)
+    out = markdown_words(formatted)
+    n, m = len(src), len(out)
+    i = j = 0
+    insertions = deletions = 0
+    samples = []
+
+    def anchored(a, b):
+        # Confirma a ressincronização com algumas palavras seguintes
+        for k in range(anchor):
+            if a + k >= n or b + k >= m:
+                return a + k >= n and b + k >= m
+            if src[a + k] != out[b + k]:
+                return False
+        return True
+
+    while i < n and j < m:
+        if src[i] == out[j]:
+            i += 1
+            j += 1
+            continue
+
+        step = None
+        for k in range(1, window + 1):
+            if i + k <= n and anchored(i + k, j):
+                step = (k, 0)
+            elif j + k <= m and anchored(i, j + k):
+                step = (0, k)
+            elif i + k <= n and j + k <= m and anchored(i + k, j + k):
+                step = (k, k)
+            if step:
+                break
+        if step is None:
+            step = (1, 1)
+
+        removed, added = step
+        if len(samples) < max_samples:
+            samples.append((' '.join(src[i:i + removed]), ' '.join(out[j:j + added])))
+        deletions += removed
+        insertions += added
+        i += removed
+        j += added
+
+    deletions += n - i
+    insertions += m - j
+    if (n - i or m - j) and len(samples) < max_samples:
+        samples.append((' '.join(src[i:i + 10]), ' '.join(out[j:j + 10])))
+    return VerificationResult(n, m, insertions, deletions, samples)
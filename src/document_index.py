@@ -0,0 +1,160 @@
+import re
+from array import array
+
+from src.local_formatter import DEFAULT_HEADING_PATTERNS
+
+# Nível de título de cada padrão comum; # fica reservado ao título do documento
+_DEFAULT_LEVELS = {'part': 2, 'chapter': 3, 'numbered': 4, 'roman': 4}
+_CUSTOM_LEVEL = 2
+_MARKDOWN_HEADING = re.compile(r'^(#{1,6})\s+\S')
+
+
+def _paragraph_spans(text):
+    """Início e fim de cada parágrafo no texto"""
+    if '\n\n' in text:
+        # Parágrafos separados por linha em branco
+        start = 0
+        while True:
+            end = text.find('\n\n', start)
+            if end < 0:
+                yield start, len(text)
+                return
+            yield start, end
+            start = end + 2
+
+    # Sem paragrafação clara: linhas consecutivas formam um parágrafo e linhas
+    # vazias ou quase vazias o encerram
+    start = None
+    position = 0
+    length = len(text)
+    while position <= length:
+        end = text.find('\n', position)
+        if end < 0:
+            end = length
+        if end - position >= 3 and len(text[position:end].strip()) >= 3:
+            if start is None:
+                start = position
+            last_end = end
+        elif start is not None:
+            yield start, last_end
+            start = None
+        position = end + 1
+    if start is not None:
+        yield start, last_end
+
+
+class DocumentIndex:
+    """Índice do documento construído em uma única passada após a extração.
+
+    Guarda, em arrays compactos, o início e o fim de cada parágrafo no texto,
+    o número de palavras de cada um, o nível de título (0 = não é título) e a
+    soma acumulada de palavras, para que divisão em partes, prompts e
+    progresso não precisem percorrer o texto de novo.
+    """
+
+    def __init__(self, text, headings_pattern=None):
+        self.text = text
+        self.headings_pattern = headings_pattern
+        self.starts = array('Q')
+        self.ends = array('Q')
+        self.words = array('I')
+        self.levels = array('B')
+        self.prefix_words = array('Q', [0])
+        # Texto dos títulos vindos de outro índice (derived), por parágrafo
+        self._titles = {}
+
+        custom = re.compile(headings_pattern) if headings_pattern else None
+        defaults = [(re.compile(pattern), _DEFAULT_LEVELS[kind]) for kind, pattern in DEFAULT_HEADING_PATTERNS.items()]
+        total = 0
+        for start, end in _paragraph_spans(text):
+            paragraph = text[start:end]
+            count = len(paragraph.split())
+            total += count
+            self.starts.append(start)
+            self.ends.append(end)
+            self.words.append(count)
+            self.prefix_words.append(total)
+            self.levels.append(self._heading_level(paragraph, custom, defaults))
+
+    @staticmethod
+    def _heading_level(paragraph, custom, defaults):
+        match = _MARKDOWN_HEADING.match(paragraph)
+        if match:
+            return len(match.group(1))
+        if custom is not None:
+            return _CUSTOM_LEVEL if custom.search(paragraph) else 0
+        for pattern, level in defaults:
+            if pattern.search(paragraph):
+                return level
+        return 0
+
+    def __len__(self):
+        return len(self.starts)
+
+    def paragraph(self, index):
+        return self.text[self.starts[index]:self.ends[index]]
+
+    def paragraphs(self, start=0, end=None):
+        """Lista dos parágrafos paragraphs[start:end]"""
+        end = len(self) if end is None else end
+        text, starts, ends = self.text, self.starts, self.ends
+        return [text[starts[i]:ends[i]] for i in range(start, end)]
+
+    @property
+    def word_count(self):
+        return self.prefix_words[-1]
+
+    def words_between(self, start, end):
+        """Palavras dos parágrafos [start, end), em tempo constante"""
+        return self.prefix_words[end] - self.prefix_words[start]
+
+    def is_heading(self, index):
+        return self.levels[index] > 0
+
+    def heading_flags(self):
+        """Uma marcação por parágrafo, no formato aceito por ChunkPlanner.iter_spans(headings=...)"""
+        return self.levels
+
+    def set_headings(self, levels):
+        """Substitui os títulos por padrão pelos informados (índice -> nível);
+        títulos já em Markdown são mantidos"""
+        for i in range(len(self)):
+            if not (self.levels[i] and _MARKDOWN_HEADING.match(self.paragraph(i))):
+                self.levels[i] = levels.get(i, 0)
+
+    def heading_count(self):
+        return sum(1 for level in self.levels if level)
+
+    def heading_text(self, index):
+        """Texto de um título, sem as marcas # de Markdown"""
+        if index in self._titles:
+            return self._titles[index]
+        return self.paragraph(index).strip().lstrip('#').strip()
+
+    def derived(self, text, sources):
+        """Índice de um texto derivado deste, com os títulos daqui
+
+        Args:
+            text: texto derivado (ex.: o texto com marcadores enviado à IA no formatador hybrid)
+            sources: índice, neste documento, do parágrafo de origem de cada parágrafo do texto
+
+        Returns:
+            DocumentIndex ou None se os parágrafos do texto não correspondem a `sources`
+        """
+        index = DocumentIndex(text)
+        if len(index) != len(sources):
+            return None
+        for i, source in enumerate(sources):
+            index.levels[i] = self.levels[source]
+            if self.levels[source]:
+                index._titles[i] = self.heading_text(source)
+        return index
+
+    def outline_levels(self):
+        """Nível Markdown de cada nível de título usado, sem saltos (ex.: 3, 4 -> 2, 3)
+
+        # fica reservado ao título do documento, a menos que o próprio documento o use.
+        """
+        used = sorted(set(self.levels) - {0})
+        first = 1 if used and used[0] == 1 else 2
+        return {level: min(first + rank, 6) for rank, level in enumerate(used)}
@@ -0,0 +1,244 @@
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+# Leitor de DOCX em streaming: percorre word/document.xml com iterparse, um
+# parágrafo ou tabela por vez, e descarta cada elemento depois de convertido.
+# Estilos de título, listas (numbering.xml) e tabelas viram Markdown
+# diretamente; o restante sai como parágrafos de texto simples.
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+_P = f'{W}p'
+_T = f'{W}t'
+_TAB = f'{W}tab'
+_BREAKS = (f'{W}br', f'{W}cr')
+_HYPHEN = f'{W}noBreakHyphen'
+_TBL = f'{W}tbl'
+_BODY = f'{W}body'
+
+_HEADING_NAME = re.compile(r'^(?:heading|título|titulo|ttulo)\s*(\d)$', re.IGNORECASE)
+_UNORDERED_FORMATS = ('bullet', 'none', '')
+
+
+def _attr(element, name):
+    return element.get(f'{W}{name}') if element is not None else None
+
+
+class DocxParagraph:
+    """Parágrafo lido do DOCX, com os metadados de estilo, lista e tabela"""
+
+    __slots__ = ('text', 'style', 'heading_level', 'list_level', 'num_id', 'ordered')
+
+    def __init__(self, text, style=None, heading_level=None, list_level=None, num_id=None, ordered=False):
+        self.text = text
+        self.style = style
+        self.heading_level = heading_level
+        self.list_level = list_level
+        self.num_id = num_id
+        self.ordered = ordered
+
+    def to_markdown(self):
+        text = self.text.strip()
+        if self.heading_level is not None and text:
+            # O nível 1 do Markdown fica reservado ao título do documento (estilo Title)
+            return f"{'#' * min(self.heading_level + 1, 6)} {' '.join(text.split())}"
+        if self.list_level is not None:
+            marker = '1.' if self.ordered else '-'
+            return f"{'    ' * self.list_level}{marker} {' '.join(text.split())}"
+        return text
+
+
+class DocxTable:
+    """Tabela lida do DOCX, como lista de linhas de células de texto"""
+
+    __slots__ = ('rows',)
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def to_markdown(self):
+        rows = [row for row in self.rows if any(cell for cell in row)]
+        if not rows:
+            return ''
+        if len(rows) == 1 or max(len(row) for row in rows) == 1:
+            # Tabelas de uma célula costumam ser apenas caixas de texto
+            return '\n\n'.join(cell for row in rows for cell in row if cell)
+        columns = max(len(row) for row in rows)
+        lines = []
+        for i, row in enumerate(rows):
+            cells = [cell.replace('|', '\\|').replace('\n', ' ') for cell in row] + [''] * (columns - len(row))
+            lines.append('| ' + ' | '.join(cells) + ' |')
+            if i == 0:
+                lines.append('| ' + ' | '.join(['---'] * columns) + ' |')
+        return '\n'.join(lines)
+
+
+class DocxReader:
+    """Lê um DOCX em streaming, mantendo a memória estável mesmo em documentos muito longos"""
+
+    def __init__(self, path):
+        self.path = path
+        self.stats = {'paragraphs': 0, 'headings': 0, 'list_items': 0, 'tables': 0}
+        self._styles = {}
+        self._numbering = {}
+
+    def _load_styles(self, archive):
+        """Nível de título de cada estilo (styles.xml é pequeno e lido inteiro)"""
+        try:
+            root = ET.fromstring(archive.read('word/styles.xml'))
+        except KeyError:
+            return
+        for style in root.iter(f'{W}style'):
+            style_id = _attr(style, 'styleId')
+            name = _attr(style.find(f'{W}name'), 'val') or ''
+            level = None
+            if name.lower() == 'title':
+                level = 0
+            else:
+                match = _HEADING_NAME.match(name) or _HEADING_NAME.match(style_id or '')
+                if match:
+                    level = int(match.group(1))
+                else:
+                    outline = style.find(f'{W}pPr/{W}outlineLvl')
+                    if outline is not None and (_attr(outline, 'val') or '').isdigit() and int(_attr(outline, 'val')) < 9:
+                        level = int(_attr(outline, 'val')) + 1
+            self._styles[style_id] = (name, level)
+
+    def _load_numbering(self, archive):
+        """Formato (numerado ou com marcadores) de cada nível de cada lista"""
+        try:
+            root = ET.fromstring(archive.read('word/numbering.xml'))
+        except KeyError:
+            return
+        abstract = {}
+        for definition in root.iter(f'{W}abstractNum'):
+            levels = {}
+            for level in definition.iter(f'{W}lvl'):
+                fmt = _attr(level.find(f'{W}numFmt'), 'val') or ''
+                levels[int(_attr(level, 'ilvl') or 0)] = fmt not in _UNORDERED_FORMATS
+            abstract[_attr(definition, 'abstractNumId')] = levels
+        for num in root.iter(f'{W}num'):
+            abstract_id = _attr(num.find(f'{W}abstractNumId'), 'val')
+            self._numbering[_attr(num, 'numId')] = abstract.get(abstract_id, {})
+
+    @staticmethod
+    def _text(paragraph):
+        parts = []
+        for node in paragraph.iter():
+            tag = node.tag
+            if tag == _T:
+                parts.append(node.text or '')
+            elif tag == _TAB:
+                parts.append('\t')
+            elif tag in _BREAKS:
+                parts.append('\n')
+            elif tag == _HYPHEN:
+                parts.append('-')
+        return ''.join(parts)
+
+    def _paragraph(self, element):
+        properties = element.find(f'{W}pPr')
+        style_id = _attr(properties.find(f'{W}pStyle'), 'val') if properties is not None else None
+        style_name, heading_level = self._styles.get(style_id, (style_id, None))
+        if properties is not None:
+            outline = properties.find(f'{W}outlineLvl')
+            if heading_level is None and outline is not None and (_attr(outline, 'val') or '').isdigit():
+                level = int(_attr(outline, 'val'))
+                heading_level = level + 1 if level < 9 else None
+
+        list_level = num_id = None
+        ordered = False
+        num_properties = properties.find(f'{W}numPr') if properties is not None else None
+        if num_properties is not None:
+            num_id = _attr(num_properties.find(f'{W}numId'), 'val')
+            if num_id and num_id != '0':
+                list_level = int(_attr(num_properties.find(f'{W}ilvl'), 'val') or 0)
+                ordered = self._numbering.get(num_id, {}).get(list_level, False)
+        if heading_level is not None and list_level is not None:
+            # Títulos numerados automaticamente continuam sendo títulos
+            list_level = None
+        return DocxParagraph(self._text(element), style_name, heading_level, list_level, num_id, ordered)
+
+    def _table(self, element):
+        rows = []
+        for row in element.iter(f'{W}tr'):
+            cells = []
+            for cell in row.findall(f'{W}tc'):
+                texts = [self._text(p).strip() for p in cell.iter(_P)]
+                cells.append(' '.join(text for text in texts if text))
+            rows.append(cells)
+        return DocxTable(rows)
+
+    def items(self):
+        """Percorre o documento, produzindo DocxParagraph e DocxTable na ordem do texto"""
+        with zipfile.ZipFile(self.path) as archive:
+            self._load_styles(archive)
+            self._load_numbering(archive)
+            with archive.open('word/document.xml') as stream:
+                body = None
+                table_depth = 0
+                for event, element in ET.iterparse(stream, events=('start', 'end')):
+                    tag = element.tag
+                    if event == 'start':
+                        if tag == _BODY:
+                            body = element
+                        elif tag == _TBL:
+                            table_depth += 1
+                        continue
+
+                    if tag == _TBL:
+                        table_depth -= 1
+                        if table_depth == 0:
+                            self.stats['tables'] += 1
+                            yield self._table(element)
+                            element.clear()
+                    elif tag == _P and table_depth == 0:
+                        paragraph = self._paragraph(element)
+                        self.stats['paragraphs'] += 1
+                        if paragraph.heading_level is not None:
+                            self.stats['headings'] += 1
+                        elif paragraph.list_level is not None:
+                            self.stats['list_items'] += 1
+                        yield paragraph
+                        element.clear()
+                    else:
+                        continue
+
+                    # Elementos já convertidos são descartados para manter a memória estável
+                    if body is not None and table_depth == 0:
+                        body.clear()
+
+    def markdown_blocks(self):
+        """Blocos de Markdown do documento; itens de uma mesma lista saem em um único bloco"""
+        list_items = []
+        list_id = None
+        for item in self.items():
+            markdown = item.to_markdown()
+            if isinstance(item, DocxParagraph) and item.list_level is not None and markdown.strip():
+                # Uma nova lista (outra numeração no primeiro nível) inicia outro bloco
+                if list_items and item.list_level == 0 and item.num_id != list_id:
+                    yield '\n'.join(list_items)
+                    list_items = []
+                if item.list_level == 0:
+                    list_id = item.num_id
+                list_items.append(markdown)
+                continue
+            if list_items:
+                yield '\n'.join(list_items)
+                list_items = []
+            if markdown.strip():
+                yield markdown
+        if list_items:
+            yield '\n'.join(list_items)
+
+
+def read_docx_markdown(path):
+    """Converte um DOCX para texto com estrutura Markdown
+
+    Returns:
+        tuple: (texto, estatísticas de parágrafos, títulos, itens de lista e tabelas)
+    """
+    reader = DocxReader(path)
+    text = '\n\n'.join(reader.markdown_blocks())
+    return text, reader.stats
@@ -0,0 +1,176 @@
+import re
+
+# Protocolo de formatação por "script de edição": a IA recebe o texto com as
+# linhas numeradas e devolve apenas instruções compactas, uma por linha:
+#
+#   H <linha> <nível>          título (nível 1 a 6)
+#   UL <início>-<fim>          lista com marcadores (cada linha não vazia é um item)
+#   OL <início>-<fim>          lista numerada
+#   CODE <início>-<fim> [ling] bloco de código
+#   TABLE <início>-<fim>       tabela (células separadas por tabulação, | ou 2+ espaços)
+#   QUOTE <início>-<fim>       citação
+#   B <linha> <trecho exato>   negrito em um trecho da linha
+#   I <linha> <trecho exato>   itálico em um trecho da linha
+#
+# Linhas não mencionadas são mantidas como parágrafos. O Markdown é montado
+# localmente a partir do texto original, então nenhuma palavra pode ser perdida.
+
+EDIT_SCRIPT_INSTRUCTIONS = """
+H <linha> <nível>          título de nível 1 a 6 (# a ######)
+UL <início>-<fim>          lista com marcadores; cada linha não vazia do intervalo é um item
+OL <início>-<fim>          lista numerada; cada linha não vazia do intervalo é um item
+CODE <início>-<fim> [ling] bloco de código (opcionalmente com a linguagem)
+TABLE <início>-<fim>       tabela; a primeira linha do intervalo é o cabeçalho
+QUOTE <início>-<fim>       citação
+B <linha> <trecho exato>   negrito em um trecho copiado exatamente da linha
+I <linha> <trecho exato>   itálico em um trecho copiado exatamente da linha
+"""
+
+_COMMAND = re.compile(r'^\s*(H|UL|OL|CODE|TABLE|QUOTE|B|I)\s+(\d+)(?:\s*-\s*(\d+))?(?:\s+(.*?))?\s*$',
+                      re.IGNORECASE)
+_BULLET_PREFIX = re.compile(r'^\s*[-*+•●▪‣·–]\s+')
+_NUMBER_PREFIX = re.compile(r'^\s*(\d+)[.)]\s+')
+_HEADING_PREFIX = re.compile(r'^\s*#{1,6}\s+')
+_TABLE_SPACES = re.compile(r'\s{2,}')
+
+
+def number_lines(content):
+    """Texto com as linhas numeradas (1-based) para envio à IA"""
+    lines = content.split('\n')
+    width = len(str(len(lines)))
+    return '\n'.join(f"{i:>{width}}| {line}" for i, line in enumerate(lines, 1))
+
+
+def parse_edit_script(script, line_count):
+    """Interpreta o script de edição, descartando instruções inválidas
+
+    Returns:
+        tuple: (títulos {linha: nível}, blocos [(tipo, início, fim, arg)],
+                ênfases {linha: [(marca, trecho)]}, número de instruções ignoradas)
+    """
+    headings = {}
+    blocks = []
+    emphasis = {}
+    ignored = 0
+    taken = [False] * (line_count + 1)
+
+    for raw in script.split('\n'):
+        if not raw.strip() or raw.strip().startswith('```'):
+            continue
+        match = _COMMAND.match(raw)
+        if not match:
+            ignored += 1
+            continue
+        command = match.group(1).upper()
+        start = int(match.group(2))
+        end = int(match.group(3) or start)
+        arg = match.group(4) or ''
+        if not 1 <= start <= end <= line_count:
+            ignored += 1
+            continue
+
+        if command == 'H':
+            try:
+                level = max(1, min(6, int(arg.split()[0])))
+            except (ValueError, IndexError):
+                ignored += 1
+                continue
+            headings[start] = level
+        elif command in ('B', 'I'):
+            if arg:
+                emphasis.setdefault(start, []).append(('**' if command == 'B' else '*', arg.strip('"\'')))
+        else:
+            # Blocos não podem se sobrepor
+            if any(taken[start:end + 1]):
+                ignored += 1
+                continue
+            for i in range(start, end + 1):
+                taken[i] = True
+            blocks.append((command, start, end, arg))
+
+    return headings, sorted(blocks, key=lambda block: block[1]), emphasis, ignored
+
+
+def _apply_emphasis(text, marks):
+    for mark, fragment in marks:
+        if fragment and fragment in text and f"{mark}{fragment}{mark}" not in text:
+            text = text.replace(fragment, f"{mark}{fragment}{mark}", 1)
+    return text
+
+
+def _table_cells(line):
+    if '\t' in line:
+        cells = line.split('\t')
+    elif '|' in line:
+        cells = line.strip().strip('|').split('|')
+    else:
+        cells = _TABLE_SPACES.split(line.strip())
+    return [cell.strip() for cell in cells]
+
+
+def apply_edit_script(content, script):
+    """Monta o Markdown a partir do texto original e do script de edição
+
+    Returns:
+        tuple: (Markdown gerado, número de instruções ignoradas)
+    """
+    lines = content.split('\n')
+    headings, blocks, emphasis, ignored = parse_edit_script(script, len(lines))
+    block_at = {start: (command, end, arg) for command, start, end, arg in blocks}
+
+    output = []
+
+    def separate():
+        if output and output[-1] != '':
+            output.append('')
+
+    number = 1
+    while number <= len(lines):
+        if number in block_at:
+            command, end, arg = block_at[number]
+            region = lines[number - 1:end]
+            separate()
+            if command == 'CODE':
+                output.append(f"```{arg.split()[0] if arg else ''}")
+                output.extend(region)
+                output.append("```")
+            elif command == 'TABLE':
+                rows = [_table_cells(_apply_emphasis(line, emphasis.get(number + k, [])))
+                        for k, line in enumerate(region) if line.strip()]
+                columns = max((len(row) for row in rows), default=0)
+                for k, row in enumerate(rows):
+                    row = row + [''] * (columns - len(row))
+                    output.append('| ' + ' | '.join(row) + ' |')
+                    if k == 0:
+                        output.append('| ' + ' | '.join(['---'] * columns) + ' |')
+            else:
+                item = 1
+                for k, line in enumerate(region):
+                    if not line.strip():
+                        continue
+                    text = _apply_emphasis(line, emphasis.get(number + k, []))
+                    if command == 'UL':
+                        output.append('- ' + _BULLET_PREFIX.sub('', text, count=1).strip())
+                    elif command == 'OL':
+                        existing = _NUMBER_PREFIX.match(text)
+                        if existing:
+                            output.append(f"{existing.group(1)}. {text[existing.end():].strip()}")
+                        else:
+                            output.append(f"{item}. {_BULLET_PREFIX.sub('', text, count=1).strip()}")
+                        item += 1
+                    else:
+                        output.append('> ' + text.strip())
+            output.append('')
+            number = end + 1
+            continue
+
+        line = lines[number - 1]
+        if number in headings and line.strip():
+            separate()
+            output.append(f"{'#' * headings[number]} {_HEADING_PREFIX.sub('', line).strip()}")
+            output.append('')
+        else:
+            output.append(_apply_emphasis(line, emphasis.get(number, [])))
+        number += 1
+
+    return '\n'.join(output).strip('\n') + '\n', ignored
@@ -0,0 +1,271 @@
+# Exemplos fixos de formatação incluídos no prompt de sistema das partes.
+#
+# Além de mostrar à IA o resultado esperado, eles fazem parte do prefixo estável
+# de cada requisição: com as regras, o prefixo passa do tamanho mínimo que a API
+# exige para o cache de prompts (1024 tokens; 2048 nos modelos Haiku). Os textos
+# não mudam entre execuções, para não invalidar o cache de respostas sem motivo.
+
+FORMATTING_EXAMPLES = """
+EXEMPLOS (apenas ilustram a formatação; nunca inclua o texto deles na resposta):
+
+EXEMPLO 1 — títulos, parágrafos e ênfase
+ENTRADA:
+CAPÍTULO 3
+O MÉTODO
+Antes de começar, separe todo o material. O tempo de preparo é de cerca de 40 minutos
+e não deve ser reduzido, pois a massa precisa descansar.
+Atenção: nunca abra o forno nos primeiros 20 minutos.
+SAÍDA:
+## CAPÍTULO 3
+
+### O MÉTODO
+
+Antes de começar, separe todo o material. O tempo de preparo é de cerca de 40 minutos
+e não deve ser reduzido, pois a massa precisa descansar.
+
+**Atenção:** nunca abra o forno nos primeiros 20 minutos.
+
+EXEMPLO 2 — listas numeradas e com marcadores
+ENTRADA:
+Você vai precisar de:
+farinha de trigo
+açúcar
+três ovos
+Modo de preparo
+1) Misture os ingredientes secos.
+2) Acrescente os ovos um a um.
+3) Asse por 40 minutos.
+SAÍDA:
+Você vai precisar de:
+
+- farinha de trigo
+- açúcar
+- três ovos
+
+### Modo de preparo
+
+1. Misture os ingredientes secos.
+2. Acrescente os ovos um a um.
+3. Asse por 40 minutos.
+
+EXEMPLO 3 — tabela
+ENTRADA:
+Plano	Usuários	Preço mensal
+Básico	1	R$ 20
+Equipe	10	R$ 150
+Empresa	ilimitado	sob consulta
+SAÍDA:
+| Plano | Usuários | Preço mensal |
+|-------|----------|--------------|
+| Básico | 1 | R$ 20 |
+| Equipe | 10 | R$ 150 |
+| Empresa | ilimitado | sob consulta |
+
+EXEMPLO 4 — código e prompts preservados exatamente
+ENTRADA:
+Para listar os arquivos, use:
+import os
+for nome in os.listdir('.'):
+    print(nome)
+Prompt sugerido: "Resuma o texto abaixo em três frases, sem opinar."
+SAÍDA:
+Para listar os arquivos, use:
+
+```python
+import os
+for nome in os.listdir('.'):
+    print(nome)
+```
+
+Prompt sugerido:
+
+> "Resuma o texto abaixo em três frases, sem opinar."
+
+EXEMPLO 5 — diálogo e citação
+ENTRADA:
+— Você vem amanhã? — perguntou Ana.
+— Só se não chover.
+Como dizia o avô: "quem tem pressa come cru".
+SAÍDA:
+— Você vem amanhã? — perguntou Ana.
+
+— Só se não chover.
+
+Como dizia o avô:
+
+> "quem tem pressa come cru".
+
+EXEMPLO 6 — seção numerada com subseções
+ENTRADA:
+2 Fundamentos
+2.1 Conceitos básicos
+Um sistema é um conjunto de partes que interagem.
+2.2 Exemplos
+Uma cidade, uma empresa e uma célula são sistemas.
+SAÍDA:
+## 2 Fundamentos
+
+### 2.1 Conceitos básicos
+
+Um sistema é um conjunto de partes que interagem.
+
+### 2.2 Exemplos
+
+Uma cidade, uma empresa e uma célula são sistemas.
+
+EXEMPLO 7 — lista com subitens e nota
+ENTRADA:
+Etapas do projeto
+Planejamento
+definir o escopo
+estimar os custos
+Execução
+Nota: as datas podem mudar conforme o orçamento aprovado.
+SAÍDA:
+### Etapas do projeto
+
+- Planejamento
+  - definir o escopo
+  - estimar os custos
+- Execução
+
+*Nota: as datas podem mudar conforme o orçamento aprovado.*
+
+EXEMPLO 8 — texto que continua de uma parte anterior
+ENTRADA:
+e por isso a equipe decidiu adiar o lançamento para o mês seguinte.
+Resultados
+Os testes mostraram um ganho de 15% no desempenho.
+SAÍDA:
+e por isso a equipe decidiu adiar o lançamento para o mês seguinte.
+
+### Resultados
+
+Os testes mostraram um ganho de 15% no desempenho.
+
+Em todos os exemplos, cada palavra da entrada aparece na saída, na mesma ordem;
+só mudam as quebras de linha e as marcas de Markdown.
+"""
+
+EDIT_SCRIPT_EXAMPLES = """
+EXEMPLOS (apenas ilustram o formato; responda sempre sobre o documento recebido):
+
+EXEMPLO 1 — títulos, lista e ênfase
+DOCUMENTO:
+ 1| CAPÍTULO 3
+ 2| O MÉTODO
+ 3| Antes de começar, separe todo o material.
+ 4| Você vai precisar de:
+ 5| farinha de trigo
+ 6| açúcar
+ 7| três ovos
+ 8| Atenção: nunca abra o forno nos primeiros 20 minutos.
+SCRIPT:
+H 1 2
+H 2 3
+UL 5-7
+B 8 Atenção:
+
+EXEMPLO 2 — lista numerada e tabela
+DOCUMENTO:
+ 1| Modo de preparo
+ 2| 1) Misture os ingredientes secos.
+ 3| 2) Acrescente os ovos um a um.
+ 4| 3) Asse por 40 minutos.
+ 5| Plano	Usuários	Preço mensal
+ 6| Básico	1	R$ 20
+ 7| Equipe	10	R$ 150
+ 8| Empresa	ilimitado	sob consulta
+SCRIPT:
+H 1 3
+OL 2-4
+TABLE 5-8
+
+EXEMPLO 3 — código, citação e itálico
+DOCUMENTO:
+ 1| Para listar os arquivos, use:
+ 2| import os
+ 3| for nome in os.listdir('.'):
+ 4|     print(nome)
+ 5| Como dizia o avô:
+ 6| "quem tem pressa come cru".
+ 7| O termo feedback aparece em todo o livro.
+SCRIPT:
+CODE 2-4 python
+QUOTE 6-6
+I 7 feedback
+
+EXEMPLO 4 — seção numerada com subseções
+DOCUMENTO:
+ 1| 2 Fundamentos
+ 2| 2.1 Conceitos básicos
+ 3| Um sistema é um conjunto de partes que interagem.
+ 4| 2.2 Exemplos
+ 5| Uma cidade, uma empresa e uma célula são sistemas.
+SCRIPT:
+H 1 2
+H 2 3
+H 4 3
+
+EXEMPLO 5 — lista e nota em itálico
+DOCUMENTO:
+ 1| Etapas do projeto
+ 2| Planejamento
+ 3| definir o escopo
+ 4| estimar os custos
+ 5| Execução
+ 6| Nota: as datas podem mudar conforme o orçamento aprovado.
+SCRIPT:
+H 1 3
+UL 2-5
+I 6 Nota: as datas podem mudar conforme o orçamento aprovado.
+
+EXEMPLO 6 — texto que continua de uma parte anterior
+DOCUMENTO:
+ 1| e por isso a equipe decidiu adiar o lançamento para o mês seguinte.
+ 2| Resultados
+ 3| Os testes mostraram um ganho de 15% no desempenho.
+ 4| Resumo dos testes
+ 5| Teste	Antes	Depois
+ 6| Carga	120 ms	102 ms
+ 7| Pico	300 ms	255 ms
+SCRIPT:
+H 2 3
+H 4 4
+TABLE 5-7
+
+EXEMPLO 7 — diálogo e citação (só a citação recebe instrução)
+DOCUMENTO:
+ 1| — Você vem amanhã? — perguntou Ana.
+ 2| — Só se não chover.
+ 3| Como dizia o avô:
+ 4| "quem tem pressa come cru".
+ 5| Capítulo 4
+ 6| A viagem começou cedo, antes do sol.
+SCRIPT:
+QUOTE 4-4
+H 5 2
+
+EXEMPLO 8 — partes, capítulos e termos em negrito
+DOCUMENTO:
+ 1| PARTE I — ORIGENS
+ 2| Capítulo 1
+ 3| O primeiro contato
+ 4| Naquele inverno, o conceito de rede ainda era novo para quase todos.
+ 5| Definição: uma rede é um conjunto de nós ligados entre si.
+ 6| Tipos de rede
+ 7| centralizada
+ 8| descentralizada
+ 9| distribuída
+10| Cada tipo será discutido nos capítulos seguintes.
+SCRIPT:
+H 1 2
+H 2 3
+H 3 3
+B 5 Definição:
+H 6 4
+UL 7-9
+
+Em um script, cada linha é uma instrução; os intervalos não se sobrepõem e os
+trechos de B e I são copiados exatamente da linha indicada.
+"""
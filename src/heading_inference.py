@@ -0,0 +1,190 @@
+import re
+from collections import Counter, defaultdict
+
+# Inferência de títulos a partir das estatísticas do próprio documento, usada
+# quando nenhum padrão é informado. Cada parágrafo recebe uma pontuação
+# (tamanho, maiúsculas, numeração, isolamento e o parágrafo seguinte) e um
+# "formato" (ex.: "capítulo N", "N.", "N.N", "MAIÚSCULAS"). Formatos que se
+# repetem pelo documento com pontuação alta viram famílias de títulos, e de
+# cada família sai um trecho de expressão regular. Tudo em uma passada, O(n).
+
+MIN_SCORE = 3.0
+MIN_REPEATS = 3
+MAX_HEADING_WORDS = 12
+MAX_HEADING_CHARS = 90
+MIN_SECTION_WORDS = 20  # Famílias com menos palavras (mediana) até o título seguinte são listas
+
+_ROMAN = re.compile(r'^[IVXLC]+$')
+_NUMBER = re.compile(r'^\d+$')
+_DOTTED = re.compile(r'^(\d+(?:\.\d+)*)[.)]?$')
+_ROMAN_DOTTED = re.compile(r'^([IVXLC]+)[.)]$')
+_MARKDOWN_HEADING = re.compile(r'^#{1,6}\s+\S')
+_SENTENCE_END = ('.', ',', ';', ':', '!', '?', '…')
+
+
+class InferredHeadings:
+    """Resultado da inferência: famílias aceitas, expressão combinada e níveis por parágrafo"""
+
+    def __init__(self, families, levels, examples):
+        self.families = families  # lista de (formato, ocorrências, trecho de regex, nível)
+        self.levels = levels  # índice do parágrafo -> nível Markdown
+        self.examples = examples
+
+    @property
+    def pattern(self):
+        if not self.families:
+            return None
+        regexes = [regex for _, _, regex, _ in self.families if regex]
+        return '|'.join(f"(?:{regex})" for regex in regexes) or None
+
+    def __bool__(self):
+        return bool(self.families)
+
+    def describe(self):
+        return ", ".join(f"{shape} ({count}×)" for shape, count, _, _ in self.families)
+
+
+def _shape(text):
+    """Formato de um título candidato e a palavra-chave que o inicia (se houver)
+
+    Returns:
+        tuple: (formato, palavra-chave ou None)
+    """
+    tokens = text.split(None, 2)
+    first = tokens[0]
+    second = tokens[1] if len(tokens) > 1 else ''
+
+    # "Capítulo 3", "PARTE II", "Chapter 12: ..."
+    number = second.rstrip('.:)-—–')
+    if first.isalpha() and first[0].isupper() and (_NUMBER.match(number) or _ROMAN.match(number)):
+        kind = 'N' if _NUMBER.match(number) else 'R'
+        return f"{first.lower()} {kind}", first
+    # "1.", "2.3", "4.1.2 ..."
+    match = _DOTTED.match(first)
+    if match and second:
+        depth = match.group(1).count('.')
+        return ('N.' if depth == 0 else 'N' + '.N' * depth), None
+    if _ROMAN_DOTTED.match(first) and second:
+        return 'R.', None
+    letters = [c for c in text if c.isalpha()]
+    if len(letters) >= 3 and all(c.isupper() for c in letters):
+        return 'MAIÚSCULAS', None
+    words = [w for w in text.split() if w[:1].isalpha()]
+    if words and sum(1 for w in words if w[0].isupper()) / len(words) >= 0.6 and len(words) <= 8:
+        return 'Título', None
+    return None, None
+
+
+def _score(text, words, next_words, shape):
+    """Pontuação de um parágrafo como título (0 = descartado)"""
+    if words == 0 or words > MAX_HEADING_WORDS or len(text) > MAX_HEADING_CHARS or shape is None:
+        return 0.0
+    score = 1.0 if words <= 8 else 0.5
+    # Pontuação final é típica de frases curtas ("Em 1990, tudo mudou."), raramente de títulos
+    score += -1.5 if text.endswith(_SENTENCE_END) else 1.0
+    if shape == 'MAIÚSCULAS':
+        score += 1.0
+    elif shape == 'Título':
+        score += 0.5
+    else:
+        score += 2.0  # numeração ou palavra-chave seguida de número
+    if next_words >= 20:
+        score += 1.0  # seguido de prosa
+    return score
+
+
+def _family_regex(shape, keywords):
+    """Trecho de expressão regular que reconhece uma família de títulos (ou None)"""
+    if shape.endswith(' N') or shape.endswith(' R'):
+        words = '|'.join(sorted(re.escape(k) for k in keywords))
+        number = r'\d+' if shape.endswith(' N') else r'[IVXLC]+'
+        return rf'^(?:{words})\s+{number}\b'
+    if shape == 'N.':
+        return r'^\d+[.)]\s+\S'
+    if shape.startswith('N.N'):
+        return r'^\d+' + r'\.\d+' * shape.count('.N') + r'\.?\s+\S'
+    if shape == 'R.':
+        return r'^[IVXLC]+[.)]\s+\S'
+    if shape == 'MAIÚSCULAS':
+        return r'^(?=[^\n]*[A-ZÀ-Þ])[^a-zà-ÿ\n.;!?]{3,90}$'
+    return None
+
+
+def _section_words(indices, prefix_words):
+    """Mediana das palavras entre cada título da família e o seguinte (ou o fim do documento)
+
+    Seções curtas são legítimas, mas linhas de uma lista ou de um diálogo se
+    alternam com poucas palavras; a fração de parágrafos não distingue os casos.
+    """
+    ends = indices[1:] + [len(prefix_words) - 1]
+    gaps = sorted(prefix_words[end] - prefix_words[start + 1] for start, end in zip(indices, ends))
+    return gaps[len(gaps) // 2] if gaps else 0
+
+
+def infer_headings(paragraphs, word_counts=None):
+    """Infere os títulos de um documento a partir de suas estatísticas
+
+    Args:
+        paragraphs: sequência de parágrafos
+        word_counts: número de palavras de cada parágrafo (opcional)
+
+    Returns:
+        InferredHeadings
+    """
+    total = len(paragraphs)
+    candidates = []  # (índice, formato)
+    shape_counts = Counter()
+    keywords = defaultdict(set)
+    prefix_words = [0]  # palavras acumuladas antes de cada parágrafo
+    previous_shape = None
+    previous_index = -2
+
+    for i in range(total):
+        words = word_counts[i] if word_counts is not None else len(paragraphs[i].split())
+        prefix_words.append(prefix_words[-1] + words)
+        text = paragraphs[i].strip()
+        if not text or '\n' in text or _MARKDOWN_HEADING.match(text):
+            continue
+        if words > MAX_HEADING_WORDS:
+            continue
+        shape, keyword = _shape(text)
+        next_words = (word_counts[i + 1] if word_counts is not None else len(paragraphs[i + 1].split())) \
+            if i + 1 < total else 0
+        score = _score(text, words, next_words, shape)
+        # Parágrafos seguidos do mesmo formato são itens de lista, não títulos
+        if shape == previous_shape and i == previous_index + 1:
+            if candidates and candidates[-1][0] == previous_index:
+                shape_counts[candidates.pop()[1]] -= 1
+            score = 0.0
+        previous_shape, previous_index = shape, i
+        if score < MIN_SCORE:
+            continue
+        candidates.append((i, shape))
+        shape_counts[shape] += 1
+        if keyword:
+            keywords[shape].add(keyword)
+
+    members = defaultdict(list)
+    for i, shape in candidates:
+        members[shape].append(i)
+    accepted = {}
+    for shape, count in shape_counts.items():
+        # Famílias sem expressão própria (linhas curtas em maiúsculas iniciais)
+        # entram apenas no conjunto de títulos usado na divisão em partes
+        if count >= MIN_REPEATS and _section_words(members[shape], prefix_words) >= MIN_SECTION_WORDS:
+            accepted[shape] = (count, _family_regex(shape, keywords.get(shape, ())))
+
+    # Famílias mais raras ficam acima (partes antes de capítulos); numeração com mais
+    # níveis (1.2.3) fica sempre abaixo da de menos níveis; # é reservado ao título
+    order = sorted(accepted, key=lambda shape: (shape.count('.N'), accepted[shape][0]))
+    shape_levels = {shape: min(2 + rank, 6) for rank, shape in enumerate(order)}
+    families = [(shape, accepted[shape][0], accepted[shape][1], shape_levels[shape]) for shape in order]
+
+    levels = {}
+    examples = []
+    for i, shape in candidates:
+        if shape in shape_levels:
+            levels[i] = shape_levels[shape]
+            if len(examples) < 5:
+                examples.append(paragraphs[i].strip())
+    return InferredHeadings(families, levels, examples)
@@ -0,0 +1,183 @@
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+# Controle de latência das respostas em streaming: detecção de travamento
+# (nenhum texto recebido por alguns segundos) e percentis de latência usados
+# para decidir quando vale a pena enviar uma requisição paralela (hedging).
+
+
+class StreamStalled(Exception):
+    """A resposta parou de chegar por mais tempo que o permitido"""
+
+
+class StreamCancelled(Exception):
+    """A resposta foi cancelada porque a requisição paralela terminou antes"""
+
+
+class StreamControl:
+    """Acompanha uma resposta em streaming e permite interrompê-la de outra thread
+
+    É alimentado pelo StreamSink como um consumidor (cada trecho conta como
+    atividade). Um vigia em segundo plano cancela a resposta se o primeiro
+    trecho não chegar em first_token_timeout segundos ou se os trechos
+    seguintes pararem por stall_timeout segundos. Os prazos contam a partir
+    de attach(), quando a resposta já foi aberta: a espera nos limitadores
+    de requisições não é um travamento.
+    """
+
+    def __init__(self, first_token_timeout=None, stall_timeout=None):
+        self.first_token_timeout = first_token_timeout
+        self.stall_timeout = stall_timeout
+        self.started = None
+        self.first_token_at = None
+        self.last_activity = None
+        self.reason = None
+        self._stream = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._opened = threading.Event()
+
+    def attach(self, stream):
+        """Associa a resposta em andamento (fechada em caso de cancelamento) e inicia os prazos"""
+        with self._lock:
+            self._stream = stream
+            self.started = self.last_activity = time.monotonic()
+            cancelled = self.reason is not None
+        self._opened.set()
+        if cancelled:
+            self._close_stream(stream)
+
+    def feed(self, text):
+        now = time.monotonic()
+        if self.first_token_at is None:
+            self.first_token_at = now
+        self.last_activity = now
+
+    def close(self):
+        self._done.set()
+
+    def wait_opened(self, timeout=None):
+        """Espera a resposta ser aberta (após os limitadores); retorna se foi aberta"""
+        return self._opened.wait(timeout)
+
+    def elapsed(self):
+        """Segundos desde a abertura da resposta (0 se ainda não foi aberta)"""
+        return time.monotonic() - self.started if self.started is not None else 0.0
+
+    def cancel(self, reason):
+        """Interrompe a resposta; reason é 'stall' ou 'hedge'"""
+        with self._lock:
+            if self.reason is not None:
+                return
+            self.reason = reason
+            stream = self._stream
+        if stream is not None:
+            self._close_stream(stream)
+
+    @staticmethod
+    def _close_stream(stream):
+        try:
+            stream.close()
+        except Exception:
+            pass
+
+    def raise_if_cancelled(self):
+        if self.reason == 'stall':
+            waited = self.stall_timeout if self.first_token_at else self.first_token_timeout
+            raise StreamStalled(f"nenhum texto recebido em {waited:g}s")
+        if self.reason == 'hedge':
+            raise StreamCancelled("requisição paralela concluída antes")
+
+    def watch(self):
+        """Inicia o vigia de travamento (se houver algum limite configurado)"""
+        if not self.first_token_timeout and not self.stall_timeout:
+            return
+        interval = min(t for t in (self.first_token_timeout, self.stall_timeout) if t) / 4
+        thread = threading.Thread(target=self._watch, args=(max(0.05, min(interval, 1.0)),), daemon=True)
+        thread.start()
+
+    def _watch(self, interval):
+        while not self._done.wait(interval):
+            now = time.monotonic()
+            if self.started is None:
+                continue
+            if self.first_token_at is None:
+                if self.first_token_timeout and now - self.started > self.first_token_timeout:
+                    self.cancel('stall')
+                    return
+            elif self.stall_timeout and now - self.last_activity > self.stall_timeout:
+                self.cancel('stall')
+                return
+
+
+class LatencyTracker:
+    """Latências das requisições da execução e limiar adaptativo para o hedging
+
+    A latência é normalizada pelos tokens de saída esperados (segundos por
+    token), de modo que partes grandes e pequenas possam ser comparadas; o
+    limiar de uma requisição é o percentil configurado dessa taxa vezes os
+    tokens que ela deve produzir.
+    """
+
+    def __init__(self, window=200):
+        self._rates = deque(maxlen=window)
+        self._latencies = deque(maxlen=window)
+        self._model_rates = defaultdict(lambda: deque(maxlen=window))
+        self._model_totals = defaultdict(lambda: [0, 0.0, 0])  # requisições, segundos, tokens esperados
+        self._lock = threading.Lock()
+        self.events = Counter()
+
+    def record(self, seconds, expected_tokens, model=None):
+        rate = seconds / max(expected_tokens, 1)
+        with self._lock:
+            self._latencies.append(seconds)
+            self._rates.append(rate)
+            if model is not None:
+                self._model_rates[model].append(rate)
+                totals = self._model_totals[model]
+                totals[0] += 1
+                totals[1] += seconds
+                totals[2] += expected_tokens
+
+    def model_totals(self, model):
+        """(requisições, segundos, tokens esperados) de um modelo na execução, ou None"""
+        with self._lock:
+            totals = self._model_totals.get(model)
+            return tuple(totals) if totals else None
+
+    def count(self, event):
+        with self._lock:
+            self.events[event] += 1
+
+    @staticmethod
+    def _percentile(values, percentile):
+        ordered = sorted(values)
+        rank = min(len(ordered) - 1, max(0, int(round(percentile / 100 * (len(ordered) - 1)))))
+        return ordered[rank]
+
+    def threshold(self, expected_tokens, percentile=95, min_samples=5, model=None):
+        """Segundos após os quais uma requisição está acima do percentil (None sem amostras suficientes)
+
+        Com model, usa apenas as latências desse modelo quando já houver amostras suficientes.
+        """
+        with self._lock:
+            rates = self._model_rates.get(model) if model is not None else None
+            if not rates or len(rates) < min_samples:
+                rates = self._rates
+            if len(rates) < min_samples:
+                return None
+            return self._percentile(rates, percentile) * max(expected_tokens, 1)
+
+    def summary(self):
+        """Percentis de latência (segundos) e eventos da execução"""
+        with self._lock:
+            if not self._latencies:
+                return None
+            return {
+                'requests': len(self._latencies),
+                'p50': self._percentile(self._latencies, 50),
+                'p95': self._percentile(self._latencies, 95),
+                'max': max(self._latencies),
+                **self.events,
+            }
@@ -0,0 +1,45 @@
+import importlib
+import threading
+
+# Módulos pesados ou opcionais são importados apenas no primeiro uso, para que
+# comandos que não os usam (--help, execuções servidas do cache, apenas
+# exportação) iniciem rapidamente.
+
+_modules = {}
+_lock = threading.RLock()
+
+
+def optional_import(name):
+    """Importa um módulo opcional no primeiro uso
+
+    Returns:
+        module ou None se o módulo não estiver instalado
+    """
+    if name in _modules:
+        return _modules[name]
+    with _lock:
+        if name not in _modules:
+            try:
+                _modules[name] = importlib.import_module(name)
+            except ImportError:
+                _modules[name] = None
+        return _modules[name]
+
+
+class LazyConsole:
+    """Console do rich criado apenas quando algo é exibido pela primeira vez"""
+
+    def __init__(self, **kwargs):
+        self._kwargs = kwargs
+        self._console = None
+
+    def _get(self):
+        if self._console is None:
+            with _lock:
+                if self._console is None:
+                    from rich.console import Console
+                    self._console = Console(**self._kwargs)
+        return self._console
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
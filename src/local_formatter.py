@@ -0,0 +1,249 @@
+import re
+
+# Padrões comuns de títulos, usados também para escolher onde dividir o documento em partes
+DEFAULT_HEADING_PATTERNS = {
+    'chapter': r'^(?:Capítulo|CAPÍTULO)\s+\d+',  # Capítulo 1, CAPÍTULO 2, etc.
+    'part': r'^(?:Parte|PARTE)\s+\d+',  # Parte 1, PARTE 2, etc.
+    'numbered': r'^\d+\.\s+[A-Z]',  # 1. TÍTULO, 2. CONCEITOS, etc.
+    'roman': r'^[IVX]+\.\s+',  # I. Título, IV. Conceitos, etc.
+}
+
+# Títulos já em Markdown (por exemplo, vindos dos estilos do DOCX)
+MARKDOWN_HEADING = r'^#{1,6}\s+\S'
+
+PLACEHOLDER = "[[LOCAL-{}]]"
+
+_PLACEHOLDER_TOKEN = re.compile(r'[*_]*\[\[\s*LOCAL-(\d+)\s*\]\][*_]*')
+_PLACEHOLDER_LINE = re.compile(r'^[ \t>#*_\-+]*(?:\d+[.)])?[ \t]*[*_]*\[\[\s*LOCAL-(\d+)\s*\]\][*_ \t]*$', re.MULTILINE)
+_BULLET_LINE = re.compile(r'^\s*[-*•●▪‣◦–]\s+(.*)$')
+_NUMBERED_LINE = re.compile(r'^\s*(\d+)[.)]\s+(.*)$')
+_CODE_LINE = re.compile(r'^(?: {4}|\t)')
+_MARKDOWN_HEADING = re.compile(MARKDOWN_HEADING)
+_TABLE_ROW = re.compile(r'^\s*\|.*\|\s*$')
+_FENCE = re.compile(r'^\s{0,3}(`{3,}|~{3,})')
+_SENTENCE_END = ('.', '!', '?', ':', ';', '…', '"', '”', '»', ')')
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+
+def heading_regex(headings_pattern=None):
+    """Expressão que identifica parágrafos de título (padrão do usuário ou os padrões comuns)"""
+    patterns = [headings_pattern] if headings_pattern else list(DEFAULT_HEADING_PATTERNS.values())
+    return re.compile('|'.join(f"({p})" for p in patterns + [MARKDOWN_HEADING]))
+
+
+def count_words(text):
+    return len(_WORD.findall(text))
+
+
+class LocalFormatResult:
+    """Blocos de um documento, formatados localmente (Markdown) ou pendentes (None)"""
+
+    def __init__(self, paragraphs, blocks):
+        self.paragraphs = paragraphs
+        self.blocks = blocks
+        self.total_words = sum(count_words(p) for p in paragraphs)
+        self.local_words = sum(count_words(p) for p, block in zip(paragraphs, blocks) if block is not None)
+
+    @property
+    def local_share(self):
+        """Fração do texto (em palavras) formatada localmente"""
+        return self.local_words / max(self.total_words, 1)
+
+    @property
+    def ambiguous_count(self):
+        return sum(1 for block in self.blocks if block is None)
+
+    def render(self):
+        """Documento inteiro sem IA: trechos ambíguos são mantidos como estão"""
+        return '\n\n'.join(block if block is not None else paragraph
+                           for paragraph, block in zip(self.paragraphs, self.blocks))
+
+    def placeholder_text(self):
+        """Texto a enviar à IA: trechos ambíguos intactos e cada sequência de
+        trechos já formatados substituída por um marcador [[LOCAL-N]]
+
+        Um título formatado localmente sempre abre um novo marcador, para que o
+        índice do texto enviado à IA mantenha os títulos do documento.
+
+        Returns:
+            tuple: (texto para a IA, dicionário N -> Markdown local, índice do
+                parágrafo de origem de cada parágrafo do texto para a IA)
+        """
+        parts = []
+        local_blocks = {}
+        sources = []
+        run = []
+
+        def close_run():
+            if run:
+                number = len(local_blocks) + 1
+                local_blocks[number] = '\n\n'.join(run)
+                parts.append(PLACEHOLDER.format(number))
+                run.clear()
+
+        for index, (paragraph, block) in enumerate(zip(self.paragraphs, self.blocks)):
+            if block is None:
+                close_run()
+                parts.append(paragraph)
+                sources.append(index)
+            else:
+                if block.startswith('#'):
+                    close_run()
+                if not run:
+                    sources.append(index)
+                run.append(block)
+        close_run()
+        return '\n\n'.join(parts), local_blocks, sources
+
+    @staticmethod
+    def restore(formatted, local_blocks):
+        """Substitui os marcadores da resposta da IA pelo Markdown local
+
+        Marcadores perdidos pela IA são reinseridos antes do marcador seguinte,
+        preservando a ordem do documento.
+
+        Returns:
+            tuple: (Markdown completo, número de marcadores reinseridos)
+        """
+        emitted = set()
+        missing = []
+
+        def blocks_up_to(number):
+            pending = [n for n in sorted(local_blocks) if n <= number and n not in emitted]
+            for n in pending:
+                emitted.add(n)
+                if n != number:
+                    missing.append(n)
+            return '\n\n' + '\n\n'.join(local_blocks[n] for n in pending) + '\n\n' if pending else ''
+
+        def replace(match):
+            number = int(match.group(1))
+            if number not in local_blocks:
+                return match.group(0)
+            return blocks_up_to(number)
+
+        # Primeiro as linhas que contêm apenas o marcador (com eventual marcação em volta)
+        text = _PLACEHOLDER_LINE.sub(replace, formatted)
+        text = _PLACEHOLDER_TOKEN.sub(replace, text)
+        # Marcadores que não apareceram depois do último encontrado vão para o fim
+        remaining = blocks_up_to(max(local_blocks, default=0) + 1).strip()
+        return text.rstrip() + ('\n\n' + remaining if remaining else '') + '\n', len(missing)
+
+
+class LocalFormatter:
+    """Formatador por regras para estruturas inequívocas.
+
+    Converte diretamente títulos que seguem os padrões conhecidos, listas com
+    marcadores ou numeradas, tabelas separadas por tabulação, código indentado e
+    parágrafos de prosa comuns. Parágrafos em que a estrutura não é evidente
+    (linhas curtas sem pontuação final, itens numerados isolados etc.) ficam
+    pendentes (None) para a IA.
+    """
+
+    def __init__(self, headings_pattern=None, min_prose_words=8, max_heading_words=15):
+        self.headings_pattern = headings_pattern
+        self.min_prose_words = min_prose_words
+        self.max_heading_words = max_heading_words
+        self._custom = re.compile(headings_pattern) if headings_pattern else None
+        self._defaults = {kind: re.compile(pattern) for kind, pattern in DEFAULT_HEADING_PATTERNS.items()}
+
+    def format(self, paragraphs, heading_levels=None):
+        """Formata os parágrafos que seguem regras inequívocas
+
+        Args:
+            paragraphs: parágrafos do documento
+            heading_levels: nível de título de cada parágrafo (0 = não é título), já
+                calculado no índice do documento, inclusive para títulos inferidos
+                (opcional; sem ele, os títulos vêm dos padrões)
+
+        Returns:
+            LocalFormatResult
+        """
+        if heading_levels is not None:
+            blocks = [self._format_paragraph(p, None, heading_levels[i]) for i, p in enumerate(paragraphs)]
+            return LocalFormatResult(paragraphs, blocks)
+        levels = self._heading_levels(paragraphs)
+        return LocalFormatResult(paragraphs, [self._format_paragraph(p, levels) for p in paragraphs])
+
+    def _heading_kind(self, paragraph):
+        if self._custom:
+            return 'custom' if self._custom.search(paragraph) else None
+        for kind, pattern in self._defaults.items():
+            if pattern.search(paragraph):
+                return kind
+        return None
+
+    def _heading_levels(self, paragraphs):
+        """Níveis de título conforme os tipos presentes no documento (# é reservado ao título)"""
+        kinds = set()
+        for paragraph in paragraphs:
+            stripped = paragraph.strip()
+            if stripped and '\n' not in stripped and self._is_heading_text(stripped):
+                kind = self._heading_kind(stripped)
+                if kind:
+                    kinds.add(kind)
+        levels = {'custom': 2}
+        level = 2
+        for kind in ('part', 'chapter'):
+            if kind in kinds:
+                levels[kind] = level
+                level += 1
+        levels['numbered'] = levels['roman'] = level
+        return levels
+
+    def _is_heading_text(self, text):
+        return count_words(text) <= self.max_heading_words and not text.endswith(('.', ';', ','))
+
+    def _format_paragraph(self, paragraph, levels, heading_level=None):
+        stripped = paragraph.strip()
+        if not stripped:
+            return ''
+        lines = [line for line in paragraph.split('\n') if line.strip()]
+
+        # Estrutura que já chega em Markdown (títulos, tabelas e blocos de código) é mantida
+        if len(lines) == 1 and _MARKDOWN_HEADING.match(stripped):
+            return stripped
+        if len(lines) > 1 and all(_TABLE_ROW.match(line) for line in lines):
+            return stripped
+        if _FENCE.match(lines[0]) and _FENCE.match(lines[-1]) and len(lines) > 1:
+            return paragraph.strip('\n')
+
+        if len(lines) == 1:
+            if heading_level is None:
+                kind = self._heading_kind(stripped)
+                heading_level = levels[kind] if kind else 0
+            if heading_level and self._is_heading_text(stripped):
+                return f"{'#' * min(heading_level, 6)} {stripped}"
+
+        if all(_CODE_LINE.match(line) for line in lines):
+            return '```\n' + '\n'.join(line[4:] if line.startswith('    ') else line[1:] for line in lines) + '\n```'
+
+        bullets = [_BULLET_LINE.match(line) for line in lines]
+        if all(bullets):
+            return '\n'.join(f"- {match.group(1).strip()}" for match in bullets)
+
+        numbers = [_NUMBERED_LINE.match(line) for line in lines]
+        if len(lines) > 1 and all(numbers):
+            return '\n'.join(f"{match.group(1)}. {match.group(2).strip()}" for match in numbers)
+
+        table = self._format_table(lines)
+        if table:
+            return table
+
+        if any(numbers) or any(bullets) or '\t' in paragraph or '|' in paragraph:
+            return None
+        if count_words(stripped) >= self.min_prose_words and stripped.endswith(_SENTENCE_END):
+            return stripped
+        return None
+
+    @staticmethod
+    def _format_table(lines):
+        if len(lines) < 2 or not all('\t' in line for line in lines):
+            return None
+        rows = [[cell.strip() for cell in line.strip().split('\t')] for line in lines]
+        columns = len(rows[0])
+        if columns < 2 or any(len(row) != columns for row in rows):
+            return None
+        output = ['| ' + ' | '.join(rows[0]) + ' |', '| ' + ' | '.join(['---'] * columns) + ' |']
+        output.extend('| ' + ' | '.join(row) + ' |' for row in rows[1:])
+        return '\n'.join(output)
@@ -0,0 +1,225 @@
+import re
+
+_FENCE = re.compile(r'^\s{0,3}(`{3,}|~{3,})')
+_HEADING = re.compile(r'^\s{0,3}(#{1,6})(?:\s+|$)(.*?)(?:\s+#+)?\s*$')
+_HEADING_NO_SPACE = re.compile(r'^(#{1,6})([^\s#].*)$')
+_BULLET_CHARS = '*+•●▪‣'
+_BULLET = re.compile(r'^(\s*)([*+•●▪‣])\s+(.*)$')
+_LIST_ITEM = re.compile(r'^\s*(?:[-*+]|\d+[.)])\s+')
+_TABLE_ROW = re.compile(r'^\s*\|.*\|\s*$')
+_TABLE_SEPARATOR = re.compile(r'^\s*\|?\s*:?-{3,}:?\s*(\|\s*:?-{3,}:?\s*)*\|?\s*$')
+
+# Marcas deixadas pelo processamento em partes ("Parte 3 de 12", "(continua)", etc.)
+_PART_ARTIFACTS = [
+    re.compile(r'^[\s#>*_\[(\-—]*(?:esta\s+é\s+a\s+|fim\s+da\s+|início\s+da\s+|continuação\s+da\s+)?'
+               r'parte\s+\d+\s+(?:de|/)\s+\d+[\s)\]*_.:\-—]*$', re.IGNORECASE),
+    re.compile(r'^[\s*_]*[\[(]\s*(?:continua|continuação|continuação da parte anterior|'
+               r'continua na próxima parte)\s*\.{0,3}\s*[\])][\s*_]*$', re.IGNORECASE),
+    re.compile(r'^[\s*_\-—]*continua\s+na\s+próxima\s+parte[\s*_.\-—]*$', re.IGNORECASE),
+]
+
+
+def _heading_key(text):
+    """Forma simplificada de um título, para comparar repetições"""
+    return re.sub(r'[\W_]+', ' ', text).strip().lower()
+
+
+class MarkdownNormalizer:
+    """Normalizador determinístico de Markdown, processado linha a linha.
+
+    Faz localmente o trabalho da antiga verificação de consistência pela IA:
+    corrige a hierarquia de títulos, remove artefatos de divisão em partes,
+    normaliza linhas em branco, listas e tabelas. O texto pode ser entregue
+    aos poucos com feed(), o que permite normalizar documentos muito grandes
+    sem mantê-los inteiros em memória.
+    """
+
+    def __init__(self, title=None):
+        self.title_key = _heading_key(title) if title else None
+        self.stats = {
+            'artifacts_removed': 0,
+            'headings_fixed': 0,
+            'duplicate_titles_removed': 0,
+            'blank_lines_removed': 0,
+            'bullets_normalized': 0,
+            'tables_fixed': 0,
+        }
+        self._partial = ''
+        self._output = []
+        self._fence = None
+        self._table = []
+        self._last_kind = None
+        self._blank_pending = False
+        self._heading_stack = []  # (nível original, nível atribuído) dos títulos abertos
+        self._title_seen = False
+
+    def feed(self, text):
+        """Processa mais um trecho de texto e retorna o Markdown já normalizado"""
+        lines = (self._partial + text).split('\n')
+        self._partial = lines.pop()
+        for line in lines:
+            self._process_line(line)
+        return self._drain()
+
+    def finish(self):
+        """Processa o restante do texto e retorna a parte final normalizada"""
+        if self._partial:
+            self._process_line(self._partial)
+            self._partial = ''
+        self._flush_table()
+        return self._drain()
+
+    def _drain(self):
+        if not self._output:
+            return ''
+        text = '\n'.join(self._output) + '\n'
+        self._output = []
+        return text
+
+    def _emit(self, line, kind, separate=False):
+        """Emite uma linha, inserindo no máximo uma linha em branco antes dela"""
+        if self._last_kind is not None and self._last_kind != 'blank':
+            if self._blank_pending or separate or self._last_kind == 'heading':
+                self._output.append('')
+        self._blank_pending = False
+        self._output.append(line)
+        self._last_kind = kind
+
+    def _process_line(self, line):
+        # Blocos de código são preservados exatamente como estão
+        if self._fence:
+            self._output.append(line)
+            match = _FENCE.match(line)
+            if match and match.group(1)[0] == self._fence[0] and len(match.group(1)) >= len(self._fence) \
+                    and not line.strip()[len(match.group(1)):].strip():
+                self._fence = None
+                self._last_kind = 'fence'
+            return
+
+        fence = _FENCE.match(line)
+        if fence:
+            self._flush_table()
+            self._emit(line.rstrip(), 'fence', separate=True)
+            self._fence = fence.group(1)
+            return
+
+        stripped = line.strip()
+        if not stripped:
+            if self._table:
+                self._flush_table()
+            if self._blank_pending or self._last_kind in (None, 'blank'):
+                self.stats['blank_lines_removed'] += 1
+            self._blank_pending = True
+            return
+
+        lowered = stripped.lower()
+        if ('parte' in lowered or 'continua' in lowered) and \
+                any(pattern.match(stripped) for pattern in _PART_ARTIFACTS):
+            self.stats['artifacts_removed'] += 1
+            return
+
+        if stripped[0] == '|' and _TABLE_ROW.match(line):
+            self._table.append(stripped)
+            return
+        self._flush_table()
+
+        # Mantém quebras de linha explícitas (dois espaços no fim)
+        line = line.rstrip() + ('  ' if line.endswith('  ') else '')
+
+        first = stripped[0]
+        if first == '#':
+            heading_line = _HEADING_NO_SPACE.sub(r'\1 \2', stripped)
+            heading = _HEADING.match(heading_line)
+            if heading and heading.group(2):
+                self._process_heading(len(heading.group(1)), heading.group(2).strip(), heading_line != stripped)
+                return
+
+        if first in _BULLET_CHARS:
+            bullet = _BULLET.match(line)
+            if bullet:
+                line = f"{bullet.group(1)}- {bullet.group(3)}"
+                self.stats['bullets_normalized'] += 1
+
+        if (first == '-' or first.isdigit() or first == '*' or first == '+') and _LIST_ITEM.match(line):
+            # Uma lista precisa de uma linha em branco antes do parágrafo anterior
+            self._emit(line, 'list', separate=self._last_kind not in ('list', None))
+            return
+
+        kind = 'list' if self._last_kind == 'list' and line[:1].isspace() else 'text'
+        self._emit(line, kind, separate=self._last_kind in ('table', 'fence'))
+
+    def _process_heading(self, level, text, fixed):
+        # Títulos repetidos do documento (um por parte) são removidos
+        if self.title_key and level == 1 and _heading_key(text) == self.title_key:
+            if self._title_seen:
+                self.stats['duplicate_titles_removed'] += 1
+                return
+            self._title_seen = True
+
+        # Cada nível original recebe um nível atribuído, o mesmo para todos os irmãos:
+        # um filho fica um nível abaixo do pai (## -> #### vira ###), e um título sem
+        # pai aberto mantém o próprio nível (nada sobe acima do topo do documento)
+        original = level
+        stack = self._heading_stack
+        while stack and stack[-1][0] > original:
+            stack.pop()
+        if stack and stack[-1][0] == original:
+            level = stack.pop()[1]
+        elif stack:
+            level = stack[-1][1] + 1
+        stack.append((original, level))
+        if fixed or level != original:
+            self.stats['headings_fixed'] += 1
+        self._emit(f"{'#' * level} {text}", 'heading', separate=True)
+
+    def _flush_table(self):
+        """Emite a tabela acumulada com separador e número de colunas consistentes"""
+        if not self._table:
+            return
+        rows = [self._split_row(row) for row in self._table]
+        fixed = False
+        if len(rows) < 2 or not _TABLE_SEPARATOR.match(self._table[1]):
+            rows.insert(1, None)
+            fixed = True
+        columns = max(len(row) for row in rows if row is not None)
+        if rows[1] is not None and len(rows[1]) != columns:
+            # Separador com número errado de colunas é recriado
+            rows[1] = None
+            fixed = True
+
+        lines = []
+        for row in rows:
+            if row is None:
+                lines.append('| ' + ' | '.join(['---'] * columns) + ' |')
+                continue
+            if len(row) < columns:
+                row = row + [''] * (columns - len(row))
+                fixed = True
+            lines.append('| ' + ' | '.join(row) + ' |')
+        if fixed:
+            self.stats['tables_fixed'] += 1
+
+        self._table = []
+        self._emit(lines[0], 'table', separate=True)
+        for table_line in lines[1:]:
+            self._output.append(table_line)
+
+    @staticmethod
+    def _split_row(row):
+        cells = row.strip()
+        if cells.startswith('|'):
+            cells = cells[1:]
+        if cells.endswith('|') and not cells.endswith('\\|'):
+            cells = cells[:-1]
+        return [cell.strip() for cell in re.split(r'(?<!\\)\|', cells)]
+
+
+def normalize_markdown(text, title=None):
+    """Normaliza um documento Markdown completo
+
+    Returns:
+        tuple: (texto normalizado, estatísticas das correções feitas)
+    """
+    normalizer = MarkdownNormalizer(title)
+    result = normalizer.feed(text) + normalizer.finish()
+    return result, normalizer.stats
@@ -0,0 +1,138 @@
+import re
+import threading
+from collections import Counter
+
+from src.local_formatter import heading_regex
+
+# Roteamento de modelos por complexidade estrutural: partes de prosa corrida,
+# que pedem pouco mais que a separação dos parágrafos, vão para um modelo
+# rápido; partes com títulos, listas, tabelas ou código vão para o modelo
+# principal. A complexidade é a fração ponderada das linhas com estrutura.
+
+DEFAULT_MAX_COMPLEXITY = 0.1
+
+# Peso de cada tipo de linha: tabelas e código são os mais fáceis de estragar
+WEIGHTS = {'headings': 1.0, 'lists': 1.0, 'tables': 3.0, 'code': 3.0}
+
+_LIST_ITEM = re.compile(r'^\s*(?:[-*+•–—]|\d{1,3}[.)]|[a-zA-Z][.)])\s+\S')
+_TABLE_ROW = re.compile(r'\|.*\||\t.*\t|\S {3,}\S+ {3,}\S')
+_CODE_LINE = re.compile(
+    r'^(?: {4}|\t)\S'  # bloco indentado
+    r'|^\s*(?:```|~~~)'
+    r'|^\s*(?:def|class|import|from|return|function|var|let|const|public|private|#include|SELECT|INSERT)\b'
+    r'|[{}]\s*$|=>|==|!=|\w+\([^)]*\)\s*[:{]\s*$'
+)
+_SHORT_HEADING = re.compile(r'^[^a-zà-ÿ.;:!?]{3,90}$')  # linha curta toda em maiúsculas
+_PLACEHOLDER = re.compile(r'^\[\[LOCAL-\d+\]\]$')
+
+
+class ChunkComplexity:
+    """Linhas com estrutura em uma parte e a complexidade resultante (0 a 1)"""
+
+    def __init__(self, lines, counts):
+        self.lines = lines
+        self.counts = counts
+
+    @property
+    def score(self):
+        if not self.lines:
+            return 0.0
+        weighted = sum(WEIGHTS[name] * count for name, count in self.counts.items())
+        return min(1.0, weighted / self.lines)
+
+    def describe(self):
+        features = ", ".join(f"{name}={count}" for name, count in self.counts.items() if count)
+        return f"{self.score:.2f}" + (f" ({features})" if features else "")
+
+
+def chunk_complexity(text, headings_pattern=None, headings=None):
+    """Mede a complexidade estrutural de uma parte
+
+    Args:
+        text: texto da parte
+        headings_pattern: padrão de títulos do documento (ou os padrões comuns)
+        headings: número de títulos já identificados no índice (opcional)
+
+    Returns:
+        ChunkComplexity
+    """
+    pattern = heading_regex(headings_pattern)
+    counts = Counter({name: 0 for name in WEIGHTS})
+    lines = 0
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped or _PLACEHOLDER.match(stripped):
+            continue
+        lines += 1
+        if _CODE_LINE.search(line):
+            counts['code'] += 1
+        elif _TABLE_ROW.search(stripped):
+            counts['tables'] += 1
+        elif _LIST_ITEM.match(line):
+            counts['lists'] += 1
+        elif headings is None and (pattern.search(stripped) or
+                                   (len(stripped.split()) <= 12 and _SHORT_HEADING.match(stripped)
+                                    and any(c.isalpha() for c in stripped))):
+            counts['headings'] += 1
+    if headings is not None:
+        counts['headings'] = headings
+    return ChunkComplexity(lines, counts)
+
+
+class ModelRouter:
+    """Escolhe o modelo de cada parte e acumula a divisão da execução
+
+    Uma parte vai para o modelo rápido quando sua complexidade não passa de
+    max_complexity e a resposta esperada cabe no limite de saída dele.
+    """
+
+    def __init__(self, premium_model, fast_model, max_complexity=DEFAULT_MAX_COMPLEXITY, fast_output_limit=None):
+        self.premium_model = premium_model
+        self.fast_model = fast_model
+        self.max_complexity = max_complexity
+        self.fast_output_limit = fast_output_limit
+        self.parts = Counter()
+        self.words = Counter()
+        self.escalated = 0
+        self._lock = threading.Lock()
+
+    def route(self, complexity, words=0, expected_tokens=None):
+        """Modelo para uma parte com a complexidade informada"""
+        fits = not self.fast_output_limit or expected_tokens is None or expected_tokens <= self.fast_output_limit
+        model = self.fast_model if fits and complexity.score <= self.max_complexity else self.premium_model
+        with self._lock:
+            self.parts[model] += 1
+            self.words[model] += words
+        return model
+
+    def escalate(self):
+        """Parte reenviada ao modelo principal (resposta do rápido fora da tolerância)"""
+        with self._lock:
+            self.escalated += 1
+        return self.premium_model
+
+    def summary(self, latency=None):
+        """Divisão das partes entre os modelos e segundos economizados (estimados)
+
+        A economia compara o tempo das requisições do modelo rápido com o que o
+        modelo principal levaria na mesma execução, em segundos por token esperado.
+        """
+        with self._lock:
+            total = sum(self.parts.values())
+            if not total:
+                return None
+            summary = {
+                'fast_parts': self.parts[self.fast_model],
+                'premium_parts': self.parts[self.premium_model],
+                'fast_words': self.words[self.fast_model],
+                'premium_words': self.words[self.premium_model],
+                'escalated': self.escalated,
+                'seconds_saved': None,
+            }
+        if latency is not None:
+            fast = latency.model_totals(self.fast_model)
+            premium = latency.model_totals(self.premium_model)
+            if fast and premium and premium[2]:
+                premium_rate = premium[1] / premium[2]
+                summary['seconds_saved'] = premium_rate * fast[2] - fast[1]
+        return summary
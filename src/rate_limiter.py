@@ -0,0 +1,220 @@
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+# Limites informados pela API em cada resposta (cabeçalhos anthropic-ratelimit-*)
+BUCKETS = ('requests', 'input-tokens', 'output-tokens')
+HEADER_PREFIX = 'anthropic-ratelimit-'
+
+
+def _parse_reset(value):
+    """Instante (epoch) de um cabeçalho *-reset no formato RFC 3339"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+def retry_after(error):
+    """Segundos pedidos pela API (cabeçalho retry-after) em um erro, se houver"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_rate_limited(error):
+    """Indica se o erro é de limite de requisições ou sobrecarga da API"""
+    status = getattr(error, 'status_code', None) or getattr(getattr(error, 'response', None), 'status_code', None)
+    return status in (429, 529)
+
+
+class _FileLock:
+    """Trava exclusiva entre processos sobre um arquivo (fcntl ou msvcrt)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'a+')
+        if fcntl:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        elif msvcrt:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, *exc_info):
+        try:
+            if fcntl:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            elif msvcrt:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+
+
+class RateLimiter:
+    """Limitador adaptativo por baldes de tokens, guiado pelos cabeçalhos da API.
+
+    Mantém um balde para requisições, tokens de entrada e tokens de saída. A
+    capacidade e o saldo de cada balde vêm dos cabeçalhos anthropic-ratelimit-*
+    da última resposta, e o saldo é reposto continuamente (limite por minuto).
+    Antes de cada requisição, acquire() espera até haver saldo para a
+    estimativa de tokens; um 429 com retry-after bloqueia todas as requisições
+    até o instante indicado. O estado fica em um arquivo JSON protegido por uma
+    trava de arquivo, compartilhado pelas threads e pelos processos do lote.
+    """
+
+    def __init__(self, state_path, base_delay=1.0, max_delay=60.0):
+        self.state_path = Path(state_path)
+        self.lock_path = self.state_path.with_name(f"{self.state_path.name}.lock")
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self.waited = 0.0
+
+    @contextmanager
+    def _locked(self):
+        """Trava entre threads (do processo) e entre processos (arquivo .lock)"""
+        with self._lock:
+            try:
+                self.state_path.parent.mkdir(parents=True, exist_ok=True)
+                file_lock = _FileLock(self.lock_path)
+                file_lock.__enter__()
+            except OSError:
+                file_lock = None
+            try:
+                yield
+            finally:
+                if file_lock:
+                    file_lock.__exit__(None, None, None)
+
+    def _load(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        state.setdefault('buckets', {})
+        state.setdefault('blocked_until', 0)
+        return state
+
+    def _save(self, state):
+        try:
+            tmp_path = self.state_path.with_name(f"{self.state_path.name}.{os.getpid()}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.state_path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _refill(bucket, now):
+        """Repõe o saldo do balde desde a última atualização (limite por minuto)"""
+        rate = bucket['limit'] / 60.0
+        bucket['remaining'] = min(bucket['limit'], bucket['remaining'] + (now - bucket['updated']) * rate)
+        bucket['updated'] = now
+        return rate
+
+    def acquire(self, input_tokens=0, output_tokens=0):
+        """Espera até haver saldo para uma requisição com os tokens estimados
+
+        Returns:
+            float: segundos de espera
+        """
+        needs = {'requests': 1, 'input-tokens': input_tokens, 'output-tokens': output_tokens}
+        waited = 0.0
+        while True:
+            with self._locked():
+                state = self._load()
+                now = time.time()
+                wait = state['blocked_until'] - now
+                if wait <= 0:
+                    for name, need in needs.items():
+                        bucket = state['buckets'].get(name)
+                        if not bucket or not bucket.get('limit'):
+                            continue  # limite ainda desconhecido
+                        rate = self._refill(bucket, now)
+                        # Uma requisição maior que a capacidade espera o balde cheio
+                        need = min(need, bucket['limit'])
+                        if bucket['remaining'] < need:
+                            needed = (need - bucket['remaining']) / rate
+                            # O balde está cheio de novo no instante informado em *-reset
+                            if bucket.get('reset') and bucket['reset'] > now:
+                                needed = min(needed, bucket['reset'] - now)
+                            wait = max(wait, needed)
+                if wait <= 0:
+                    for name, need in needs.items():
+                        bucket = state['buckets'].get(name)
+                        if bucket and bucket.get('limit'):
+                            bucket['remaining'] -= min(need, bucket['limit'])
+                    self._save(state)
+                    self.waited += waited
+                    return waited
+            # Pequena variação aleatória para que as threads não acordem juntas
+            delay = min(wait, 5.0) + random.uniform(0, 0.25)
+            time.sleep(delay)
+            waited += delay
+
+    def update(self, headers):
+        """Atualiza os baldes com os cabeçalhos de limite de uma resposta"""
+        if not headers:
+            return
+        now = time.time()
+        with self._locked():
+            state = self._load()
+            changed = False
+            for name in BUCKETS:
+                try:
+                    limit = float(headers.get(f"{HEADER_PREFIX}{name}-limit"))
+                    remaining = float(headers.get(f"{HEADER_PREFIX}{name}-remaining"))
+                except (TypeError, ValueError):
+                    continue
+                state['buckets'][name] = {'limit': limit, 'remaining': remaining, 'updated': now,
+                                          'reset': _parse_reset(headers.get(f"{HEADER_PREFIX}{name}-reset"))}
+                changed = True
+            if changed:
+                self._save(state)
+
+    def block(self, seconds):
+        """Suspende todas as requisições (de todos os processos) por alguns segundos"""
+        with self._locked():
+            state = self._load()
+            state['blocked_until'] = max(state['blocked_until'], time.time() + seconds)
+            self._save(state)
+
+    def backoff(self, attempt, error=None):
+        """Espera antes de uma nova tentativa: retry-after da API ou recuo exponencial com variação
+
+        Returns:
+            float: segundos a esperar
+        """
+        requested = retry_after(error) if error is not None else None
+        if requested is not None:
+            if is_rate_limited(error):
+                self.block(requested)
+            return requested + random.uniform(0, 0.5)
+        # Recuo exponencial com variação total ("full jitter")
+        return random.uniform(self.base_delay, min(self.max_delay, self.base_delay * 2 ** attempt))
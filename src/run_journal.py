@@ -0,0 +1,174 @@
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime
+from pathlib import Path
+
+
+def text_hash(text):
+    """Hash SHA-256 de um texto (usado para identificar partes e respostas)"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def paragraph_hash(paragraph):
+    """Hash curto de um parágrafo, usado para alinhar versões de um documento"""
+    return hashlib.sha256(paragraph.strip().encode('utf-8')).hexdigest()[:16]
+
+
+def match_previous_chunks(paragraph_hashes, previous_chunks):
+    """Localiza, em ordem, as partes anteriores que reaparecem intactas no novo texto.
+
+    Args:
+        paragraph_hashes: hashes dos parágrafos do novo documento
+        previous_chunks: entradas concluídas do manifesto anterior (com 'paragraph_hashes')
+
+    Returns:
+        list: tuplas (início, fim, entrada) com intervalos de parágrafos do novo
+        documento, sem sobreposição e em ordem crescente
+    """
+    # Posições de cada hash no novo documento, para ancorar as partes antigas
+    positions = {}
+    for i, h in enumerate(paragraph_hashes):
+        positions.setdefault(h, []).append(i)
+
+    matches = []
+    cursor = 0
+    for entry in previous_chunks:
+        hashes = entry.get('paragraph_hashes') or []
+        if not hashes:
+            continue
+        for start in positions.get(hashes[0], []):
+            if start < cursor:
+                continue
+            end = start + len(hashes)
+            if paragraph_hashes[start:end] == hashes:
+                matches.append((start, end, entry))
+                cursor = end
+                break
+    return matches
+
+
+class RunJournal:
+    """Manifesto de uma execução em partes, salvo em disco a cada mudança.
+
+    Registra o hash de cada parte de origem, o status do processamento e o
+    arquivo com a resposta formatada, para que uma execução interrompida ou com
+    falhas possa ser retomada sem reenviar as partes já concluídas.
+    """
+
+    def __init__(self, path, document_hash, model):
+        self.path = Path(path)
+        self.document_hash = document_hash
+        self.model = model
+        self.status = 'running'
+        self.chunks = []
+        self.created = datetime.now().isoformat(timespec='seconds')
+        self._previous = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path):
+        """Carrega um manifesto existente ou retorna None se não houver um válido"""
+        path = Path(path)
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        journal = cls(path, data.get('document_hash'), data.get('model'))
+        journal.status = data.get('status', 'unknown')
+        journal.chunks = data.get('chunks', [])
+        journal.created = data.get('created', journal.created)
+        return journal
+
+    def start(self, chunks, previous=None):
+        """Registra as partes da execução atual, aproveitando um manifesto anterior"""
+        with self._lock:
+            self.chunks = [
+                {
+                    'index': i,
+                    'source_hash': text_hash(chunk),
+                    'words': len(chunk.split()),
+                    'paragraph_hashes': [paragraph_hash(p) for p in chunk.split('\n\n')],
+                    'status': 'pending',
+                    'output_file': None,
+                    'output_hash': None,
+                }
+                for i, chunk in enumerate(chunks)
+            ]
+            # Partes concluídas na execução anterior, indexadas pelo hash de origem
+            self._previous = {}
+            if previous is not None and previous.model == self.model:
+                for entry in previous.chunks:
+                    if entry.get('status') == 'done':
+                        self._previous[entry['source_hash']] = entry
+            self.status = 'running'
+        self.save()
+
+    def reusable_output(self, index):
+        """Retorna a resposta já paga para esta parte, se existir e estiver íntegra"""
+        entry = self._previous.get(self.chunks[index]['source_hash'])
+        if not entry or not entry.get('output_file'):
+            return None
+        try:
+            with open(entry['output_file'], 'r', encoding='utf-8') as f:
+                output = f.read()
+        except OSError:
+            return None
+        if not output.strip() or text_hash(output) != entry.get('output_hash'):
+            return None
+        return output
+
+    def mark_done(self, index, output_file, output, metrics=None):
+        with self._lock:
+            entry = self.chunks[index]
+            entry['status'] = 'done'
+            entry['output_file'] = str(output_file)
+            entry['output_hash'] = text_hash(output)
+            entry.pop('error', None)
+            if metrics:
+                entry.setdefault('metrics', {}).update(metrics)
+        self.save()
+
+    def mark_failed(self, index, error=''):
+        with self._lock:
+            self.chunks[index]['status'] = 'failed'
+            self.chunks[index]['error'] = str(error)
+        self.save()
+
+    def finish(self, status):
+        with self._lock:
+            self.status = status
+        self.save()
+
+    def metric_total(self, name):
+        """Soma de uma métrica numérica registrada nas partes"""
+        return sum(entry.get('metrics', {}).get(name, 0) for entry in self.chunks)
+
+    def counts(self):
+        """Quantidade de partes por status"""
+        result = {}
+        for entry in self.chunks:
+            result[entry['status']] = result.get(entry['status'], 0) + 1
+        return result
+
+    def save(self):
+        """Grava o manifesto de forma atômica (arquivo temporário + replace)"""
+        with self._lock:
+            data = {
+                'document_hash': self.document_hash,
+                'model': self.model,
+                'status': self.status,
+                'created': self.created,
+                'updated': datetime.now().isoformat(timespec='seconds'),
+                'chunks': self.chunks,
+            }
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(f"{self.path.name}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,105 @@
+import re
+
+SEAM_MARKER = "=====FRONTEIRA-ENTRE-PARTES====="
+
+_FENCE = re.compile(r'^\s{0,3}(`{3,}|~{3,})')
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+
+def split_markdown_blocks(text):
+    """Divide um texto Markdown em blocos separados por linhas em branco.
+
+    Linhas em branco dentro de blocos de código não separam blocos.
+    """
+    blocks = []
+    current = []
+    fence = None
+    for line in text.split('\n'):
+        match = _FENCE.match(line)
+        if fence:
+            current.append(line)
+            if match and match.group(1)[0] == fence[0]:
+                fence = None
+            continue
+        if match:
+            fence = match.group(1)
+            current.append(line)
+            continue
+        if line.strip():
+            current.append(line)
+        elif current:
+            blocks.append('\n'.join(current))
+            current = []
+    if current:
+        blocks.append('\n'.join(current))
+    return blocks
+
+
+def plain_words(text):
+    """Palavras de um texto, ignorando a sintaxe Markdown"""
+    return _WORD.findall(text.replace('_', ' '))
+
+
+class SeamPlan:
+    """Janelas de parágrafos em torno de cada fronteira entre partes formatadas.
+
+    Cada parte contribui com seus primeiros N blocos para a fronteira anterior e
+    com os últimos N para a seguinte, sem que as duas janelas se sobreponham.
+    """
+
+    def __init__(self, formatted_chunks, window=3):
+        self.blocks = [split_markdown_blocks(chunk) for chunk in formatted_chunks]
+        total = len(self.blocks)
+        self.head_sizes = []
+        self.tail_sizes = []
+        for i, blocks in enumerate(self.blocks):
+            has_head = i > 0
+            has_tail = i < total - 1
+            available = len(blocks)
+            if has_head and has_tail:
+                head = min(window, available // 2)
+                tail = min(window, available - head)
+            else:
+                head = min(window, available) if has_head else 0
+                tail = min(window, available) if has_tail else 0
+            self.head_sizes.append(head)
+            self.tail_sizes.append(tail)
+
+    def seams(self):
+        """Lista de tuplas (índice, fim da parte i, início da parte i+1)"""
+        result = []
+        for i in range(len(self.blocks) - 1):
+            tail_size = self.tail_sizes[i]
+            head_size = self.head_sizes[i + 1]
+            if not tail_size or not head_size:
+                continue
+            tail = '\n\n'.join(self.blocks[i][-tail_size:])
+            head = '\n\n'.join(self.blocks[i + 1][:head_size])
+            result.append((i, tail, head))
+        return result
+
+    def splice(self, fixes):
+        """Recompõe as partes substituindo as janelas corrigidas
+
+        Args:
+            fixes: dicionário índice da fronteira -> (novo fim da parte i, novo início da parte i+1)
+
+        Returns:
+            list: partes formatadas com as fronteiras reconciliadas
+        """
+        chunks = []
+        for i, blocks in enumerate(self.blocks):
+            head_size = self.head_sizes[i]
+            tail_size = self.tail_sizes[i]
+            middle = blocks[head_size:len(blocks) - tail_size]
+
+            parts = []
+            if head_size:
+                head_fix = fixes.get(i - 1)
+                parts.append(head_fix[1] if head_fix else '\n\n'.join(blocks[:head_size]))
+            parts.extend(middle)
+            if tail_size:
+                tail_fix = fixes.get(i)
+                parts.append(tail_fix[0] if tail_fix else '\n\n'.join(blocks[len(blocks) - tail_size:]))
+            chunks.append('\n\n'.join(part for part in parts if part.strip()))
+        return chunks
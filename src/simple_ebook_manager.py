@@ -1,54 +1,81 @@
 import os
+import json
 import re
 import time
-import yaml
-import anthropic
 from pathlib import Path
 from datetime import datetime
-from rich.console import Console
-from rich.progress import Progress
-from rich.panel import Panel
 import shutil
 import sys
+import threading
+import hashlib
+from itertools import chain, islice
+from contextlib import nullcontext
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 
 # Configurar caminhos para encontrar módulos na estrutura existente
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Tente importar bibliotecas opcionais com tratamento de erros mais robusto
-DOCX2TXT_AVAILABLE = False
-PYPANDOC_AVAILABLE = False
-DOCX_AVAILABLE = False
-
-try:
-    import docx2txt
-    DOCX2TXT_AVAILABLE = True
-except ImportError:
-    pass
-
-try:
-    import pypandoc
-    PYPANDOC_AVAILABLE = True
-except ImportError:
-    pass
-
-try:
-    from docx import Document
-    DOCX_AVAILABLE = True
-except ImportError:
-    pass
-
-# Importando frontmatter apenas para verificar se está disponível
-FRONTMATTER_AVAILABLE = False
-try:
-    import frontmatter
-    FRONTMATTER_AVAILABLE = True
-except ImportError:
-    pass
-
-console = Console()
+from src.chunk_cache import ChunkCache
+from src.chunk_planner import ChunkPlanner, TokenEstimator, model_output_limit, prompt_cache_min_tokens
+from src.markdown_normalizer import MarkdownNormalizer, normalize_markdown
+from src.seams import SeamPlan, SEAM_MARKER, plain_words
+from src.content_verifier import markdown_words, verify_content
+from src.edit_script import EDIT_SCRIPT_INSTRUCTIONS, apply_edit_script, number_lines
+from src.formatting_examples import EDIT_SCRIPT_EXAMPLES, FORMATTING_EXAMPLES
+from src.run_journal import RunJournal, text_hash, paragraph_hash, match_previous_chunks
+from src.toolchain import Toolchain
+from src.local_formatter import LocalFormatter, LocalFormatResult, heading_regex
+from src.docx_reader import DocxReader, read_docx_markdown
+from src.document_index import DocumentIndex
+from src.heading_inference import infer_headings
+from src.stream_sink import StreamSink, ThrottledProgress, WordCounter
+from src.rate_limiter import RateLimiter
+from src.latency import LatencyTracker, StreamCancelled, StreamControl, StreamStalled
+from src.model_router import DEFAULT_MAX_COMPLEXITY, ModelRouter, chunk_complexity
+from src.streaming import detect_encoding, file_size_mb, iter_text_paragraphs
+from src.lazy_imports import LazyConsole, optional_import
+
+# Bibliotecas pesadas (anthropic, yaml, rich, pypandoc, docx2txt, python-docx) são
+# importadas apenas quando usadas; as opcionais resultam em None se não instaladas
+console = LazyConsole()
+
+OUTPUT_FORMATS = ('epub', 'pdf', 'html')
+
+
+def needs_api(config, streaming=False):
+    """Indica se o formatador ou a verificação de consistência configurados usam a API
+    
+    O modo streaming sempre formata com a IA.
+    """
+    formatting = (config or {}).get('formatting') or {}
+    return (streaming or formatting.get('formatter', 'ai') != 'local'
+            or formatting.get('consistency_pass', 'local') in ('llm', 'seams'))
+
+
+def read_config(config_path='config.yaml', base_dir=None):
+    """Lê o arquivo de configuração YAML
+    
+    O caminho informado é usado se existir; senão, é tomado relativo à raiz do projeto.
+    
+    Returns:
+        tuple: (configuração ou None se o arquivo não existir, caminho do arquivo)
+    """
+    if os.path.exists(config_path):
+        config_file = config_path
+    else:
+        base_dir = base_dir or Path(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        config_file = Path(base_dir) / config_path
+    if not os.path.exists(config_file):
+        return None, config_file
+    
+    import yaml
+    
+    with open(config_file, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f) or {}, config_file
+
 
 class SimpleEbookManager:
-    def __init__(self, config_path='config.yaml'):
+    def __init__(self, config_path='config.yaml', use_cache=True, refresh_cache=False):
         """Inicializa o gerenciador de ebooks com configurações"""
         # Configuração de diretórios usando a estrutura existente
         self.base_dir = Path(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -59,13 +86,32 @@ class SimpleEbookManager:
         self.src_dir = self.base_dir / "src"
         self.styles_dir = self.src_dir / "styles"
         self.templates_dir = self.src_dir / "templates"
+        self.cache_dir = self.base_dir / "cache"
         
         # Verificando se os diretórios necessários existem
         self._ensure_directories()
         
         # Carregando configurações e configurando o cliente
         self.load_config(config_path)
-        self.setup_anthropic_client()
+        # O cliente da API só é criado quando uma parte precisa realmente ser enviada à IA
+        self._client = None
+        self._client_lock = threading.Lock()
+        self.setup_cache(use_cache, refresh_cache)
+        self.toolchain = Toolchain(self.cache_dir / "toolchain.json", os.environ.get('PYPANDOC_PANDOC'))
+        self._token_estimators = {}
+        self.token_usage = {'requests': 0, 'input_tokens': 0, 'output_tokens': 0,
+                            'cache_creation_input_tokens': 0, 'cache_read_input_tokens': 0}
+        self._usage_lock = threading.Lock()
+        # Semáforo opcional que limita as requisições simultâneas entre processos (modo batch)
+        self.request_limiter = None
+        # No modo batch, os nomes de saída levam um hash do arquivo de entrada (títulos podem se repetir)
+        self.unique_output_names = False
+        # Ritmo das requisições pelos limites informados pela API, compartilhado entre processos
+        self.rate_limiter = RateLimiter(self.cache_dir / "rate_limit.json")
+        # Latências das requisições, para detectar travamentos e decidir o hedging
+        self.latency = LatencyTracker()
+        # Partes simples vão para um modelo mais rápido (ai.routing)
+        self.model_router = self._create_model_router()
         self.log_file = self.logs_dir / f"simple_ebook_manager_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
         self.log_message("Inicialização do SimpleEbookManager")
         
@@ -98,16 +144,12 @@ class SimpleEbookManager:
     def load_config(self, config_path):
         """Carrega configurações do arquivo YAML"""
         try:
-            # Primeiro, tenta o caminho fornecido
-            if os.path.exists(config_path):
-                config_file = config_path
-            else:
-                # Tenta o caminho relativo à raiz do projeto
-                config_file = self.base_dir / config_path
-                
-            if os.path.exists(config_file):
-                with open(config_file, 'r', encoding='utf-8') as f:
-                    self.config = yaml.safe_load(f)
+            config, config_file = read_config(config_path, self.base_dir)
+            
+            import yaml
+            
+            if config is not None:
+                self.config = config
                 console.print(f"[bold green]✓ Configurações carregadas de {config_file}[/bold green]")
             else:
                 # Configuração padrão se o arquivo não existir
@@ -121,7 +163,8 @@ class SimpleEbookManager:
                     "ai": {
                         "model": "claude-3-opus-20240229",
                         "temperature": 0.1,
-                        "max_tokens": 4000
+                        "max_tokens": 4000,
+                        "concurrency": 4
                     },
                     "formatting": {
                         "word_count_tolerance": 5
@@ -141,22 +184,66 @@ class SimpleEbookManager:
             }
             self.log_message(f"Erro ao carregar configurações: {str(e)}", "ERROR")
     
+    @property
+    def client(self):
+        """Cliente da API Anthropic, criado no primeiro uso (a chave já foi obtida em process_document)"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self.setup_anthropic_client()
+        return self._client
+    
     def setup_anthropic_client(self):
         """Configura o cliente da API Anthropic"""
         try:
-            api_key = os.environ.get("ANTHROPIC_API_KEY")
-            if not api_key:
-                console.print("[bold yellow]⚠ Aviso: ANTHROPIC_API_KEY não encontrada no ambiente[/bold yellow]")
-                api_key = console.input("[bold]Por favor, forneça sua chave API agora: [/bold]")
-                os.environ["ANTHROPIC_API_KEY"] = api_key
+            import anthropic
             
-            self.client = anthropic.Anthropic(api_key=api_key)
+            api_key = self._resolve_api_key()
+            self._client = anthropic.Anthropic(api_key=api_key)
             console.print("[bold green]✓ Cliente Anthropic configurado com sucesso[/bold green]")
         except Exception as e:
             console.print(f"[bold red]✘ Erro ao configurar cliente Anthropic:[/bold red] {str(e)}")
             self.log_message(f"Erro ao configurar cliente Anthropic: {str(e)}", "ERROR")
             raise
     
+    @staticmethod
+    def _resolve_api_key():
+        """Chave da API do ambiente; se ausente, é solicitada ao usuário e guardada no ambiente"""
+        api_key = os.environ.get("ANTHROPIC_API_KEY")
+        if not api_key:
+            console.print("[bold yellow]⚠ Aviso: ANTHROPIC_API_KEY não encontrada no ambiente[/bold yellow]")
+            api_key = console.input("[bold]Por favor, forneça sua chave API agora: [/bold]")
+            os.environ["ANTHROPIC_API_KEY"] = api_key
+        return api_key
+    
+    def _needs_api(self, streaming=False):
+        """Indica se o formatador ou a verificação de consistência configurados usam a API"""
+        return needs_api(self.config, streaming)
+    
+    def setup_cache(self, use_cache=True, refresh_cache=False):
+        """Configura o cache em disco das respostas da IA"""
+        cache_config = self.config.get('cache', {}) or {}
+        enabled = use_cache and cache_config.get('enabled', True)
+        self.cache = ChunkCache(
+            self.base_dir / cache_config.get('dir', 'cache'),
+            max_size_mb=cache_config.get('max_size_mb', 500),
+            enabled=enabled,
+            refresh=refresh_cache
+        )
+        if not enabled:
+            console.print("[yellow]⚠ Cache de respostas desativado[/yellow]")
+        elif refresh_cache:
+            console.print("[blue]ℹ Cache será atualizado: todas as partes serão reenviadas à IA[/blue]")
+    
+    def _report_cache_stats(self):
+        """Exibe e registra os contadores de uso do cache"""
+        if not self.cache.enabled:
+            return
+        stats = self.cache.stats()
+        console.print(f"[blue]ℹ Cache:[/blue] {stats['hits']} acertos, {stats['misses']} falhas, "
+                      f"{stats['writes']} gravações, {stats['evictions']} remoções")
+        self.log_message(f"Estatísticas do cache: {stats}")
+    
     def log_message(self, message, level="INFO"):
         """Registra uma mensagem no arquivo de log"""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -167,7 +254,8 @@ class SimpleEbookManager:
             console.print(f"[yellow]⚠ Erro ao escrever no log: {str(e)}[/yellow]")
     
     def process_document(self, filepath, title=None, author=None, output_format='epub', 
-                         output_file=None, headings_pattern=None):
+                         output_file=None, headings_pattern=None, resume=False, incremental=False,
+                         consistency_pass=None, protocol=None, formatter=None, stream=None):
         """
         Processa um documento DOCX e o converte em um ebook formatado
         
@@ -175,9 +263,15 @@ class SimpleEbookManager:
             filepath: Caminho para o arquivo a ser processado
             title: Título do ebook (opcional)
             author: Autor do ebook (opcional)
-            output_format: Formato de saída (epub, pdf, html)
+            output_format: Formato de saída (epub, pdf, html), lista separada por vírgulas ou all
             output_file: Caminho para o arquivo de saída (opcional)
             headings_pattern: Padrão regex para identificar títulos (opcional)
+            resume: Retoma uma execução interrompida do mesmo documento, com as mesmas partes
+            incremental: Reformata apenas os trechos alterados desde a última versão do documento
+            consistency_pass: Verificação final de consistência (local, seams, llm ou off)
+            protocol: Protocolo de resposta da IA (markdown ou edit_script)
+            formatter: Formatador (ai, hybrid ou local)
+            stream: Processa em streaming, com memória limitada (None decide pelo tamanho do arquivo)
             
         Returns:
             bool: True se processado com sucesso, False caso contrário
@@ -185,45 +279,76 @@ class SimpleEbookManager:
         console.print(f"\n[bold cyan]Processando documento:[/bold cyan] {filepath}")
         self.log_message(f"Iniciando processamento do documento: {filepath}")
         
+        if consistency_pass:
+            self.config.setdefault('formatting', {})['consistency_pass'] = consistency_pass
+        if protocol:
+            self.config.setdefault('formatting', {})['protocol'] = protocol
+        if formatter:
+            self.config.setdefault('formatting', {})['formatter'] = formatter
+        
         try:
             # 1. Verificar se o arquivo existe
             if not os.path.exists(filepath):
                 console.print(f"[bold red]✘ Arquivo não encontrado:[/bold red] {filepath}")
                 return False
-                
-            # 2. Extrair texto do documento
-            document_text = self._extract_text_from_document(filepath)
-            if not document_text:
-                return False
-                
-            # 3. Extrair metadados do documento (se não fornecidos)
-            document_info = self._extract_document_info(filepath, document_text, title, author)
             
-            # 4. Formatar o documento com IA
-            formatted_text = self._format_document_with_ai(document_text, document_info, headings_pattern)
-            if not formatted_text:
-                return False
+            # A chave é obtida antes do processamento: as partes são enviadas em threads,
+            # com a barra de progresso ativa, onde não é possível pedi-la ao usuário
+            streaming = self._use_streaming(filepath, stream)
+            if self._needs_api(streaming):
+                self._resolve_api_key()
                 
-            # 5. Salvar o documento formatado em Markdown
-            markdown_filepath = self._save_formatted_markdown(formatted_text, document_info)
-            if not markdown_filepath:
-                return False
-                
-            # 6. Gerar o ebook no formato solicitado
-            if output_file:
-                # Se o caminho de saída for absoluto, use-o diretamente
-                if os.path.isabs(output_file):
-                    output_path = output_file
-                else:
-                    # Se for relativo, considere-o relativo ao diretório output/formato
-                    output_path = str(self.output_dir / output_format / os.path.basename(output_file))
+            if streaming:
+                # 2-5. Ler, formatar e gravar o Markdown parte a parte, sem o documento inteiro em memória
+                markdown_filepath, document_info = self._process_document_streaming(
+                    filepath, title, author, headings_pattern)
+                self._report_cache_stats()
+                self._report_token_usage()
+                if not markdown_filepath:
+                    return False
             else:
-                sanitized_title = re.sub(r'[^\w\s-]', '', document_info['title']).replace(' ', '_').lower()
-                output_path = str(self.output_dir / output_format / f"{sanitized_title}.{output_format}")
+                # 2. Extrair texto do documento
+                document_text = self._extract_text_from_document(filepath)
+                if not document_text:
+                    return False
+                    
+                # 3. Extrair metadados do documento (se não fornecidos)
+                document_info = self._extract_document_info(filepath, document_text, title, author)
+                document_index = self._build_document_index(document_text, headings_pattern)
+                headings_pattern = self._infer_headings(document_index, document_info, headings_pattern)
                 
-            success = self._generate_ebook(markdown_filepath, output_path, output_format, document_info)
+                # 4. Formatar o documento com IA
+                formatted_text = self._format_document(document_text, document_info, headings_pattern,
+                                                       resume=resume, incremental=incremental,
+                                                       document_index=document_index)
+                self._report_cache_stats()
+                self._report_token_usage()
+                if not formatted_text:
+                    return False
+                    
+                # 5. Salvar o documento formatado em Markdown
+                markdown_filepath = self._save_formatted_markdown(formatted_text, document_info)
+                if not markdown_filepath:
+                    return False
+                    
+            # 6. Gerar o ebook nos formatos solicitados
+            output_formats = self._resolve_output_formats(output_format)
+            output_paths = {
+                fmt: self._output_path(fmt, document_info, output_file, multiple=len(output_formats) > 1)
+                for fmt in output_formats
+            }
+            
+            if len(output_formats) == 1:
+                fmt = output_formats[0]
+                results = {fmt: self._generate_ebook(markdown_filepath, output_paths[fmt], fmt, document_info)}
+            else:
+                results = self._generate_ebooks(markdown_filepath, output_paths, document_info)
             
-            if success:
+            for fmt, success in results.items():
+                if not success:
+                    console.print(f"[bold red]✘ Falha ao gerar ebook em {fmt}[/bold red]")
+                    continue
+                output_path = output_paths[fmt]
                 console.print(f"[bold green]✓ Ebook gerado com sucesso:[/bold green] {output_path}")
                 # Copiar o arquivo para o diretório atual para facilitar o acesso
                 try:
@@ -233,10 +358,7 @@ class SimpleEbookManager:
                     console.print(f"[blue]ℹ Arquivo copiado para diretório atual:[/blue] {current_dir_copy}")
                 except Exception as e:
                     console.print(f"[yellow]⚠ Não foi possível copiar para o diretório atual: {str(e)}[/yellow]")
-                return True
-            else:
-                console.print("[bold red]✘ Falha ao gerar ebook[/bold red]")
-                return False
+            return all(results.values())
                 
         except Exception as e:
             console.print(f"[bold red]✘ Erro durante o processamento:[/bold red] {str(e)}")
@@ -256,8 +378,21 @@ class SimpleEbookManager:
             
             content = ""
             if file_ext == '.docx':
+                docx2txt = optional_import('docx2txt')
+                docx = optional_import('docx')
+                # Leitor próprio em streaming: preserva títulos, listas e tabelas como Markdown
+                try:
+                    content, stats = read_docx_markdown(filepath)
+                    console.print(f"[green]✓ Arquivo DOCX lido com estrutura preservada[/green] "
+                                  f"({stats['headings']} títulos, {stats['list_items']} itens de lista, "
+                                  f"{stats['tables']} tabelas)")
+                    self.log_message(f"DOCX lido em streaming: {stats}")
+                except Exception as e:
+                    console.print(f"[yellow]⚠ Erro ao ler o DOCX em streaming: {str(e)}. Tentando outro método...[/yellow]")
+                    content = ""
+                
                 # Tenta vários métodos para processar o DOCX
-                if DOCX2TXT_AVAILABLE:
+                if not content and docx2txt:
                     try:
                         content = docx2txt.process(filepath)
                         console.print("[green]✓ Arquivo DOCX processado com docx2txt[/green]")
@@ -266,9 +401,9 @@ class SimpleEbookManager:
                         content = ""
                 
                 # Se docx2txt falhou ou não está disponível, tenta python-docx
-                if not content and DOCX_AVAILABLE:
+                if not content and docx:
                     try:
-                        doc = Document(filepath)
+                        doc = docx.Document(filepath)
                         content = "\n".join([para.text for para in doc.paragraphs])
                         console.print("[green]✓ Arquivo DOCX processado com python-docx[/green]")
                     except Exception as e:
@@ -277,9 +412,10 @@ class SimpleEbookManager:
                 
                 # Se nenhum método funcionou
                 if not content:
-                    if not DOCX2TXT_AVAILABLE and not DOCX_AVAILABLE:
-                        console.print("[bold red]✘ Erro: Instale docx2txt ou python-docx para processar arquivos DOCX[/bold red]")
-                        console.print("[blue]pip install docx2txt[/blue] ou [blue]pip install python-docx[/blue]")
+                    if not docx2txt and not docx:
+                        console.print("[bold red]✘ Não foi possível ler o arquivo DOCX[/bold red]")
+                        console.print("[blue]ℹ Como alternativa, instale[/blue] [blue]pip install docx2txt[/blue] "
+                                      "ou [blue]pip install python-docx[/blue]")
                         return None
                     else:
                         console.print("[bold red]✘ Não foi possível processar o arquivo DOCX com os métodos disponíveis[/bold red]")
@@ -315,9 +451,6 @@ class SimpleEbookManager:
                 console.print("[bold red]✘ Arquivo vazio ou não foi possível extrair o conteúdo[/bold red]")
                 return None
                 
-            word_count = len(content.split())
-            console.print(f"[green]✓ Texto extraído com sucesso:[/green] {word_count} palavras")
-            self.log_message(f"Texto extraído com sucesso: {word_count} palavras")
             return content
                 
         except Exception as e:
@@ -331,13 +464,15 @@ class SimpleEbookManager:
             'title': title or self.config['ebook'].get('title', 'Ebook'),
             'author': author or self.config['ebook'].get('author', ''),
             'language': self.config['ebook'].get('language', 'pt-BR'),
-            'date': datetime.now().strftime('%Y-%m-%d')
+            'date': datetime.now().strftime('%Y-%m-%d'),
+            'source': os.path.abspath(filepath)
         }
         
         # Se o título não foi fornecido, tenta extrair do documento
         if not title:
             # Tenta extrair o título da primeira linha ou do nome do arquivo
-            first_line = document_text.split('\n', 1)[0].strip()
+            # Títulos já em Markdown (leitor de DOCX) chegam como "# Título"
+            first_line = document_text.split('\n', 1)[0].strip().lstrip('#').strip()
             if first_line and len(first_line) < 100:  # Verifica se a primeira linha parece um título
                 info['title'] = first_line
             else:
@@ -352,136 +487,152 @@ class SimpleEbookManager:
         
         return info
     
-    def _format_document_with_ai(self, document_text, document_info, headings_pattern=None):
+    def _build_document_index(self, document_text, headings_pattern=None):
+        """Indexa parágrafos, palavras e títulos do texto extraído em uma única passada"""
+        start_time = time.perf_counter()
+        document_index = DocumentIndex(document_text, headings_pattern)
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        console.print(f"[green]✓ Texto extraído com sucesso:[/green] {document_index.word_count} palavras "
+                      f"({len(document_index)} parágrafos, {document_index.heading_count()} títulos, "
+                      f"indexados em {elapsed_ms:.0f} ms)")
+        self.log_message(f"Texto extraído com sucesso: {document_index.word_count} palavras, "
+                         f"{len(document_index)} parágrafos")
+        return document_index
+    
+    def _infer_headings(self, document_index, document_info, headings_pattern=None):
+        """Infere os títulos quando nenhum padrão foi informado (formatting.infer_headings)
+        
+        Os títulos inferidos passam a definir as fronteiras das partes no índice, e
+        exemplos deles vão para o prompt. Returns: o padrão de títulos a usar.
+        """
+        if headings_pattern or not self.config.get('formatting', {}).get('infer_headings', True):
+            return headings_pattern
+        start_time = time.perf_counter()
+        inferred = infer_headings(document_index.paragraphs(), document_index.words)
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        if not inferred:
+            console.print(f"[blue]ℹ Nenhum padrão de títulos inferido ({elapsed_ms:.0f} ms); "
+                          f"usando os padrões comuns[/blue]")
+            return None
+        
+        document_index.set_headings(inferred.levels)
+        document_info['inferred_headings'] = inferred.examples
+        console.print(f"[green]✓ Títulos inferidos em {elapsed_ms:.0f} ms:[/green] {len(inferred.levels)} títulos "
+                      f"({inferred.describe()})")
+        self.log_message(f"Títulos inferidos: {inferred.describe()}; padrão: {inferred.pattern}")
+        return inferred.pattern
+    
+    def _formatter_mode(self):
+        """Formatador: ai (tudo pela IA), hybrid (regras locais + IA nos trechos ambíguos) ou local"""
+        return self.config.get('formatting', {}).get('formatter', 'ai')
+    
+    def _format_document(self, document_text, document_info, headings_pattern=None, resume=False,
+                         incremental=False, document_index=None):
+        """Formata o documento conforme o formatador configurado"""
+        if document_index is None:
+            document_index = DocumentIndex(document_text, headings_pattern)
+        mode = self._formatter_mode()
+        if mode == 'ai':
+            return self._format_document_with_ai(document_text, document_info, headings_pattern,
+                                                 resume=resume, incremental=incremental,
+                                                 document_index=document_index)
+        
+        console.print("[cyan]ℹ Aplicando regras locais de formatação...[/cyan]")
+        start_time = time.perf_counter()
+        # Os níveis vêm do índice: padrões comuns, padrão informado ou famílias inferidas
+        outline_levels = document_index.outline_levels()
+        result = LocalFormatter(headings_pattern).format(
+            document_index.paragraphs(), [outline_levels.get(level, 0) for level in document_index.levels]
+        )
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        console.print(f"[blue]ℹ {result.local_share:.0%} do texto formatado localmente "
+                      f"({result.local_words} de {result.total_words} palavras, {elapsed_ms:.0f} ms); "
+                      f"{result.ambiguous_count} trechos ambíguos[/blue]")
+        self.log_message(f"Formatador {mode}: {result.local_words} de {result.total_words} palavras "
+                         f"formatadas localmente, {result.ambiguous_count} trechos ambíguos")
+        
+        # As regras usam # apenas para o título do documento; repetições são removidas na normalização
+        title_heading = f"# {document_info['title']}\n\n"
+        if mode == 'local' or not result.ambiguous_count:
+            # Sem IA: os trechos ambíguos são mantidos como parágrafos comuns
+            return self._normalize_markdown(title_heading + result.render(), document_info)
+        
+        # Apenas os trechos ambíguos vão para a IA; os já formatados viram marcadores [[LOCAL-N]]
+        ai_text, local_blocks, sources = result.placeholder_text()
+        # O índice do texto com marcadores herda os níveis e textos dos títulos do documento,
+        # para que a estrutura e o contexto de cada parte continuem disponíveis para a IA
+        ai_index = document_index.derived(ai_text, sources)
+        if ai_index is None:
+            self.log_message("Índice do texto com marcadores não corresponde ao documento; "
+                             "títulos recalculados", "WARNING")
+        formatted = self._format_document_with_ai(ai_text, document_info, headings_pattern,
+                                                  resume=resume, incremental=incremental,
+                                                  document_index=ai_index)
+        if not formatted:
+            return None
+        merged, missing = LocalFormatResult.restore(formatted, local_blocks)
+        if missing:
+            console.print(f"[yellow]⚠ {missing} marcadores de trechos locais perdidos pela IA foram reinseridos[/yellow]")
+            self.log_message(f"{missing} marcadores [[LOCAL-N]] reinseridos", "WARNING")
+        return self._normalize_markdown(title_heading + merged, document_info)
+    
+    def _format_document_with_ai(self, document_text, document_info, headings_pattern=None, resume=False,
+                                 incremental=False, document_index=None):
         """Formata o documento usando IA"""
         console.print("[cyan]ℹ Formatando documento com IA...[/cyan]")
+        if document_index is None:
+            document_index = DocumentIndex(document_text, headings_pattern)
         
         # Verifica o tamanho do documento
-        word_count = len(document_text.split())
+        word_count = document_index.word_count
         console.print(f"[blue]ℹ Documento com aproximadamente {word_count} palavras[/blue]")
         
-        # Para documentos muito grandes, dividimos em chunks
-        max_chunk_size = 4000  # REDUZIDO: aproximadamente palavras por chunk (ajustado para o modelo)
+        # O tamanho das partes é definido pelo orçamento real de tokens de saída do modelo
+        planner = ChunkPlanner(
+            self._token_estimator(),
+            self._output_token_budget(),
+            safety_margin=self.config['ai'].get('chunk_safety_margin', 0.85)
+        )
+        console.print(f"[blue]ℹ Orçamento de saída: {planner.output_budget} tokens por requisição "
+                      f"(~{planner.target_tokens} tokens de texto por parte)[/blue]")
         
-        if word_count > max_chunk_size:
+        if not planner.fits(document_text):
             console.print(f"[yellow]⚠ Documento grande ({word_count} palavras), será processado em partes[/yellow]")
-            return self._process_large_document(document_text, document_info, headings_pattern, max_chunk_size)
+            return self._process_large_document(document_index, document_info, headings_pattern, planner,
+                                                resume=resume, incremental=incremental)
         else:
             # Documentos menores são processados de uma vez
-            return self._format_content_chunk(document_text, document_info, headings_pattern)
+            return self._format_and_verify_chunk(document_text, document_info, headings_pattern)
     
-    def _process_large_document(self, document_text, document_info, headings_pattern, max_chunk_size):
+    def _process_large_document(self, document_index, document_info, headings_pattern, planner,
+                                resume=False, incremental=False):
         """Processa um documento grande dividindo-o em partes"""
-        # Verifica se documento está dividido em parágrafos
-        if '\n\n' in document_text:
-            # Dividir por parágrafos preserva melhor a estrutura
-            paragraphs = document_text.split('\n\n')
-        else:
-            # Se não houver paragrafação clara, divide por linhas
-            paragraphs = document_text.split('\n')
-            # Reagrupa linhas pequenas para formar "parágrafos"
-            new_paragraphs = []
-            current_paragraph = []
-            for line in paragraphs:
-                if len(line.strip()) < 3:  # linha vazia ou quase vazia
-                    if current_paragraph:
-                        new_paragraphs.append('\n'.join(current_paragraph))
-                        current_paragraph = []
-                else:
-                    current_paragraph.append(line)
-            if current_paragraph:
-                new_paragraphs.append('\n'.join(current_paragraph))
-            paragraphs = new_paragraphs
-        
-        # Tenta identificar possíveis títulos/cabeçalhos para melhor divisão
-        if headings_pattern:
-            pattern = re.compile(headings_pattern)
-        else:
-            # Padrões comuns de títulos
-            patterns = [
-                r'^(?:Capítulo|CAPÍTULO)\s+\d+',  # Capítulo 1, CAPÍTULO 2, etc.
-                r'^(?:Parte|PARTE)\s+\d+',  # Parte 1, PARTE 2, etc.
-                r'^\d+\.\s+[A-Z]',  # 1. TÍTULO, 2. CONCEITOS, etc.
-                r'^[IVX]+\.\s+',  # I. Título, IV. Conceitos, etc.
-            ]
-            pattern = re.compile('|'.join(f"({p})" for p in patterns))
-        
-        # NOVO: Calcula número mínimo de chunks e tamanho aproximado
-        total_words = len(document_text.split())
-        total_chunks = max(12, total_words // (max_chunk_size // 2))  # Forçar pelo menos 12 chunks
-        approx_chunk_size = total_words // total_chunks
-        
-        console.print(f"[blue]ℹ Documento será dividido em pelo menos {total_chunks} partes (~{approx_chunk_size} palavras por parte)[/blue]")
-        
-        chunks = []
-        current_chunk = []
-        current_size = 0
-        last_was_heading = False
-        
-        # Divide em chunks mantendo parágrafos inteiros e respeitando estrutura de títulos
-        for para in paragraphs:
-            para_size = len(para.split())
-            
-            # Verifica se é um título/cabeçalho
-            is_heading = pattern.search(para) if headings_pattern else any(re.search(p, para) for p in patterns)
-            
-            # Se é um título e já temos conteúdo suficiente, começamos um novo chunk
-            if is_heading and current_size > approx_chunk_size // 2 and current_chunk:
-                chunks.append('\n\n'.join(current_chunk))
-                current_chunk = [para]
-                current_size = para_size
-                last_was_heading = True
-            # Se estamos estourando o tamanho aproximado e não estamos logo após um título
-            elif current_size + para_size > approx_chunk_size and current_chunk and not last_was_heading:
-                chunks.append('\n\n'.join(current_chunk))
-                current_chunk = [para]
-                current_size = para_size
-                last_was_heading = is_heading
-            else:
-                current_chunk.append(para)
-                current_size += para_size
-                last_was_heading = is_heading
+        previous_journal = None
+        if resume or incremental:
+            previous_journal = self._load_previous_journal(document_info, other_versions=incremental)
         
-        # Adiciona o último chunk se houver conteúdo restante
-        if current_chunk:
-            chunks.append('\n\n'.join(current_chunk))
+        # --resume: mesmo documento, exatamente as mesmas partes da execução interrompida
+        spans = self._resume_chunks(document_index, previous_journal) if previous_journal else None
+        if spans is None and previous_journal is not None and not incremental:
+            console.print("[bold red]✘ O documento mudou desde a execução anterior.[/bold red] "
+                          "Use --incremental para reenviar apenas os trechos alterados")
+            self.log_message("Retomada cancelada: o documento mudou desde a execução anterior", "ERROR")
+            return None
+        if spans is None and previous_journal is not None:
+            # --incremental: as partes inalteradas mantêm as fronteiras anteriores e os
+            # trechos novos ou editados são divididos de novo
+            spans = self._align_chunks_with_previous(document_index, previous_journal, planner)
+        elif spans is None:
+            spans = self._split_into_chunks(document_index, planner)
+        chunks = [text for _, _, text in spans]
         
         console.print(f"[blue]ℹ Documento dividido em {len(chunks)} partes para processamento[/blue]")
         
-        formatted_chunks = []
-        
-        with Progress() as progress:
-            task = progress.add_task("[cyan]Processando partes do documento...", total=len(chunks))
-            
-            for i, chunk in enumerate(chunks):
-                # Adiciona contexto para o processamento das partes
-                context = {
-                    'part': i + 1,
-                    'total_parts': len(chunks),
-                    'is_first': i == 0,
-                    'is_last': i == len(chunks) - 1
-                }
-                
-                formatted_chunk = self._format_content_chunk(chunk, document_info, headings_pattern, context)
-                
-                if formatted_chunk:
-                    formatted_chunks.append(formatted_chunk)
-                    
-                    # NOVO: Salvar cada parte formatada individualmente para diagnóstico
-                    emergency_part_path = self.temp_dir / f"{document_info['title'].replace(' ', '_').lower()}_part_{i+1}.txt"
-                    with open(emergency_part_path, 'w', encoding='utf-8') as f:
-                        f.write(formatted_chunk)
-                    console.print(f"[blue]ℹ Parte {i+1} salva em:[/blue] {emergency_part_path}")
-                else:
-                    console.print(f"[bold red]✘ Erro ao processar parte {i+1}[/bold red]")
-                    self.log_message(f"Erro ao processar parte {i+1} do documento", "ERROR")
-                    return None
-                
-                progress.update(task, advance=1)
-                
-                # Pequena pausa para não sobrecarregar a API
-                if i < len(chunks) - 1:
-                    time.sleep(2)
+        formatted_chunks = self._format_chunks(chunks, document_info, headings_pattern,
+                                               previous_journal=previous_journal,
+                                               chunk_context=self._chunk_context(document_index, spans))
+        if formatted_chunks is None:
+            return None
         
         # NOVO: Adicionar informações de diagnóstico 
         console.print(f"[blue]ℹ Total de partes processadas: {len(formatted_chunks)}[/blue]")
@@ -492,7 +643,7 @@ class SimpleEbookManager:
         combined_content = '\n\n'.join(formatted_chunks)
         
         # NOVO: Salvar o conteúdo combinado antes da verificação de consistência
-        combined_backup_path = self.temp_dir / f"{document_info['title'].replace(' ', '_').lower()}_combined_raw.txt"
+        combined_backup_path = self.temp_dir / f"{self._file_stem(document_info)}_combined_raw.txt"
         with open(combined_backup_path, 'w', encoding='utf-8') as f:
             f.write(combined_content)
         console.print(f"[green]✓ Backup do conteúdo combinado salvo em:[/green] {combined_backup_path}")
@@ -500,41 +651,717 @@ class SimpleEbookManager:
         # Se necessário, podemos fazer um passe final para garantir consistência
         if len(chunks) > 1:
             console.print("[cyan]ℹ Verificando consistência da formatação...[/cyan]")
-            combined_content = self._ensure_formatting_consistency(combined_content, document_info)
+            combined_content = self._ensure_formatting_consistency(combined_content, document_info,
+                                                                   formatted_chunks)
             
         return combined_content
     
-    def _format_content_chunk(self, content, document_info, headings_pattern=None, context=None):
-        """Formata um trecho de conteúdo usando a IA"""
+    def _use_streaming(self, filepath, stream=None):
+        """Decide pelo modo streaming: opção --stream ou arquivo acima de formatting.streaming_min_mb"""
+        if stream is not None:
+            return stream
+        threshold = self.config.get('formatting', {}).get('streaming_min_mb')
+        if not threshold:
+            return False
+        size_mb = file_size_mb(filepath)
+        if size_mb < float(threshold):
+            return False
+        console.print(f"[blue]ℹ Arquivo com {size_mb:.0f} MB; usando o modo streaming "
+                      f"(formatting.streaming_min_mb = {threshold})[/blue]")
+        return True
+    
+    def _stream_paragraphs(self, filepath):
+        """Parágrafos do documento lidos sob demanda (DOCX, TXT ou MD)"""
+        file_ext = os.path.splitext(filepath)[1].lower()
+        if file_ext == '.docx':
+            return DocxReader(filepath).markdown_blocks()
+        if file_ext in ('.txt', '.md'):
+            encoding = detect_encoding(filepath)
+            if encoding != 'utf-8':
+                console.print(f"[yellow]⚠ Arquivo não está em UTF-8; lendo com codificação {encoding}[/yellow]")
+            return iter_text_paragraphs(filepath, encoding)
+        console.print(f"[bold red]✘ Formato de arquivo não suportado:[/bold red] {file_ext}")
+        console.print("[blue]Formatos suportados: .docx, .txt, .md[/blue]")
+        return None
+    
+    def _process_document_streaming(self, filepath, title=None, author=None, headings_pattern=None):
+        """Processa o documento em streaming, com memória limitada independente do tamanho
+        
+        Os parágrafos são lidos sob demanda, agrupados em partes pelo ChunkPlanner,
+        formatados com no máximo 2 × ai.concurrency partes em andamento e gravados
+        em ordem, já normalizados, direto no Markdown entregue ao Pandoc. Neste modo
+        não há manifesto de execução: a retomada vem do cache de respostas, com as
+        fronteiras das partes fixadas pelo plano salvo na primeira execução; o
+        formatador é sempre a IA e a consistência é apenas a normalização local.
+        
+        Returns:
+            tuple: (caminho do Markdown ou None, informações do documento)
+        """
+        console.print("[cyan]ℹ Modo streaming: o documento será lido, formatado e gravado parte a parte[/cyan]")
+        formatting_config = self.config.get('formatting', {}) or {}
+        if self._formatter_mode() != 'ai':
+            console.print(f"[yellow]⚠ O formatador {self._formatter_mode()} não é usado no modo streaming; "
+                          "formatando com IA[/yellow]")
+            formatting_config['formatter'] = 'ai'
+        if formatting_config.get('consistency_pass', 'local') not in ('local', 'off'):
+            console.print("[yellow]⚠ No modo streaming a consistência é verificada apenas pela "
+                          "normalização local[/yellow]")
+        
+        paragraphs = self._stream_paragraphs(filepath)
+        if paragraphs is None:
+            return None, None
+        first = next(paragraphs, None)
+        if first is None:
+            console.print("[bold red]✘ Arquivo vazio ou não foi possível extrair o conteúdo[/bold red]")
+            return None, None
+        
+        document_info = self._extract_document_info(filepath, first, title, author)
+        if not headings_pattern and formatting_config.get('infer_headings', True):
+            # A inferência usa uma amostra do início; só o padrão (não os títulos) vale para o resto
+            sample = [first] + list(islice(paragraphs, 5000))
+            inferred = infer_headings(sample)
+            if inferred.pattern:
+                headings_pattern = inferred.pattern
+                document_info['inferred_headings'] = inferred.examples
+                console.print(f"[green]✓ Títulos inferidos na amostra inicial:[/green] {inferred.describe()}")
+            paragraphs = chain(sample, paragraphs)
+        else:
+            paragraphs = chain([first], paragraphs)
+        markdown_filepath = self._format_streaming(paragraphs, document_info, headings_pattern)
+        return markdown_filepath, document_info
+    
+    def _streaming_plan_estimator(self, document_info):
+        """Estimador congelado que define as fronteiras das partes no modo streaming
+        
+        A calibração usada na primeira execução fica em temp/<documento>_stream_plan.json
+        e é reaplicada nas seguintes: com as mesmas fronteiras, as mesmas requisições
+        (número da parte e texto anterior incluídos) são servidas do cache de respostas,
+        mesmo que a calibração global tenha mudado. --refresh-cache refaz o plano.
+        """
+        estimator = self._token_estimator()
+        plan_path = self.temp_dir / f"{self._file_stem(document_info)}_stream_plan.json"
+        if plan_path.exists() and not self.cache.refresh:
+            try:
+                with open(plan_path, 'r', encoding='utf-8') as f:
+                    plan = json.load(f)
+                if plan.get('estimator') == estimator.model:
+                    console.print("[blue]ℹ Fronteiras das partes da execução anterior mantidas[/blue]")
+                    return TokenEstimator(estimator.model, chars_per_token=plan['chars_per_token'],
+                                          output_ratio=plan['output_ratio'])
+            except (OSError, ValueError, KeyError):
+                pass
+        frozen = estimator.snapshot()
+        try:
+            self.temp_dir.mkdir(exist_ok=True)
+            tmp_path = plan_path.with_name(f"{plan_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'estimator': frozen.model, 'chars_per_token': frozen.chars_per_token,
+                           'output_ratio': frozen.output_ratio}, f, indent=2)
+            os.replace(tmp_path, plan_path)
+        except OSError as e:
+            self.log_message(f"Não foi possível salvar o plano do streaming: {str(e)}", "WARNING")
+        return frozen
+    
+    def _format_streaming(self, paragraphs, document_info, headings_pattern=None):
+        """Formata as partes em uma janela limitada e as grava em ordem no Markdown final"""
+        planner = ChunkPlanner(
+            self._streaming_plan_estimator(document_info),
+            self._output_token_budget(),
+            safety_margin=self.config['ai'].get('chunk_safety_margin', 0.85)
+        )
+        pattern = heading_regex(headings_pattern)
+        read = {'words': 0}
+        
+        def counted(items):
+            for paragraph in items:
+                read['words'] += len(paragraph.split())
+                yield paragraph
+        
+        chunks = planner.iter_pack(counted(paragraphs), lambda para: pattern.search(para) is not None)
+        concurrency = self._get_concurrency()
+        window = concurrency * 2
+        console.print(f"[blue]ℹ Orçamento de saída: {planner.output_budget} tokens por requisição "
+                      f"(~{planner.target_tokens} tokens de texto por parte, até {window} partes em memória)[/blue]")
+        
+        self.temp_dir.mkdir(exist_ok=True)
+        markdown_filepath = self._markdown_filepath(document_info)
+        partial_path = markdown_filepath.with_name(f"{markdown_filepath.name}.partial")
+        normalizer = MarkdownNormalizer(document_info['title'])
+        totals = {'continuations': 0, 'words_inserted': 0, 'words_deleted': 0, 'verification_retries': 0}
+        pending = {}
+        written = 0
+        failed_part = None
+        start_time = time.perf_counter()
+        
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        try:
+            from rich.progress import Progress
+            
+            with open(partial_path, 'w', encoding='utf-8') as out, Progress() as progress:
+                task = progress.add_task("[cyan]Formatando em streaming...", total=None)
+                out.write(self._yaml_header(document_info))
+                submitted = 0
+                chunk = None
+                upcoming = next(chunks, None)
+                while upcoming is not None or pending:
+                    # Mantém a janela cheia; a parte seguinte é lida antes para saber se esta é a última
+                    while upcoming is not None and len(pending) < window and failed_part is None:
+                        previous_chunk, chunk, upcoming = chunk, upcoming, next(chunks, None)
+                        context = {'part': submitted + 1, 'total_parts': None,
+                                   'is_first': submitted == 0, 'is_last': upcoming is None,
+                                   'excerpt': self._preceding_excerpt(previous_chunk)}
+                        metrics = {}
+                        future = executor.submit(self._format_and_verify_chunk, chunk, document_info,
+                                                 headings_pattern, context, metrics)
+                        pending[submitted] = (future, metrics)
+                        submitted += 1
+                    if failed_part is not None or written not in pending:
+                        break
+                    
+                    future, metrics = pending.pop(written)
+                    try:
+                        formatted_chunk = future.result()
+                    except Exception as e:
+                        self.log_message(f"Erro inesperado na parte {written+1}: {str(e)}", "ERROR")
+                        formatted_chunk = None
+                    if not formatted_chunk:
+                        failed_part = written + 1
+                        break
+                    
+                    out.write(normalizer.feed(formatted_chunk.strip('\n') + '\n\n'))
+                    for name in totals:
+                        totals[name] += metrics.get(name, 0)
+                    written += 1
+                    progress.update(task, completed=written,
+                                    description=f"[cyan]Parte {written} gravada ({read['words']} palavras lidas)")
+                out.write(normalizer.finish())
+        except KeyboardInterrupt:
+            executor.shutdown(wait=False, cancel_futures=True)
+            console.print(f"\n[bold yellow]⚠ Processamento interrompido:[/bold yellow] {written} partes gravadas")
+            console.print("[blue]ℹ As partes já formatadas estão no cache; execute novamente para continuar[/blue]")
+            self.log_message("Processamento em streaming interrompido pelo usuário", "WARNING")
+            raise
+        
+        if failed_part is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+            console.print(f"[bold red]✘ Erro ao processar parte {failed_part}[/bold red]")
+            console.print("[blue]ℹ As partes já formatadas estão no cache; execute novamente para "
+                          "reenviar apenas as pendentes[/blue]")
+            self.log_message(f"Erro ao processar parte {failed_part} do documento em streaming", "ERROR")
+            return None
+        executor.shutdown(wait=True)
+        os.replace(partial_path, markdown_filepath)
+        
+        elapsed = time.perf_counter() - start_time
+        console.print(f"[green]✓ {written} partes formatadas e gravadas em {elapsed:.1f}s "
+                      f"({read['words']} palavras lidas)[/green]")
+        if totals['continuations']:
+            console.print(f"[blue]ℹ {totals['continuations']} continuação(ões) solicitadas para respostas truncadas[/blue]")
+        console.print(f"[blue]ℹ Verificação de conteúdo:[/blue] {totals['words_deleted']} palavras removidas, "
+                      f"{totals['words_inserted']} inseridas, {totals['verification_retries']} parte(s) reenviadas")
+        fixes = ", ".join(f"{name}={count}" for name, count in normalizer.stats.items() if count)
+        if fixes:
+            console.print(f"[green]✓ Formatação normalizada localmente[/green] ({fixes})")
+        self.log_message(f"Streaming: {written} partes, {read['words']} palavras, normalização {normalizer.stats}")
+        console.print(f"[green]✓ Documento formatado salvo:[/green] {markdown_filepath}")
+        return markdown_filepath
+    
+    def _split_into_chunks(self, document_index, planner, start=0, end=None):
+        """Agrupa parágrafos em partes que cabem no orçamento de tokens, respeitando os títulos
+        
+        Returns:
+            list: tuplas (primeiro parágrafo, fim, texto) de cada parte
+        """
+        end = len(document_index) if end is None else end
+        # Os títulos já foram identificados no índice do documento
+        paragraphs = document_index.paragraphs(start, end)
+        headings = document_index.heading_flags()[start:end]
+        return [(first + start, last + start, text)
+                for first, last, text in planner.iter_spans(paragraphs, headings=headings)]
+    
+    def _chunk_context(self, document_index, spans):
+        """Contexto de cada parte vindo do índice: palavras, estrutura de títulos e texto anterior
+        
+        A estrutura é calculada localmente para o documento inteiro: cada parte recebe as
+        seções em que começa e os títulos que contém, já com o nível final, além de um
+        trecho do texto de origem que a precede. Assim cada parte pode ser formatada
+        sozinha, em paralelo, mantendo a hierarquia de títulos do documento.
+        """
+        levels = document_index.outline_levels()
+        contexts = []
+        trail = []  # seções abertas (nível, título) antes do parágrafo `position`
+        position = 0
+        previous_text = None
+        for start, end, text in spans:
+            # Uma única passada pelo documento, já que as partes estão em ordem
+            for i in range(position, start):
+                if document_index.is_heading(i):
+                    level = levels[document_index.levels[i]]
+                    while trail and trail[-1][0] >= level:
+                        trail.pop()
+                    trail.append((level, document_index.heading_text(i)))
+            position = max(position, start)
+            
+            chunk_headings = [(levels[document_index.levels[i]], document_index.heading_text(i))
+                              for i in range(start, end) if document_index.is_heading(i)]
+            outline = list(trail)
+            if end > start and document_index.is_heading(start):
+                # Uma parte que começa com um título encerra as seções do mesmo nível ou abaixo
+                outline = [(level, title) for level, title in outline if level < chunk_headings[0][0]]
+            contexts.append({
+                'words': document_index.words_between(start, end) if end > start else len(text.split()),
+                'headings': len(chunk_headings),
+                'outline': outline,
+                'chunk_headings': chunk_headings,
+                'excerpt': self._preceding_excerpt(previous_text),
+            })
+            previous_text = text
+        return contexts
+    
+    def _preceding_excerpt(self, previous_text):
+        """Fim do texto de origem da parte anterior (formatting.preceding_excerpt_words palavras)"""
+        words = int(self.config.get('formatting', {}).get('preceding_excerpt_words', 80) or 0)
+        if not previous_text or words <= 0:
+            return None
+        # Basta o fim do texto: evita dividir a parte anterior inteira em palavras
+        tail = previous_text[-words * 15:].split()
+        return ' '.join(tail[-words:]) or None
+    
+    def _resume_chunks(self, document_index, previous_journal):
+        """Refaz exatamente as partes da execução anterior sobre o mesmo documento (--resume)
+        
+        Nada é dividido de novo: a calibração do estimador muda a cada requisição, e
+        as partes precisam manter o texto para que manifesto e cache continuem válidos.
+        
+        Returns:
+            list: tuplas (primeiro parágrafo, fim, texto) de cada parte, ou None se o
+            documento não é o mesmo da execução anterior
+        """
+        paragraphs = document_index.paragraphs()
+        hashes = [paragraph_hash(p) for p in paragraphs]
+        entries = previous_journal.chunks
+        spans = []
+        cursor = 0
+        i = 0
+        while i < len(entries):
+            expected = entries[i].get('paragraph_hashes') or []
+            end = cursor + len(expected)
+            if expected and hashes[cursor:end] == expected:
+                spans.append((cursor, end, '\n\n'.join(paragraphs[cursor:end])))
+                cursor = end
+                i += 1
+                continue
+            # Pedaços de um parágrafo grande demais, quebrado em linhas ou frases
+            pieces = self._rebuild_pieces(paragraphs[cursor], entries[i:]) if cursor < len(paragraphs) else None
+            if not pieces:
+                return None
+            spans.extend((cursor, cursor, piece) for piece in pieces)
+            cursor += 1
+            i += len(pieces)
+        return spans if spans and cursor == len(paragraphs) else None
+    
+    @staticmethod
+    def _rebuild_pieces(paragraph, entries):
+        """Pedaços de um parágrafo que reproduzem o hash de origem das próximas partes do manifesto"""
+        units, separator = ChunkPlanner.split_units(paragraph)
+        pieces = []
+        position = 0
+        for entry in entries:
+            if position == len(units):
+                break
+            # Hash incremental: cada pedaço é testado sem juntar o texto a cada linha
+            digest = hashlib.sha256()
+            for end in range(position, len(units)):
+                digest.update(((separator if end > position else '') + units[end]).encode('utf-8'))
+                if digest.hexdigest() == entry.get('source_hash'):
+                    pieces.append(separator.join(units[position:end + 1]))
+                    position = end + 1
+                    break
+            else:
+                return None
+        return pieces if position == len(units) else None
+    
+    def _align_chunks_with_previous(self, document_index, previous_journal, planner):
+        """Reutiliza as fronteiras das partes inalteradas de uma versão anterior (--incremental)"""
+        paragraphs = document_index.paragraphs()
+        hashes = [paragraph_hash(p) for p in paragraphs]
+        # Inclui as partes pendentes e com falha, que mantêm as mesmas chaves de cache
+        matches = match_previous_chunks(hashes, previous_journal.chunks)
+        
+        chunks = []
+        cursor = 0
+        # Partes inalteradas mantêm exatamente os mesmos parágrafos; os trechos entre
+        # elas (novos ou editados) são divididos normalmente
+        for start, end, _ in matches:
+            if start > cursor:
+                chunks.extend(self._split_into_chunks(document_index, planner, cursor, start))
+            chunks.append((start, end, '\n\n'.join(paragraphs[start:end])))
+            cursor = end
+        if cursor < len(paragraphs):
+            chunks.extend(self._split_into_chunks(document_index, planner, cursor))
+        
+        console.print(f"[blue]ℹ Execução anterior:[/blue] {len(matches)} de {len(previous_journal.chunks)} "
+                      f"partes mantêm as mesmas fronteiras")
+        self.log_message(f"{len(matches)} partes alinhadas com a execução anterior")
+        return chunks
+    
+    def _estimate_tokens(self, text):
+        """Estimativa calibrada do número de tokens de um texto"""
+        return self._token_estimator().estimate(text)
+    
+    def _token_estimator(self):
+        """Estimador de tokens do modelo e protocolo atuais (calibrado separadamente)"""
+        model = self.config['ai'].get('model', 'claude-3-opus-20240229')
+        protocol = self._formatting_protocol()
+        key = model if protocol == 'markdown' else f"{model}:{protocol}"
+        if key not in self._token_estimators:
+            self._token_estimators[key] = TokenEstimator(
+                key,
+                calibration_path=self.temp_dir / "token_calibration.json",
+                chars_per_token=self.config['ai'].get('chars_per_token'),
+                output_ratio=self.config['ai'].get('output_ratio') if protocol == 'markdown' else None,
+                # No script de edição a saída é uma fração pequena da entrada
+                default_output_ratio=None if protocol == 'markdown' else 0.15
+            )
+        return self._token_estimators[key]
+    
+    def _output_token_budget(self, model=None):
+        """Tokens de saída por requisição: ai.max_tokens limitado ao máximo do modelo"""
+        main_model = self.config['ai'].get('model', 'claude-3-opus-20240229')
+        model = model or main_model
+        # ai.output_token_limit vale para o modelo principal
+        model_limit = ((self.config['ai'].get('output_token_limit') if model == main_model else None)
+                       or model_output_limit(model))
+        configured = self.config['ai'].get('max_tokens') or model_limit
+        return max(1, min(int(configured), int(model_limit)))
+    
+    def _format_chunks(self, chunks, document_info, headings_pattern=None, previous_journal=None,
+                       chunk_context=None):
+        """Formata as partes do documento em paralelo, respeitando o limite ai.concurrency"""
+        total = len(chunks)
+        if chunk_context is None:
+            chunk_context = [{'words': len(chunk.split())} for chunk in chunks]
+        total_words = sum(context['words'] for context in chunk_context)
+        concurrency = min(self._get_concurrency(), max(total, 1))
+        journal = self._start_journal(chunks, document_info, previous_journal)
+        
+        if concurrency > 1:
+            console.print(f"[blue]ℹ Formatando até {concurrency} partes simultaneamente[/blue]")
+        
+        formatted_chunks = [None] * total
+        failed_parts = []
+        
+        # Partes já concluídas em uma execução anterior são lidas antes de qualquer gravação
+        for i in range(total):
+            reused_chunk = journal.reusable_output(i)
+            if reused_chunk:
+                formatted_chunks[i] = reused_chunk
+        reused_count = sum(1 for chunk in formatted_chunks if chunk is not None)
+        if reused_count:
+            saved_tokens = sum(
+                self._estimate_tokens(chunks[i]) + self._estimate_tokens(chunk)
+                for i, chunk in enumerate(formatted_chunks) if chunk is not None
+            )
+            console.print(f"[green]✓ {reused_count} de {total} partes reaproveitadas da execução anterior "
+                          f"(~{saved_tokens} tokens economizados)[/green]")
+            self.log_message(f"{reused_count} de {total} partes reaproveitadas, ~{saved_tokens} tokens economizados")
+            for i, reused_chunk in enumerate(formatted_chunks):
+                if reused_chunk is not None:
+                    self._save_chunk_output(i, reused_chunk, document_info, journal, verbose=False)
+        
+        # As partes mais longas são agendadas primeiro para reduzir o tempo total (cauda)
+        pending = [i for i in range(total) if formatted_chunks[i] is None]
+        schedule = sorted(pending, key=lambda i: len(chunks[i]), reverse=True)
+        
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        try:
+            from rich.progress import Progress
+            
+            with Progress() as progress:
+                # O progresso é medido em palavras, para refletir partes de tamanhos diferentes
+                task = progress.add_task(f"[cyan]Processando {total} partes do documento...", total=total_words,
+                                         completed=sum(chunk_context[i]['words'] for i in range(total)
+                                                       if formatted_chunks[i] is not None))
+                
+                futures = {
+                    executor.submit(self._format_chunk_task, i, chunks[i], total,
+                                    document_info, headings_pattern, journal, chunk_context[i]): i
+                    for i in schedule
+                }
+                
+                for future in as_completed(futures):
+                    i = futures[future]
+                    try:
+                        formatted_chunk = future.result()
+                    except Exception as e:
+                        self.log_message(f"Erro inesperado na parte {i+1}: {str(e)}", "ERROR")
+                        journal.mark_failed(i, e)
+                        formatted_chunk = None
+                    
+                    if formatted_chunk:
+                        formatted_chunks[i] = formatted_chunk
+                    else:
+                        # As demais partes continuam: o trabalho já pago fica registrado no manifesto
+                        console.print(f"[bold red]✘ Erro ao processar parte {i+1}[/bold red]")
+                        self.log_message(f"Erro ao processar parte {i+1} do documento", "ERROR")
+                        failed_parts.append(i + 1)
+                    
+                    progress.update(task, advance=chunk_context[i]['words'])
+        except KeyboardInterrupt:
+            executor.shutdown(wait=False, cancel_futures=True)
+            journal.finish('interrupted')
+            counts = journal.counts()
+            console.print(f"\n[bold yellow]⚠ Processamento interrompido:[/bold yellow] "
+                          f"{counts.get('done', 0)} de {total} partes concluídas")
+            console.print(f"[blue]ℹ Manifesto salvo em:[/blue] {journal.path}")
+            console.print("[blue]ℹ Execute novamente com --resume para continuar de onde parou[/blue]")
+            self.log_message("Processamento interrompido pelo usuário", "WARNING")
+            raise
+        executor.shutdown(wait=True)
+        
+        if failed_parts:
+            journal.finish('failed')
+            console.print(f"[bold red]✘ {len(failed_parts)} parte(s) falharam:[/bold red] "
+                          f"{', '.join(str(p) for p in sorted(failed_parts))}")
+            console.print("[blue]ℹ As demais partes foram salvas. Execute novamente com --resume "
+                          "para reenviar apenas as partes pendentes.[/blue]")
+            return None
+        
+        journal.finish('completed')
+        continued = journal.metric_total('continuations')
+        if continued:
+            console.print(f"[blue]ℹ {continued} continuação(ões) solicitadas para respostas truncadas[/blue]")
+        inserted = journal.metric_total('words_inserted')
+        deleted = journal.metric_total('words_deleted')
+        retried = journal.metric_total('verification_retries')
+        console.print(f"[blue]ℹ Verificação de conteúdo:[/blue] {deleted} palavras removidas, {inserted} inseridas, "
+                      f"{retried} parte(s) reenviadas")
+        return formatted_chunks
+    
+    def _journal_path(self, document_info):
+        """Caminho do manifesto de execução de um documento"""
+        return self.temp_dir / f"{self._file_stem(document_info)}_journal.json"
+    
+    def _load_previous_journal(self, document_info, other_versions=False):
+        """Carrega o manifesto da última execução deste documento, se houver
+        
+        Com other_versions (--incremental), sem manifesto para este arquivo, usa o
+        mais recente de outro arquivo com o mesmo título: a versão revisada de um
+        livro costuma ser salva com outro nome (documento_v2.docx).
+        """
+        previous = RunJournal.load(self._journal_path(document_info))
+        if previous is None and other_versions:
+            previous = self._latest_version_journal(document_info)
+        if previous is None:
+            console.print("[yellow]⚠ Nenhum manifesto anterior encontrado; processando todas as partes[/yellow]")
+        else:
+            counts = previous.counts()
+            console.print(f"[blue]ℹ Execução anterior ({previous.status}):[/blue] "
+                          f"{counts.get('done', 0)} de {len(previous.chunks)} partes concluídas")
+        return previous
+    
+    def _latest_version_journal(self, document_info):
+        """Manifesto mais recente de outro arquivo com o mesmo título do documento"""
+        pattern = re.compile(re.escape(self._sanitized_title(document_info)) + r'_[0-9a-f]{8}_journal\.json')
+        candidates = [path for path in self.temp_dir.glob('*_journal.json') if pattern.fullmatch(path.name)]
+        for path in sorted(candidates, key=lambda path: path.stat().st_mtime, reverse=True):
+            previous = RunJournal.load(path)
+            if previous is not None:
+                console.print(f"[blue]ℹ Usando o manifesto de outra versão do documento:[/blue] {path.name}")
+                return previous
+        return None
+    
+    def _start_journal(self, chunks, document_info, previous=None):
+        """Cria o manifesto da execução, aproveitando as partes concluídas do anterior"""
+        model = self.config['ai'].get('model', 'claude-3-opus-20240229')
+        journal = RunJournal(self._journal_path(document_info), text_hash('\n\n'.join(chunks)), model)
+        if previous is not None and previous.document_hash != journal.document_hash:
+            console.print("[yellow]⚠ O documento mudou desde a execução anterior; "
+                          "apenas partes idênticas serão reaproveitadas[/yellow]")
+        journal.start(chunks, previous)
+        return journal
+    
+    def _get_concurrency(self):
+        """Retorna o número máximo de requisições simultâneas (ai.concurrency)"""
+        try:
+            return max(1, int(self.config.get('ai', {}).get('concurrency', 1) or 1))
+        except (TypeError, ValueError):
+            return 1
+    
+    def _format_chunk_task(self, index, chunk, total, document_info, headings_pattern=None, journal=None,
+                           chunk_context=None):
+        """Formata uma única parte do documento (executado pelas threads de trabalho)"""
+        # Adiciona contexto para o processamento das partes
+        context = {
+            'part': index + 1,
+            'total_parts': total,
+            'is_first': index == 0,
+            'is_last': index == total - 1,
+            **(chunk_context or {})
+        }
+        
+        metrics = {}
+        formatted_chunk = self._format_and_verify_chunk(chunk, document_info, headings_pattern, context, metrics)
+        
+        if formatted_chunk:
+            self._save_chunk_output(index, formatted_chunk, document_info, journal, metrics=metrics)
+        elif journal is not None:
+            journal.mark_failed(index, "Todas as tentativas falharam")
+        
+        return formatted_chunk
+    
+    def _save_chunk_output(self, index, formatted_chunk, document_info, journal=None, verbose=True, metrics=None):
+        """Salva uma parte formatada em temp/ e a registra no manifesto da execução"""
+        # NOVO: Salvar cada parte formatada individualmente para diagnóstico
+        emergency_part_path = self.temp_dir / f"{self._file_stem(document_info)}_part_{index+1}.txt"
+        with open(emergency_part_path, 'w', encoding='utf-8') as f:
+            f.write(formatted_chunk)
+        if verbose:
+            console.print(f"[blue]ℹ Parte {index+1} salva em:[/blue] {emergency_part_path}")
+        if journal is not None:
+            journal.mark_done(index, emergency_part_path, formatted_chunk, metrics)
+    
+    def _format_and_verify_chunk(self, content, document_info, headings_pattern=None, context=None, metrics=None):
+        """Formata um trecho e confere se as palavras de origem foram preservadas
+
+        Trechos cuja variação de palavras excede formatting.word_count_tolerance
+        são reenviados à IA (ignorando o cache); a melhor resposta é mantida e só
+        ela vai para o cache, para que uma execução futura não reaproveite uma
+        resposta rejeitada.
+        """
+        if metrics is None:
+            metrics = {}
+        formatting_config = self.config.get('formatting', {}) or {}
+        tolerance = float(formatting_config.get('word_count_tolerance', 5))
+        max_retries = int(formatting_config.get('max_verification_retries', 1))
+        part_label = f"Parte {context['part']}" if context else "Documento"
+        
+        # As palavras de origem são extraídas uma única vez para todas as tentativas
+        source_words = markdown_words(content)
+        best_content, best_result, best_entry = None, None, None
+        for attempt in range(max_retries + 1):
+            formatted_content, cache_entry = self._format_content_chunk(content, document_info, headings_pattern,
+                                                                        context, metrics, refresh=attempt > 0)
+            if not formatted_content:
+                break
+            
+            result = verify_content(content, formatted_content, source_words=source_words)
+            if best_result is None or result.difference_percent < best_result.difference_percent:
+                best_content, best_result, best_entry = formatted_content, result, cache_entry
+            if result.within(tolerance):
+                break
+            
+            console.print(f"[yellow]⚠ {part_label}: conteúdo fora da tolerância de {tolerance:g}% "
+                          f"({result.summary()})[/yellow]")
+            for removed, added in result.samples:
+                self.log_message(f"{part_label}: '{removed}' -> '{added}'", "WARNING")
+            if attempt < max_retries:
+                console.print(f"[blue]ℹ Reenviando {part_label.lower()} para nova formatação...[/blue]")
+        
+        if best_entry is not None:
+            self.cache.put(*best_entry)
+        if best_result is not None:
+            metrics['verification_retries'] = attempt
+            metrics['words_inserted'] = best_result.insertions
+            metrics['words_deleted'] = best_result.deletions
+            metrics['word_difference_percent'] = round(best_result.difference_percent, 2)
+            if not best_result.within(tolerance):
+                self.log_message(f"{part_label} mantida fora da tolerância: {best_result.summary()}", "WARNING")
+        return best_content
+    
+    def _format_content_chunk(self, content, document_info, headings_pattern=None, context=None, metrics=None,
+                              refresh=False):
+        """Formata um trecho de conteúdo usando a IA
+        
+        Returns:
+            tuple: (conteúdo formatado ou None, (chave, resposta) a gravar no cache ou None)
+        """
+        if metrics is None:
+            metrics = {}
+        metrics['continuations'] = 0
         # Cria o prompt para a IA
-        system_prompt = self._create_formatting_system_prompt(headings_pattern, context)
-        user_prompt = self._create_formatting_user_prompt(content, document_info, context)
+        edit_script = self._formatting_protocol() == 'edit_script'
+        if edit_script:
+            instructions = self._create_edit_script_system_prompt(document_info, headings_pattern)
+            user_prompt = self._create_edit_script_user_prompt(content, context)
+        else:
+            instructions = self._create_formatting_system_prompt(document_info, headings_pattern)
+            user_prompt = self._create_formatting_user_prompt(content, context)
+        system_prompt = instructions + self._create_title_info(document_info)
+        # Só vale marcar o prefixo para o cache de prompts quando ele se repete: partes de um
+        # documento dividido (e suas novas tentativas e continuações) compartilham as instruções
+        cache_prompt = context is not None
+        temperature = self.config['ai'].get('temperature', 0.1)
+        word_count = context['words'] if context and 'words' in context else len(content.split())
+        model = self._route_model(content, headings_pattern, context, word_count,
+                                  previous_model=metrics.get('model') if refresh else None)
+        metrics['model'] = model
+        
+        # Verifica se esta mesma requisição já foi respondida em uma execução anterior; o título
+        # fica fora da chave, para que renomear o documento não invalide as partes já formatadas
+        cache_key = ChunkCache.make_key(content, instructions, user_prompt, model, temperature)
+        cached_content = None if refresh else self.cache.get(cache_key)
+        if cached_content:
+            console.print(f"[green]✓ {word_count} palavras recuperadas do cache[/green]")
+            metrics['cached'] = True
+            if edit_script:
+                return self._apply_edit_script(content, cached_content, metrics), None
+            return self._replace_stale_title(cached_content, content, document_info), None
         
         # Tenta a formatação com retry em caso de falha
         max_retries = 3
         retry_count = 0
+        max_continuations = self.config['ai'].get('max_continuations', 4)
         
         while retry_count < max_retries:
             try:
-                console.print(f"[cyan]ℹ Enviando {len(content.split())} palavras para formatação com IA...[/cyan]")
+                console.print(f"[cyan]ℹ Enviando {word_count} palavras para formatação com IA...[/cyan]")
                 
-                with self.client.messages.stream(
-                    model=self.config['ai'].get('model', 'claude-3-opus-20240229'),
-                    temperature=self.config['ai'].get('temperature', 0.1),
-                    max_tokens=4000,
-                    system=system_prompt,
-                    messages=[{"role": "user", "content": user_prompt}]
-                ) as stream:
-                    formatted_content = ""
-                    for text in stream.text_stream:
-                        formatted_content += text
-                        # Indicador de progresso usando print regular em vez de console.print
-                        print(".", end="", flush=True)
-                    print()  # Nova linha após terminar
+                messages = [{"role": "user", "content": user_prompt}]
+                formatted_content, final_message = self._stream_message(model, temperature, system_prompt, messages,
+                                                                        metrics, cache_prompt=cache_prompt)
+                prompt_tokens = self._prompt_tokens(final_message.usage)
+                output_tokens = final_message.usage.output_tokens
+                
+                # Resposta cortada no limite de tokens: pede a continuação a partir do texto já recebido
+                continuations = 0
+                while final_message.stop_reason == 'max_tokens' and continuations < max_continuations:
+                    continuations += 1
+                    console.print(f"[yellow]⚠ Resposta atingiu o limite de tokens, solicitando continuação "
+                                  f"{continuations}/{max_continuations}...[/yellow]")
+                    # A API não aceita espaços no fim da mensagem do assistente
+                    prefix = formatted_content.rstrip()
+                    continuation_messages = messages + [{"role": "assistant", "content": prefix}]
+                    continuation, final_message = self._stream_message(
+                        model, temperature, system_prompt, continuation_messages, metrics, cache_prompt=cache_prompt
+                    )
+                    formatted_content = prefix + self._strip_repeated_prefix(prefix, continuation)
+                    output_tokens += final_message.usage.output_tokens
+                metrics['continuations'] = continuations
+                if continuations:
+                    self.log_message(f"Parte {context['part'] if context else 1}: {continuations} continuação(ões)")
+                
+                if final_message.stop_reason == 'max_tokens':
+                    console.print(f"[bold red]✘ Resposta ainda truncada após {max_continuations} continuações[/bold red]")
+                    self.log_message("Resposta truncada mesmo após as continuações; parte descartada", "ERROR")
+                    return None, None
+                
+                # Ajusta o estimador com o uso real da resposta completa: um primeiro trecho
+                # truncado subestimaria a razão de saída e aumentaria as próximas partes
+                self._token_estimator().observe(
+                    len(system_prompt) + len(user_prompt),
+                    prompt_tokens,
+                    source_tokens=self._estimate_tokens(content),
+                    output_tokens=output_tokens
+                )
 
                 if formatted_content:
-                    console.print("[green]✓ Conteúdo formatado com sucesso pela IA[/green]")
-                    return formatted_content
+                    console.print(f"[green]✓ Conteúdo formatado com sucesso pela IA[/green] "
+                                  f"({metrics.get('output_words', 0)} palavras recebidas)")
+                    cache_entry = (cache_key, formatted_content)
+                    if edit_script:
+                        return self._apply_edit_script(content, formatted_content, metrics), cache_entry
+                    return formatted_content, cache_entry
                 else:
                     raise Exception("A resposta da IA estava vazia")
                 
@@ -544,19 +1371,361 @@ class SimpleEbookManager:
                 self.log_message(f"Tentativa {retry_count} de formatação falhou: {str(e)}", "WARNING")
                 
                 if retry_count < max_retries:
-                    console.print(f"[blue]ℹ Aguardando 5 segundos antes de tentar novamente...[/blue]")
-                    time.sleep(5)
+                    # retry-after da API (que pausa também as demais requisições) ou recuo exponencial
+                    delay = self.rate_limiter.backoff(retry_count, e)
+                    console.print(f"[blue]ℹ Aguardando {delay:.1f} segundos antes de tentar novamente...[/blue]")
+                    time.sleep(delay)
                 else:
                     console.print("[bold red]✘ Todas as tentativas falharam[/bold red]")
                     self.log_message("Todas as tentativas de formatação falharam", "ERROR")
-                    return None
+                    return None, None
+    
+    def _create_model_router(self):
+        """Roteador de modelos por complexidade (ai.routing), ou None se desativado"""
+        ai_config = self.config['ai']
+        routing = ai_config.get('routing') or {}
+        premium_model = ai_config.get('model', 'claude-3-opus-20240229')
+        fast_model = routing.get('fast_model')
+        if not routing.get('enabled', False) or not fast_model or fast_model == premium_model:
+            return None
+        return ModelRouter(premium_model, fast_model,
+                           max_complexity=float(routing.get('max_complexity', DEFAULT_MAX_COMPLEXITY)),
+                           fast_output_limit=self._output_token_budget(fast_model))
+    
+    def _route_model(self, content, headings_pattern=None, context=None, words=0, previous_model=None):
+        """Modelo de uma parte: o principal (ai.model) ou, com ai.routing, o rápido para partes simples"""
+        if self.model_router is None:
+            return self.config['ai'].get('model', 'claude-3-opus-20240229')
+        if previous_model is not None:
+            # Nova tentativa da mesma parte: a decisão já foi contada; só a resposta do
+            # modelo rápido fora da tolerância passa para o modelo principal
+            if previous_model == self.model_router.fast_model:
+                return self.model_router.escalate()
+            return previous_model
+        complexity = chunk_complexity(content, headings_pattern, context.get('headings') if context else None)
+        model = self.model_router.route(complexity, words, self._token_estimator().estimate_output(content))
+        part_label = f"Parte {context['part']}" if context else "Documento"
+        self.log_message(f"{part_label}: complexidade {complexity.describe()}, modelo {model}")
+        return model
+    
+    def _formatting_protocol(self):
+        """Protocolo de resposta da IA: markdown (texto completo) ou edit_script"""
+        return self.config.get('formatting', {}).get('protocol', 'markdown')
+    
+    def _apply_edit_script(self, content, script, metrics):
+        """Monta localmente o Markdown de uma parte a partir do script de edição recebido"""
+        formatted_content, ignored = apply_edit_script(content, script)
+        metrics['script_tokens'] = self._estimate_tokens(script)
+        if ignored:
+            metrics['script_ignored_instructions'] = ignored
+            self.log_message(f"{ignored} instrução(ões) inválidas ignoradas no script de edição", "WARNING")
+        return formatted_content
+    
+    @staticmethod
+    def _replace_stale_title(formatted_content, content, document_info):
+        """Troca pelo título atual o # inicial de uma resposta em cache que não vem do texto da parte
+        
+        O título fica fora da chave do cache, mas a IA o recebe e costuma abrir a primeira parte
+        com ele; depois de renomear o documento, a resposta guardada traria o título antigo.
+        """
+        stripped = formatted_content.lstrip()
+        match = re.match(r'#[ \t]+([^\n]+)', stripped)
+        if not match:
+            return formatted_content
+        heading = ' '.join(markdown_words(match.group(1)))
+        if not heading or f" {heading} " in f" {' '.join(markdown_words(content))} ":
+            return formatted_content
+        return f"# {document_info['title']}" + stripped[match.end():]
+    
+    def _system_blocks(self, system_prompt, model, cache_prompt=False):
+        """Prompt de sistema como bloco marcado para o cache de prompts da API
+        
+        A marcação só é feita em prefixos reutilizados (cache_prompt) e que atingem o
+        tamanho mínimo do modelo: abaixo dele a API ignora a marca, e em requisições
+        únicas a gravação no cache custa mais que uma chamada sem cache.
+        """
+        if not (cache_prompt and self.config['ai'].get('prompt_caching', True)):
+            return system_prompt
+        if self._estimate_tokens(system_prompt) < prompt_cache_min_tokens(model):
+            return system_prompt
+        return [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}]
+    
+    @staticmethod
+    def _prompt_tokens(usage):
+        """Total de tokens de entrada, incluindo os lidos e gravados no cache de prompts"""
+        return (usage.input_tokens
+                + (getattr(usage, 'cache_creation_input_tokens', 0) or 0)
+                + (getattr(usage, 'cache_read_input_tokens', 0) or 0))
+    
+    def _record_usage(self, usage, metrics=None):
+        """Acumula o uso de tokens da execução (e da parte, se houver métricas)"""
+        counts = {name: getattr(usage, name, 0) or 0 for name in self.token_usage if name != 'requests'}
+        counts['requests'] = 1
+        with self._usage_lock:
+            for name, value in counts.items():
+                self.token_usage[name] += value
+        if metrics is not None:
+            for name, value in counts.items():
+                metrics[name] = metrics.get(name, 0) + value
+    
+    def _report_token_usage(self):
+        """Exibe e registra o uso de tokens da execução, incluindo o cache de prompts"""
+        usage = self.token_usage
+        if not usage['requests']:
+            return
+        prompt_tokens = usage['input_tokens'] + usage['cache_creation_input_tokens'] + usage['cache_read_input_tokens']
+        read_share = usage['cache_read_input_tokens'] * 100 / max(prompt_tokens, 1)
+        console.print(f"[blue]ℹ Tokens:[/blue] {prompt_tokens} de entrada "
+                      f"({usage['cache_read_input_tokens']} lidos do cache de prompts, {read_share:.0f}%; "
+                      f"{usage['cache_creation_input_tokens']} gravados), {usage['output_tokens']} de saída "
+                      f"em {usage['requests']} requisições")
+        self.log_message(f"Uso de tokens: {usage}")
+        latency = self.latency.summary()
+        if latency:
+            console.print(f"[blue]ℹ Latência por requisição:[/blue] p50 {latency['p50']:.1f}s, "
+                          f"p95 {latency['p95']:.1f}s, máx. {latency['max']:.1f}s"
+                          + (f"; {latency.get('stalls', 0)} travamento(s)" if latency.get('stalls') else "")
+                          + (f"; {latency.get('hedged', 0)} requisição(ões) paralela(s), "
+                             f"{latency.get('hedge_wins', 0)} mais rápida(s)" if latency.get('hedged') else ""))
+            self.log_message(f"Latência das requisições: {latency}")
+        routing = self.model_router.summary(self.latency) if self.model_router else None
+        if routing:
+            router = self.model_router
+            saved = routing['seconds_saved']
+            console.print(f"[blue]ℹ Roteamento de modelos:[/blue] {routing['fast_parts']} parte(s) "
+                          f"({routing['fast_words']} palavras) para {router.fast_model}, "
+                          f"{routing['premium_parts']} ({routing['premium_words']} palavras) para {router.premium_model}"
+                          + (f"; {routing['escalated']} reenviada(s) ao modelo principal" if routing['escalated'] else "")
+                          + (f"; ~{saved:.0f}s de latência economizados" if saved is not None else ""))
+            self.log_message(f"Roteamento de modelos: {routing}")
+        if self.rate_limiter.waited >= 1:
+            console.print(f"[blue]ℹ Espera pelos limites da API:[/blue] {self.rate_limiter.waited:.0f}s")
+            self.log_message(f"Espera pelos limites da API: {self.rate_limiter.waited:.1f}s")
+    
+    def _stream_message(self, model, temperature, system_prompt, messages, metrics=None, cache_prompt=False):
+        """Executa uma requisição em streaming e retorna o texto e a mensagem final
+        
+        Com ai.hedging ativo, uma requisição que passa do percentil ai.hedge_percentile
+        das latências já observadas ganha uma cópia paralela; vale a que terminar
+        primeiro e a outra é cancelada.
+        """
+        max_tokens = self._output_token_budget(model)
+        expected_tokens = min(max_tokens, self._token_estimator().estimate_output(messages[0]['content']))
+        ai_config = self.config['ai']
+        threshold = None
+        if ai_config.get('hedging', False):
+            threshold = self.latency.threshold(expected_tokens, float(ai_config.get('hedge_percentile', 95)),
+                                               int(ai_config.get('hedge_min_samples', 5)), model=model)
+        if threshold is None:
+            return self._stream_attempt(model, temperature, system_prompt, messages, max_tokens,
+                                        expected_tokens, self._stream_control(), metrics, cache_prompt)
+        
+        executor = ThreadPoolExecutor(max_workers=2)
+        try:
+            primary_control = self._stream_control()
+            primary = executor.submit(self._stream_attempt, model, temperature, system_prompt, messages,
+                                      max_tokens, expected_tokens, primary_control, metrics, cache_prompt)
+            controls = {primary: primary_control}
+            # O limiar conta a partir da abertura da resposta: uma requisição parada nos
+            # limitadores (justamente quando a API está no limite) não ganha uma cópia
+            while not primary.done() and not primary_control.wait_opened(0.1):
+                pass
+            done, _ = wait([primary], timeout=max(0.0, threshold - primary_control.elapsed()))
+            if not done:
+                console.print(f"[yellow]⚠ Resposta acima do p{ai_config.get('hedge_percentile', 95):g} "
+                              f"({threshold:.1f}s); enviando uma requisição paralela[/yellow]")
+                self.latency.count('hedged')
+                hedge_control = self._stream_control()
+                hedge = executor.submit(self._stream_attempt, model, temperature, system_prompt, messages,
+                                        max_tokens, expected_tokens, hedge_control, metrics, cache_prompt)
+                controls[hedge] = hedge_control
+            
+            pending = set(controls)
+            error = None
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        for other in pending:
+                            controls[other].cancel('hedge')
+                        if controls[future] is not primary_control:
+                            self.latency.count('hedge_wins')
+                        return future.result()
+                    if not isinstance(future.exception(), StreamCancelled):
+                        error = error or future.exception()
+            raise error or StreamCancelled("nenhuma resposta concluída")
+        finally:
+            executor.shutdown(wait=False)
+    
+    def _stream_control(self):
+        """Controle de uma resposta com os limites de travamento da configuração"""
+        ai_config = self.config['ai']
+        return StreamControl(first_token_timeout=ai_config.get('first_token_timeout', 120) or None,
+                             stall_timeout=ai_config.get('stall_timeout', 60) or None)
+    
+    def _stream_attempt(self, model, temperature, system_prompt, messages, max_tokens, expected_tokens,
+                        control, metrics=None, cache_prompt=False):
+        """Uma requisição em streaming, interrompida se parar de receber texto
+        
+        Os trechos recebidos vão para um StreamSink: o texto é montado uma única vez
+        ao final, e o progresso é desenhado no máximo a cada ai.progress_interval segundos.
+        """
+        adaptive = self.config['ai'].get('adaptive_rate_limit', True)
+        if adaptive:
+            # Espera saldo nos baldes de requisições e de tokens antes de enviar
+            self.rate_limiter.acquire(
+                self._estimate_tokens(system_prompt) + sum(self._estimate_tokens(m['content']) for m in messages),
+                expected_tokens
+            )
+        
+        words = WordCounter()
+        progress = ThrottledProgress(float(self.config['ai'].get('progress_interval', 1.0)))
+        with StreamSink([words, progress, control]) as sink, self.request_limiter or nullcontext(), \
+                self.client.messages.stream(
+                    model=model,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    system=self._system_blocks(system_prompt, model, cache_prompt),
+                    messages=messages
+                ) as stream:
+            start_time = time.perf_counter()
+            control.attach(stream)
+            control.watch()
+            if adaptive:
+                self.rate_limiter.update(getattr(getattr(stream, 'response', None), 'headers', None))
+            try:
+                for text in stream.text_stream:
+                    sink.write(text)
+                control.raise_if_cancelled()
+                final_message = stream.get_final_message()
+            except (StreamStalled, StreamCancelled):
+                if control.reason == 'stall':
+                    self.latency.count('stalls')
+                raise
+            except Exception:
+                # Fechar a resposta de outra thread interrompe a leitura com um erro de conexão
+                if control.reason:
+                    if control.reason == 'stall':
+                        self.latency.count('stalls')
+                    control.raise_if_cancelled()
+                raise
+            content = sink.getvalue()
+        self.latency.record(time.perf_counter() - start_time, expected_tokens, model=model)
+        if metrics is not None:
+            metrics['output_words'] = metrics.get('output_words', 0) + words.count
+        self._record_usage(final_message.usage, metrics)
+        return content, final_message
+    
+    def _strip_repeated_prefix(self, previous, continuation, max_overlap=500, min_overlap=20):
+        """Remove do início da continuação o trecho que repete o fim do texto anterior"""
+        leading = continuation[:len(continuation) - len(continuation.lstrip())]
+        body = continuation[len(leading):]
+        for size in range(min(len(body), len(previous), max_overlap), min_overlap - 1, -1):
+            if previous.endswith(body[:size]):
+                console.print(f"[blue]ℹ {size} caracteres repetidos removidos da continuação[/blue]")
+                return body[size:]
+        return continuation
     
-    def _ensure_formatting_consistency(self, content, document_info):
+    def _ensure_formatting_consistency(self, content, document_info, formatted_chunks=None):
         """Garante a consistência da formatação em documentos processados em partes"""
-        console.print("[cyan]ℹ Verificando consistência da formatação...[/cyan]")
+        mode = self.config.get('formatting', {}).get('consistency_pass', 'local')
+        if mode == 'off':
+            return content
+        if mode == 'llm':
+            content = self._llm_formatting_consistency(content, document_info)
+        elif mode == 'seams' and formatted_chunks and len(formatted_chunks) > 1:
+            content = '\n\n'.join(self._reconcile_seams(formatted_chunks, document_info))
+        return self._normalize_markdown(content, document_info)
+    
+    def _reconcile_seams(self, formatted_chunks, document_info):
+        """Reconcilia em paralelo apenas as janelas de parágrafos em torno das fronteiras entre partes"""
+        window = self.config.get('formatting', {}).get('seam_paragraphs', 3)
+        plan = SeamPlan(formatted_chunks, window)
+        seams = plan.seams()
+        console.print(f"[cyan]ℹ Reconciliando {len(seams)} fronteiras entre partes "
+                      f"({window} parágrafos de cada lado)...[/cyan]")
+        
+        fixes = {}
+        with ThreadPoolExecutor(max_workers=self._get_concurrency()) as executor:
+            futures = {
+                executor.submit(self._reconcile_seam, tail, head, document_info): i
+                for i, tail, head in seams
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    fix = future.result()
+                except Exception as e:
+                    self.log_message(f"Erro ao reconciliar fronteira {i+1}: {str(e)}", "WARNING")
+                    fix = None
+                if fix:
+                    fixes[i] = fix
+        
+        console.print(f"[green]✓ {len(fixes)} de {len(seams)} fronteiras reconciliadas[/green]")
+        self.log_message(f"Fronteiras reconciliadas: {len(fixes)} de {len(seams)}")
+        return plan.splice(fixes)
+    
+    def _reconcile_seam(self, tail, head, document_info):
+        """Envia uma janela de fronteira à IA; retorna (fim, início) corrigidos ou None"""
+        system_prompt = f"""
+Você é um especialista em formatação de ebooks em Markdown. Você receberá o fim de uma parte de um
+documento e o início da parte seguinte, separados pela linha {SEAM_MARKER}. As partes foram
+formatadas separadamente e podem ter inconsistências na fronteira.
+
+TAREFAS:
+1. Torne consistente a hierarquia de cabeçalhos entre os dois trechos
+2. Una listas, tabelas ou blocos de código que tenham sido quebrados na fronteira
+3. Remova marcações que indiquem divisão em partes
+4. NÃO altere, remova ou acrescente nenhuma palavra do conteúdo
+
+Retorne os dois trechos corrigidos, mantendo a linha {SEAM_MARKER} exatamente entre eles,
+sem explicações adicionais.
+"""
+        user_prompt = f"""TÍTULO DO DOCUMENTO: {document_info['title']}
+
+{tail}
+
+{SEAM_MARKER}
+
+{head}
+"""
+        model = self.config['ai'].get('model', 'claude-3-opus-20240229')
+        cache_key = ChunkCache.make_key(tail + head, system_prompt, user_prompt, model, 0.1)
+        result = self.cache.get(cache_key)
+        if not result:
+            result, final_message = self._stream_message(
+                model, 0.1, system_prompt, [{"role": "user", "content": user_prompt}]
+            )
+            if final_message.stop_reason == 'max_tokens':
+                return None
+        
+        if result.count(SEAM_MARKER) != 1:
+            return None
+        new_tail, new_head = (part.strip() for part in result.split(SEAM_MARKER))
+        # A correção só é aceita se todas as palavras foram preservadas
+        if plain_words(new_tail + ' ' + new_head) != plain_words(tail + ' ' + head):
+            return None
+        self.cache.put(cache_key, result)
+        return new_tail, new_head
+    
+    def _normalize_markdown(self, content, document_info):
+        """Normaliza localmente o Markdown combinado (títulos, artefatos, espaçamento, listas e tabelas)"""
+        start_time = time.perf_counter()
+        normalized, stats = normalize_markdown(content, document_info['title'])
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        
+        fixes = ", ".join(f"{name}={count}" for name, count in stats.items() if count)
+        console.print(f"[green]✓ Formatação normalizada localmente em {elapsed_ms:.0f} ms[/green]"
+                      + (f" ({fixes})" if fixes else ""))
+        self.log_message(f"Normalização local de Markdown: {stats}")
+        return normalized
+    
+    def _llm_formatting_consistency(self, content, document_info):
+        """Verificação de consistência pela IA (opcional: formatting.consistency_pass = llm)"""
+        console.print("[cyan]ℹ Verificando consistência da formatação com IA...[/cyan]")
         
         # NOVO: Salvar o conteúdo antes da verificação final
-        pre_consistency_path = self.temp_dir / f"{document_info['title'].replace(' ', '_').lower()}_pre_consistency.txt"
+        pre_consistency_path = self.temp_dir / f"{self._file_stem(document_info)}_pre_consistency.txt"
         with open(pre_consistency_path, 'w', encoding='utf-8') as f:
             f.write(content)
         console.print(f"[blue]ℹ Conteúdo pré-verificação salvo em:[/blue] {pre_consistency_path}")
@@ -593,26 +1762,17 @@ Retorne apenas o documento corrigido, sem explicações adicionais.
         try:
             console.print("[cyan]ℹ Enviando para verificação final de consistência...[/cyan]")
             
-            # Versão com streaming para evitar timeout
-            with self.client.messages.stream(
-                model=self.config['ai'].get('model', 'claude-3-opus-20240229'),
-                temperature=0.1,  # Baixa temperatura para resultados consistentes
-                max_tokens=4000,
-                system=system_prompt,
-                messages=[{"role": "user", "content": user_prompt}]
-            ) as stream:
-                corrected_content = ""
-                for text in stream.text_stream:
-                    corrected_content += text
-                    # Opcional: Imprimir pontos para indicar progresso
-                    print(".", end="", flush=True)
-                print()  # Nova linha após terminar
+            # Versão com streaming para evitar timeout; baixa temperatura para resultados consistentes
+            corrected_content, _ = self._stream_message(
+                self.config['ai'].get('model', 'claude-3-opus-20240229'), 0.1,
+                system_prompt, [{"role": "user", "content": user_prompt}]
+            )
             
             if corrected_content:
                 console.print("[green]✓ Formatação unificada com sucesso[/green]")
                 
                 # NOVO: Salvar o conteúdo após verificação para comparação
-                post_consistency_path = self.temp_dir / f"{document_info['title'].replace(' ', '_').lower()}_post_consistency.txt"
+                post_consistency_path = self.temp_dir / f"{self._file_stem(document_info)}_post_consistency.txt"
                 with open(post_consistency_path, 'w', encoding='utf-8') as f:
                     f.write(corrected_content)
                 console.print(f"[blue]ℹ Conteúdo pós-verificação salvo em:[/blue] {post_consistency_path}")
@@ -627,28 +1787,120 @@ Retorne apenas o documento corrigido, sem explicações adicionais.
             self.log_message(f"Erro ao verificar consistência: {str(e)}", "WARNING")
             return content
     
-    def _create_formatting_system_prompt(self, headings_pattern=None, context=None):
-        """Cria um prompt de sistema para formatação baseado na configuração"""
-        # Adiciona informações sobre o contexto de processamento em partes
-        part_info = ""
-        if context:
-            part_info = f"""
-Este documento está sendo processado em partes. Esta é a parte {context['part']} de {context['total_parts']}.
+    def _create_part_info(self, context=None):
+        """Descreve a posição da parte no documento, ao fim da mensagem do usuário"""
+        if not context:
+            return ""
+        return f"""
+POSIÇÃO DESTA PARTE:
+Este documento está sendo processado em partes. Esta é a parte {context['part']}{f" de {context['total_parts']}" if context.get('total_parts') else ''}.
 {'Esta é a primeira parte do documento.' if context['is_first'] else ''}
 {'Esta é a última parte do documento.' if context['is_last'] else ''}
-
+{self._create_outline_info(context)}
 Ao formatar esta parte, considere sua posição no documento completo:
-- {'Na primeira parte, crie cabeçalhos de nível superior apropriados.' if context['is_first'] else 'Nas partes intermediárias, continue a estrutura de cabeçalhos da parte anterior.'}
+- {self._heading_instruction(context)}
 - {'Na última parte, certifique-se de concluir apropriadamente o documento.' if context['is_last'] else ''}
 """
-
-        # Adiciona informações sobre o padrão de cabeçalhos, se fornecido
-        headings_info = ""
-        if headings_pattern:
-            headings_info = f"""
+    
+    def _create_outline_info(self, context):
+        """Estrutura de títulos calculada localmente e texto de origem anterior à parte"""
+        lines = []
+        if context.get('outline'):
+            lines.append("\nESTRUTURA DE TÍTULOS (calculada a partir do documento completo):")
+            lines.append("Esta parte começa dentro das seções:")
+            lines.extend(f"{'  ' * depth}- {'#' * level} {title}"
+                         for depth, (level, title) in enumerate(context['outline']))
+        if context.get('chunk_headings'):
+            if not context.get('outline'):
+                lines.append("\nESTRUTURA DE TÍTULOS (calculada a partir do documento completo):")
+            lines.append("Títulos desta parte, com o nível de cabeçalho de cada um:")
+            lines.extend(f"- {'#' * level} {title}" for level, title in context['chunk_headings'])
+        if context.get('excerpt'):
+            lines.append("\nTEXTO ANTERIOR A ESTA PARTE (apenas contexto: não o formate nem o inclua na resposta):")
+            lines.append(f"«{context['excerpt']}»")
+        return '\n'.join(lines) + '\n' if lines else ''
+    
+    @staticmethod
+    def _heading_instruction(context):
+        """Orientação sobre os cabeçalhos conforme o contexto disponível para a parte"""
+        # Com a estrutura do documento, a parte não depende das demais
+        if context.get('chunk_headings'):
+            return ('Use exatamente os níveis de cabeçalho indicados na estrutura acima; '
+                    'eles foram definidos para o documento inteiro.')
+        if context.get('outline'):
+            return ('Nenhum título foi identificado nesta parte: ela continua as seções indicadas acima, '
+                    'sem abrir seções novas no mesmo nível delas.')
+        if context['is_first']:
+            return 'Na primeira parte, crie cabeçalhos de nível superior apropriados.'
+        return 'Nas partes intermediárias, continue a estrutura de cabeçalhos da parte anterior.'
+    
+    def _create_placeholder_info(self):
+        """Regra dos marcadores de trechos já formatados localmente (formatador hybrid)"""
+        if self._formatter_mode() != 'hybrid':
+            return ""
+        return """
+Linhas no formato [[LOCAL-N]] representam trechos já formatados. Mantenha cada uma exatamente
+como está, em uma linha própria, sem formatação adicional, e use-as como contexto da estrutura.
+"""
+    
+    def _create_headings_info(self, headings_pattern=None, inferred_headings=None):
+        """Informa o padrão de títulos fornecido pelo usuário ou inferido do documento"""
+        if inferred_headings:
+            examples = "\n".join(f"- {example}" for example in inferred_headings)
+            pattern_info = f' (padrão: "{headings_pattern}")' if headings_pattern else ''
+            return f"""
+Os títulos de seções deste documento foram identificados automaticamente{pattern_info}. Exemplos:
+{examples}
+Converta os títulos desse tipo para cabeçalhos Markdown, mantendo a mesma hierarquia ao longo do documento.
+"""
+        if not headings_pattern:
+            return ""
+        return f"""
 Foi fornecido o seguinte padrão para identificar títulos de seções: "{headings_pattern}".
 Use este padrão para detectar cabeçalhos e convertê-los para a formatação Markdown adequada.
 """
+    
+    # Os prompts de sistema contêm apenas o que é igual em todas as partes de uma execução
+    # (regras, exemplos, título e padrão de títulos), formando um prefixo estável que a API pode
+    # servir do cache de prompts. O que muda a cada parte vai no fim da mensagem do usuário.
+    # O título é acrescentado à parte (_create_title_info), fora da chave do cache de respostas.
+    
+    @staticmethod
+    def _create_title_info(document_info):
+        """Título do documento, ao fim do prompt de sistema"""
+        return f"\nTÍTULO DO DOCUMENTO: {document_info['title']}\n"
+    
+    def _create_edit_script_system_prompt(self, document_info, headings_pattern=None):
+        """Cria o prompt de sistema do protocolo de script de edição"""
+        return f"""
+Você é um especialista em formatação visual de ebooks. Você receberá um documento com as linhas
+numeradas no formato "N| texto". NÃO reescreva o documento: responda APENAS com um script de
+edição que descreve a formatação Markdown a aplicar, uma instrução por linha:
+{EDIT_SCRIPT_INSTRUCTIONS}
+REGRAS:
+1. Use somente as instruções acima, sem explicações, comentários ou blocos de código
+2. Os números de linha se referem à numeração recebida
+3. Intervalos de blocos (UL, OL, CODE, TABLE, QUOTE) não podem se sobrepor
+4. Linhas não mencionadas permanecem como parágrafos comuns
+5. Em B e I, copie o trecho exatamente como aparece na linha
+6. Use ênfase com moderação, apenas para termos realmente importantes
+
+Estruture os cabeçalhos adequadamente (nível 1 para o título principal, 2 para seções,
+3 para subseções).
+{EDIT_SCRIPT_EXAMPLES}{self._create_headings_info(headings_pattern, document_info.get('inferred_headings'))}{self._create_placeholder_info()}"""
+    
+    def _create_edit_script_user_prompt(self, content, context=None):
+        """Cria o prompt de usuário do protocolo de script de edição"""
+        return f"""
+DOCUMENTO COM LINHAS NUMERADAS:
+{number_lines(content)}
+{self._create_part_info(context)}
+Responda apenas com o script de edição.
+"""
+    
+    def _create_formatting_system_prompt(self, document_info, headings_pattern=None):
+        """Cria um prompt de sistema para formatação baseado na configuração"""
+        headings_info = self._create_headings_info(headings_pattern, document_info.get('inferred_headings'))
 
         return f"""
 Você é um especialista em formatação visual de ebooks. Sua tarefa é EXCLUSIVAMENTE melhorar 
@@ -663,9 +1915,6 @@ REGRAS CRÍTICAS E ABSOLUTAS:
 5. Preserve TODOS os exemplos de código, prompts e detalhes técnicos EXATAMENTE como estão
 6. Preserve TODAS as listas, tabelas e estruturas, apenas melhorando sua formatação visual
 
-{part_info}
-{headings_info}
-
 FOQUE EXCLUSIVAMENTE EM:
 - Converter texto para formatação Markdown correta
 - Estruturar cabeçalhos adequadamente (# para título principal, ## para seções, ### para subseções)
@@ -677,32 +1926,18 @@ FOQUE EXCLUSIVAMENTE EM:
 
 A extensão e complexidade do material são características deliberadas e importantes.
 O resultado final deve ter exatamente o mesmo conteúdo, apenas apresentado de forma mais legível.
-"""
+Responda apenas com o documento formatado, sem explicações adicionais.
+{FORMATTING_EXAMPLES}{headings_info}{self._create_placeholder_info()}"""
     
-    def _create_formatting_user_prompt(self, content, document_info, context=None):
+    def _create_formatting_user_prompt(self, content, context=None):
         """Cria um prompt de usuário para formatação"""
-        # Adiciona informações contextuais se o documento estiver sendo processado em partes
-        context_info = ""
-        if context:
-            context_info = f"Esta é a parte {context['part']} de {context['total_parts']} do documento completo."
-            
         return f"""
 Por favor, aplique formatação Markdown adequada ao seguinte documento, PRESERVANDO 100% DO CONTEÚDO ORIGINAL.
 
-TÍTULO DO DOCUMENTO: {document_info['title']}
-{context_info}
-
 CONTEÚDO:
 {content}
-
-INSTRUÇÕES ESPECIAIS:
-1. NÃO altere NENHUMA palavra do conteúdo
-2. NÃO remova NADA, mesmo que pareça redundante ou muito detalhado
-3. NÃO adicione conteúdo novo, apenas formatação Markdown
-4. Preserve TODOS os exemplos e detalhes técnicos
-
-Sua tarefa é EXCLUSIVAMENTE melhorar a apresentação visual usando Markdown, mantendo 
-absolutamente todo o conteúdo original intacto.
+{self._create_part_info(context)}
+Lembre-se: NÃO altere, remova ou acrescente NENHUMA palavra; aplique apenas formatação Markdown.
 """
     
     def _save_formatted_markdown(self, formatted_text, document_info):
@@ -712,20 +1947,12 @@ absolutamente todo o conteúdo original intacto.
         # Cria diretório para arquivos temporários
         self.temp_dir.mkdir(exist_ok=True)
         
-        # Sanitiza o título para uso em nome de arquivo
-        sanitized_title = re.sub(r'[^\w\s-]', '', document_info['title']).replace(' ', '_').lower()
-        markdown_filename = f"{sanitized_title}_formatted.md"
-        markdown_filepath = self.temp_dir / markdown_filename
+        file_stem = self._file_stem(document_info)
+        markdown_filepath = self._markdown_filepath(document_info)
+        markdown_filename = markdown_filepath.name
         
         try:
-            # Versão segura que não depende de frontmatter.Post
-            # Constrói manualmente o frontmatter YAML
-            yaml_header = "---\n"
-            yaml_header += f"title: \"{document_info['title']}\"\n"
-            yaml_header += f"author: \"{document_info['author']}\"\n"
-            yaml_header += f"language: \"{document_info['language']}\"\n"
-            yaml_header += f"date: \"{document_info['date']}\"\n"
-            yaml_header += "---\n\n"
+            yaml_header = self._yaml_header(document_info)
                 
             # Salva o arquivo com frontmatter manual
             with open(markdown_filepath, 'w', encoding='utf-8') as f:
@@ -734,7 +1961,7 @@ absolutamente todo o conteúdo original intacto.
             console.print(f"[green]✓ Documento formatado salvo:[/green] {markdown_filepath}")
             
             # Salva backup do conteúdo formatado (para não perder o trabalho)
-            backup_path = self.temp_dir / f"{sanitized_title}_formatted_backup.txt"
+            backup_path = self.temp_dir / f"{file_stem}_formatted_backup.txt"
             with open(backup_path, 'w', encoding='utf-8') as f:
                 f.write(formatted_text)
             console.print(f"[blue]ℹ Backup do conteúdo salvo em:[/blue] {backup_path}")
@@ -753,7 +1980,7 @@ absolutamente todo o conteúdo original intacto.
             
             # Tenta salvar pelo menos o conteúdo formatado
             try:
-                emergency_path = self.temp_dir / f"{sanitized_title}_formatted_emergency.txt"
+                emergency_path = self.temp_dir / f"{file_stem}_formatted_emergency.txt"
                 with open(emergency_path, 'w', encoding='utf-8') as f:
                     f.write(formatted_text)
                 console.print(f"[yellow]⚠ Salvo conteúdo de emergência em:[/yellow] {emergency_path}")
@@ -762,35 +1989,174 @@ absolutamente todo o conteúdo original intacto.
                 
             return None
     
+    def _markdown_filepath(self, document_info):
+        """Caminho do Markdown formatado de um documento em temp/"""
+        return self.temp_dir / f"{self._file_stem(document_info)}_formatted.md"
+    
+    @staticmethod
+    def _sanitized_title(document_info):
+        """Título do documento sanitizado para uso em nome de arquivo"""
+        return re.sub(r'[^\w\s-]', '', document_info['title']).replace(' ', '_').lower()
+    
+    @classmethod
+    def _file_stem(cls, document_info):
+        """Prefixo dos arquivos temporários de um documento
+        
+        Inclui um hash do caminho do arquivo de entrada: documentos diferentes com
+        o mesmo título (no processamento em lote, por exemplo) não compartilham o
+        diário, as partes nem o Markdown intermediário.
+        """
+        stem = cls._sanitized_title(document_info)
+        if document_info.get('source'):
+            stem += f"_{hashlib.sha256(document_info['source'].encode('utf-8')).hexdigest()[:8]}"
+        return stem
+    
+    @staticmethod
+    def _yaml_header(document_info):
+        """Frontmatter YAML do Markdown formatado"""
+        # Versão segura que não depende de frontmatter.Post
+        # Constrói manualmente o frontmatter YAML
+        yaml_header = "---\n"
+        yaml_header += f"title: \"{document_info['title']}\"\n"
+        yaml_header += f"author: \"{document_info['author']}\"\n"
+        yaml_header += f"language: \"{document_info['language']}\"\n"
+        yaml_header += f"date: \"{document_info['date']}\"\n"
+        yaml_header += "---\n\n"
+        return yaml_header
+    
+    @staticmethod
+    def _resolve_output_formats(output_format):
+        """Lista de formatos de saída a partir de "epub", "epub,pdf", "all" ou de uma lista"""
+        if isinstance(output_format, str):
+            output_format = [fmt.strip().lower() for fmt in output_format.split(',') if fmt.strip()]
+        formats = []
+        for fmt in output_format or ['epub']:
+            for resolved in (OUTPUT_FORMATS if fmt == 'all' else [fmt]):
+                if resolved not in formats:
+                    formats.append(resolved)
+        return formats
+    
+    def _output_path(self, output_format, document_info, output_file=None, multiple=False):
+        """Caminho do ebook de saída em um formato"""
+        if output_file:
+            if multiple:
+                # Com vários formatos, a extensão do arquivo informado é trocada pela de cada formato
+                output_file = f"{os.path.splitext(output_file)[0]}.{output_format}"
+            # Se o caminho de saída for absoluto, use-o diretamente
+            if os.path.isabs(output_file):
+                return output_file
+            # Se for relativo, considere-o relativo ao diretório output/formato
+            return str(self.output_dir / output_format / os.path.basename(output_file))
+        # No lote, o nome leva o hash do arquivo de entrada para que títulos iguais não se sobrescrevam
+        stem = self._file_stem(document_info) if self.unique_output_names else self._sanitized_title(document_info)
+        return str(self.output_dir / output_format / f"{stem}.{output_format}")
+    
+    def _check_pandoc(self):
+        """Verifica se o pypandoc e o Pandoc estão disponíveis"""
+        pypandoc = optional_import('pypandoc')
+        if not pypandoc:
+            console.print("[bold yellow]⚠ pypandoc não está instalado.[/bold yellow]")
+            console.print("[blue]ℹ Instale com: pip install pypandoc[/blue]")
+            console.print("[blue]ℹ Você também precisa ter o Pandoc instalado: https://pandoc.org/installing.html[/blue]")
+            return False
+        if not self.toolchain.pandoc_version(pypandoc.get_pandoc_version):
+            console.print("[bold red]✘ Pandoc não encontrado. Por favor, instale-o primeiro.[/bold red]")
+            console.print("[blue]ℹ Instruções: https://pandoc.org/installing.html[/blue]")
+            return False
+        return True
+    
     def _generate_ebook(self, markdown_filepath, output_filepath, output_format, document_info):
         """Gera o ebook no formato solicitado"""
         console.print(f"[cyan]ℹ Gerando ebook em formato {output_format}...[/cyan]")
         
+        if not self._check_pandoc():
+            return False
+        return self._render_format(markdown_filepath, output_filepath, output_format, document_info)
+    
+    def _generate_ebooks(self, markdown_filepath, output_paths, document_info):
+        """Gera o ebook em vários formatos a partir de uma única leitura do Markdown
+        
+        O Markdown é convertido uma vez para a AST JSON do Pandoc (guardada em cache)
+        e cada formato é renderizado em paralelo a partir dela.
+        
+        Returns:
+            dict: formato -> True se gerado com sucesso
+        """
+        formats = list(output_paths)
+        console.print(f"[cyan]ℹ Gerando ebook em {len(formats)} formatos: {', '.join(formats)}...[/cyan]")
+        
+        if not self._check_pandoc():
+            return {fmt: False for fmt in formats}
+        
+        start_time = time.perf_counter()
+        source_filepath, source_format = markdown_filepath, None
+        try:
+            source_filepath, source_format = self._parse_markdown_ast(markdown_filepath), 'json'
+        except Exception as e:
+            # Sem a AST, cada formato lê o Markdown diretamente
+            console.print(f"[yellow]⚠ Não foi possível gerar a AST do Pandoc: {str(e)}[/yellow]")
+            self.log_message(f"Erro ao gerar a AST do Pandoc: {str(e)}", "WARNING")
+        
+        results = {}
+        with ThreadPoolExecutor(max_workers=len(formats)) as executor:
+            futures = {
+                executor.submit(self._render_format, source_filepath, output_paths[fmt], fmt,
+                                document_info, source_format): fmt
+                for fmt in formats
+            }
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+        
+        elapsed = time.perf_counter() - start_time
+        console.print(f"[blue]ℹ {sum(results.values())} de {len(formats)} formatos gerados em {elapsed:.1f}s[/blue]")
+        self.log_message(f"Exportação em vários formatos: {results} em {elapsed:.1f}s")
+        return {fmt: results[fmt] for fmt in formats}
+    
+    def _parse_markdown_ast(self, markdown_filepath, keep=20):
+        """Converte o Markdown para a AST JSON do Pandoc, reaproveitando a conversão em cache"""
+        pypandoc = optional_import('pypandoc')
+        # Hash em blocos, sem carregar o Markdown inteiro em memória
+        digest = hashlib.sha256()
+        with open(markdown_filepath, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        digest = digest.hexdigest()
+        version = self.toolchain.pandoc_version(pypandoc.get_pandoc_version)
+        ast_dir = self.cache_dir / "ast"
+        ast_path = ast_dir / f"{digest[:32]}_{version}.json"
+        if ast_path.exists():
+            os.utime(ast_path)
+            console.print("[green]✓ AST do Pandoc recuperada do cache[/green]")
+            return ast_path
+        
+        console.print("[cyan]ℹ Convertendo o Markdown para a AST do Pandoc...[/cyan]")
+        ast_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = ast_path.with_name(f"{ast_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        # O Pandoc grava a AST diretamente no arquivo, sem passar por uma string em memória
+        pypandoc.convert_file(str(markdown_filepath), 'json', format='markdown', outputfile=str(tmp_path))
+        os.replace(tmp_path, ast_path)
+        
+        # Mantém apenas as ASTs usadas mais recentemente
+        for old_path in sorted(ast_dir.glob('*.json'), key=lambda path: path.stat().st_mtime)[:-keep]:
+            try:
+                old_path.unlink()
+            except OSError:
+                pass
+        return ast_path
+    
+    def _render_format(self, source_filepath, output_filepath, output_format, document_info, source_format=None):
+        """Renderiza um formato a partir do Markdown ou da AST JSON do Pandoc"""
         # Verifica se o diretório de saída existe
         os.makedirs(os.path.dirname(output_filepath), exist_ok=True)
         
-        if not PYPANDOC_AVAILABLE:
-            console.print("[bold yellow]⚠ pypandoc não está instalado.[/bold yellow]")
-            console.print("[blue]ℹ Instale com: pip install pypandoc[/blue]")
-            console.print("[blue]ℹ Você também precisa ter o Pandoc instalado: https://pandoc.org/installing.html[/blue]")
-            return False
-            
         try:
-            # Verifica se o Pandoc está instalado
-            try:
-                pypandoc.get_pandoc_version()
-            except:
-                console.print("[bold red]✘ Pandoc não encontrado. Por favor, instale-o primeiro.[/bold red]")
-                console.print("[blue]ℹ Instruções: https://pandoc.org/installing.html[/blue]")
-                return False
-                
             # Gera o arquivo no formato solicitado
             if output_format == 'epub':
-                return self._generate_epub(markdown_filepath, output_filepath, document_info)
+                return self._generate_epub(source_filepath, output_filepath, document_info, source_format)
             elif output_format == 'pdf':
-                return self._generate_pdf(markdown_filepath, output_filepath, document_info)
+                return self._generate_pdf(source_filepath, output_filepath, document_info, source_format)
             elif output_format == 'html':
-                return self._generate_html(markdown_filepath, output_filepath, document_info)
+                return self._generate_html(source_filepath, output_filepath, document_info, source_format)
             else:
                 console.print(f"[bold red]✘ Formato não suportado: {output_format}[/bold red]")
                 return False
@@ -800,8 +2166,9 @@ absolutamente todo o conteúdo original intacto.
             self.log_message(f"Erro ao gerar ebook: {str(e)}", "ERROR")
             return False
     
-    def _generate_epub(self, markdown_filepath, output_filepath, document_info):
+    def _generate_epub(self, markdown_filepath, output_filepath, document_info, source_format=None):
         """Gera ebook em formato EPUB"""
+        pypandoc = optional_import('pypandoc')
         # Verifica o arquivo de capa
         cover_image = self.config.get('ebook', {}).get('cover_image', '')
         cover_args = []
@@ -837,6 +2204,7 @@ absolutamente todo o conteúdo original intacto.
             pypandoc.convert_file(
                 str(markdown_filepath),
                 'epub',
+                format=source_format,
                 outputfile=str(output_filepath),
                 extra_args=options
             )
@@ -848,8 +2216,9 @@ absolutamente todo o conteúdo original intacto.
             self.log_message(f"Erro ao gerar EPUB: {str(e)}", "ERROR")
             return False
     
-    def _generate_pdf(self, markdown_filepath, output_filepath, document_info):
+    def _generate_pdf(self, markdown_filepath, output_filepath, document_info, source_format=None):
         """Gera ebook em formato PDF"""
+        pypandoc = optional_import('pypandoc')
         # Cria arquivo CSS para o PDF
         css_file = self.styles_dir / "pdf.css"
         
@@ -857,91 +2226,56 @@ absolutamente todo o conteúdo original intacto.
             with open(css_file, 'w', encoding='utf-8') as f:
                 f.write(self._get_default_pdf_css())
         
-        # Tenta encontrar o wkhtmltopdf no sistema
-        wkhtmltopdf_path = None
-        possible_paths = [
-            'C:\\Program Files\\wkhtmltopdf\\bin\\wkhtmltopdf.exe',
-            'C:\\Program Files (x86)\\wkhtmltopdf\\bin\\wkhtmltopdf.exe',
-            '/usr/bin/wkhtmltopdf',
-            '/usr/local/bin/wkhtmltopdf'
-        ]
-        
-        for path in possible_paths:
-            if os.path.exists(path):
-                wkhtmltopdf_path = path
-                console.print(f"[green]✓ wkhtmltopdf encontrado em: {wkhtmltopdf_path}[/green]")
-                break
-        
         # Opções para o Pandoc
         options = [
             '--toc',
             '--toc-depth=3',
-        ]
-        
-        # Adiciona o caminho do wkhtmltopdf se encontrado
-        if wkhtmltopdf_path:
-            options.append(f'--pdf-engine={wkhtmltopdf_path}')
-        else:
-            options.append('--pdf-engine=wkhtmltopdf')  # tenta usar do PATH
-        
-        # Adiciona as outras opções
-        options.extend([
             f'--css={css_file}',
             f'--metadata=title:{document_info["title"]}',
             f'--metadata=author:{document_info["author"] or "Autor"}',
             f'--metadata=lang:{document_info["language"]}'
-        ])
-        
-        # Executa Pandoc para conversão
-        console.print("[cyan]ℹ Executando Pandoc para converter para PDF...[/cyan]")
+        ]
         
-        try:
-            pypandoc.convert_file(
-                str(markdown_filepath),
-                'pdf',
-                outputfile=str(output_filepath),
-                extra_args=options
-            )
-            
-            console.print(f"[green]✓ PDF gerado com sucesso:[/green] {output_filepath}")
-            return True
-        except Exception as e:
-            console.print(f"[bold red]✘ Erro na geração do PDF:[/bold red] {str(e)}")
-            self.log_message(f"Erro na geração do PDF: {str(e)}", "ERROR")
-            
-            # Sugestão alternativa se wkhtmltopdf falhar
-            console.print("[yellow]⚠ Sugestão: Se o erro for com wkhtmltopdf, tente instalar:[/yellow]")
+        # Motores conhecidos do mais rápido para o mais lento; os que já falharam ficam por último
+        preferred = self.config.get('export', {}).get('formats', {}).get('pdf', {}).get('engine', 'wkhtmltopdf')
+        engines = self.toolchain.pdf_engines(preferred)
+        if not engines:
+            console.print("[bold red]✘ Nenhum motor de PDF encontrado (wkhtmltopdf, weasyprint ou xelatex)[/bold red]")
             console.print("[blue]ℹ Windows: https://wkhtmltopdf.org/downloads.html[/blue]")
             console.print("[blue]ℹ Linux: sudo apt-get install wkhtmltopdf[/blue]")
             console.print("[blue]ℹ Mac: brew install wkhtmltopdf[/blue]")
-            
-            # Tenta alternativa com weasyprint se disponível
+            return False
+        
+        source_bytes = os.path.getsize(markdown_filepath)
+        for engine, engine_path in engines:
+            # Executa Pandoc para conversão
+            console.print(f"[cyan]ℹ Executando Pandoc para converter para PDF com {engine}...[/cyan]")
+            start_time = time.perf_counter()
             try:
-                console.print("[cyan]ℹ Tentando alternativa com weasyprint...[/cyan]")
-                alt_options = options.copy()
-                # Substitui o engine de PDF
-                for i, opt in enumerate(alt_options):
-                    if opt.startswith('--pdf-engine='):
-                        alt_options[i] = '--pdf-engine=weasyprint'
-                        break
-                else:
-                    alt_options.append('--pdf-engine=weasyprint')
-                
                 pypandoc.convert_file(
                     str(markdown_filepath),
                     'pdf',
+                    format=source_format,
                     outputfile=str(output_filepath),
-                    extra_args=alt_options
+                    extra_args=options + [f'--pdf-engine={engine_path}']
                 )
-                
-                console.print(f"[green]✓ PDF gerado com sucesso usando weasyprint:[/green] {output_filepath}")
-                return True
-            except Exception as alt_e:
-                console.print(f"[bold red]✘ Alternativa também falhou:[/bold red] {str(alt_e)}")
-                return False
+            except Exception as e:
+                self.toolchain.record_render(engine, time.perf_counter() - start_time, source_bytes, False)
+                console.print(f"[bold red]✘ Erro na geração do PDF com {engine}:[/bold red] {str(e)}")
+                self.log_message(f"Erro na geração do PDF com {engine}: {str(e)}", "ERROR")
+                continue
+            
+            self.toolchain.record_render(engine, time.perf_counter() - start_time, source_bytes, True)
+            console.print(f"[green]✓ PDF gerado com sucesso usando {engine}:[/green] {output_filepath}")
+            self.log_message(f"Ferramentas: {self.toolchain.summary()}")
+            return True
+        
+        console.print("[bold red]✘ Nenhum motor de PDF conseguiu gerar o arquivo[/bold red]")
+        return False
     
-    def _generate_html(self, markdown_filepath, output_filepath, document_info):
+    def _generate_html(self, markdown_filepath, output_filepath, document_info, source_format=None):
         """Gera ebook em formato HTML"""
+        pypandoc = optional_import('pypandoc')
         # Cria arquivo CSS para o HTML
         css_file = self.styles_dir / "html.css"
         
@@ -975,6 +2309,7 @@ absolutamente todo o conteúdo original intacto.
             pypandoc.convert_file(
                 str(markdown_filepath),
                 'html',
+                format=source_format,
                 outputfile=str(output_filepath),
                 extra_args=options
             )
@@ -998,6 +2333,7 @@ absolutamente todo o conteúdo original intacto.
                 pypandoc.convert_file(
                     str(markdown_filepath),
                     'html',
+                    format=source_format,
                     outputfile=str(output_filepath),
                     extra_args=simple_options
                 )
@@ -0,0 +1,111 @@
+import tempfile
+import time
+
+# Montagem das respostas em streaming: cada trecho (delta) recebido é guardado
+# em uma lista (ou, acima de um limite, gravado em um arquivo temporário já
+# aberto) e repassado a consumidores incrementais. O texto completo é montado
+# uma única vez, ao final, em vez de concatenações sucessivas.
+
+SPOOL_THRESHOLD = 8 * 1024 * 1024  # caracteres mantidos em memória antes de gravar em disco
+
+
+class StreamSink:
+    """Destino dos trechos de uma resposta em streaming"""
+
+    def __init__(self, consumers=(), spool_threshold=SPOOL_THRESHOLD):
+        self.consumers = list(consumers)
+        self.spool_threshold = spool_threshold
+        self.size = 0
+        self._parts = []
+        self._file = None
+
+    def write(self, text):
+        self.size += len(text)
+        if self._file is not None:
+            self._file.write(text)
+        else:
+            self._parts.append(text)
+            if self.spool_threshold and self.size > self.spool_threshold:
+                self._spool()
+        for consumer in self.consumers:
+            consumer.feed(text)
+
+    def _spool(self):
+        self._file = tempfile.TemporaryFile('w+', encoding='utf-8')
+        self._file.writelines(self._parts)
+        self._parts = []
+
+    def getvalue(self):
+        """Texto completo recebido até agora"""
+        if self._file is None:
+            return ''.join(self._parts)
+        self._file.flush()
+        self._file.seek(0)
+        text = self._file.read()
+        self._file.seek(0, 2)
+        return text
+
+    def close(self):
+        for consumer in self.consumers:
+            consumer.close()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class WordCounter:
+    """Conta as palavras recebidas, inclusive as divididas entre dois trechos"""
+
+    def __init__(self):
+        self.count = 0
+        self._in_word = False
+
+    def feed(self, text):
+        if not text:
+            return
+        words = len(text.split())
+        # A primeira palavra do trecho continua a última do trecho anterior
+        if words and self._in_word and not text[0].isspace():
+            words -= 1
+        self.count += words
+        self._in_word = not text[-1].isspace()
+
+    def close(self):
+        pass
+
+
+class ThrottledProgress:
+    """Indicador de progresso desenhado no máximo uma vez por intervalo
+
+    Sem render, imprime um ponto por intervalo (o indicador usado até aqui
+    imprimia um ponto por trecho recebido).
+    """
+
+    def __init__(self, interval=1.0, render=None):
+        self.interval = interval
+        self.render = render
+        self.received = 0
+        self._last = time.monotonic()
+        self._rendered = False
+
+    def feed(self, text):
+        self.received += len(text)
+        now = time.monotonic()
+        if now - self._last < self.interval:
+            return
+        self._last = now
+        self._rendered = True
+        if self.render:
+            self.render(self.received)
+        else:
+            print(".", end="", flush=True)
+
+    def close(self):
+        if self._rendered and not self.render:
+            print()  # Nova linha após terminar
@@ -0,0 +1,61 @@
+import codecs
+import os
+
+# Leitura incremental de documentos de texto para o modo streaming: os
+# parágrafos são produzidos um a um, sem carregar o arquivo inteiro, de modo
+# que a memória usada não depende do tamanho do livro.
+
+FALLBACK_ENCODINGS = ('latin-1', 'cp1252', 'iso-8859-1')
+BLOCK_SIZE = 1 << 20
+
+
+def detect_encoding(path, block_size=BLOCK_SIZE):
+    """Codificação do arquivo: UTF-8 se todo o arquivo for válido, senão a primeira alternativa
+
+    O arquivo é percorrido em blocos com um decodificador incremental, sem
+    guardar o texto decodificado.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        with open(path, 'rb') as f:
+            while True:
+                block = f.read(block_size)
+                if not block:
+                    decoder.decode(b'', final=True)
+                    return 'utf-8'
+                decoder.decode(block)
+    except UnicodeDecodeError:
+        return FALLBACK_ENCODINGS[0]
+
+
+def iter_text_paragraphs(path, encoding='utf-8', max_chars=64 * 1024):
+    """Parágrafos (separados por linhas em branco) de um arquivo de texto
+
+    Um parágrafo que ultrapasse max_chars é entregue em pedaços, sempre em
+    fim de linha, para que um arquivo sem linhas em branco não acabe inteiro
+    em memória.
+    """
+    lines = []
+    size = 0
+    with open(path, 'r', encoding=encoding) as f:
+        for line in f:
+            line = line.rstrip('\r\n')
+            if not line.strip():
+                if lines:
+                    yield '\n'.join(lines)
+                    lines, size = [], 0
+                continue
+            lines.append(line)
+            size += len(line) + 1
+            if size >= max_chars:
+                yield '\n'.join(lines)
+                lines, size = [], 0
+    if lines:
+        yield '\n'.join(lines)
+
+
+def file_size_mb(path):
+    try:
+        return os.path.getsize(path) / 1_000_000
+    except OSError:
+        return 0.0
@@ -0,0 +1,165 @@
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+
+# Caminhos conhecidos do wkhtmltopdf fora do PATH (instalador do Windows)
+WKHTMLTOPDF_PATHS = [
+    'C:\\Program Files\\wkhtmltopdf\\bin\\wkhtmltopdf.exe',
+    'C:\\Program Files (x86)\\wkhtmltopdf\\bin\\wkhtmltopdf.exe',
+    '/usr/bin/wkhtmltopdf',
+    '/usr/local/bin/wkhtmltopdf',
+]
+
+PDF_ENGINES = ('wkhtmltopdf', 'weasyprint', 'xelatex')
+
+SMOOTHING = 0.3
+
+
+def _find_binary(name):
+    """Caminho do executável no PATH ou nos caminhos conhecidos"""
+    path = shutil.which(name)
+    if path:
+        return path
+    if name == 'wkhtmltopdf':
+        for candidate in WKHTMLTOPDF_PATHS:
+            if os.path.exists(candidate):
+                return candidate
+    return None
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except (OSError, TypeError):
+        return None
+
+
+class Toolchain:
+    """Capacidades do Pandoc e dos motores de PDF, persistidas entre execuções.
+
+    Guarda a versão do Pandoc, os motores de PDF encontrados, as falhas e o
+    tempo médio de renderização de cada motor. Uma entrada só é refeita
+    quando o executável muda (caminho ou data de modificação), de modo que as
+    execuções seguintes não pagam pelas sondagens nem por tentativas que já
+    falharam antes.
+    """
+
+    def __init__(self, cache_path, pandoc_path=None):
+        self.cache_path = Path(cache_path)
+        self._pandoc_path = pandoc_path
+        self._lock = threading.Lock()
+        self._data = None
+
+    def _load(self):
+        if self._data is not None:
+            return self._data
+        data = {}
+        if self.cache_path.exists():
+            try:
+                with open(self.cache_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = {}
+        data.setdefault('pandoc', {})
+        data.setdefault('pdf_engines', {})
+        self._data = data
+        return data
+
+    def _save(self):
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            # Nome único por processo e thread: os processos do lote gravam o mesmo arquivo
+            tmp_path = self.cache_path.with_name(f"{self.cache_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._data, f, indent=2)
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _stale(entry, path):
+        return entry.get('path') != path or entry.get('mtime') != _mtime(path)
+
+    def pandoc_version(self, probe):
+        """Versão do Pandoc, consultando `probe()` apenas se o executável mudou
+
+        Returns:
+            str ou None se o Pandoc não estiver disponível
+        """
+        with self._lock:
+            data = self._load()
+            path = self._pandoc_path or _find_binary('pandoc')
+            entry = data['pandoc']
+            # Uma sondagem sem sucesso é refeita na próxima vez (o Pandoc pode ter sido instalado)
+            if entry.get('version') is None or self._stale(entry, path):
+                try:
+                    version = probe()
+                except Exception:
+                    version = None
+                data['pandoc'] = {'path': path, 'mtime': _mtime(path), 'version': version}
+                self._save()
+            return data['pandoc']['version']
+
+    def pdf_engines(self, preferred=None):
+        """Motores de PDF utilizáveis, do mais rápido para o mais lento
+
+        Motores já medidos vêm primeiro, ordenados pelo tempo médio de renderização;
+        depois os ainda não medidos, começando pelo preferido na configuração.
+        Motores que falharam com o executável atual ficam por último, apenas
+        como alternativa final.
+
+        Returns:
+            list: tuplas (nome, caminho do executável)
+        """
+        with self._lock:
+            data = self._load()
+            engines = data['pdf_engines']
+            changed = False
+            for name in PDF_ENGINES:
+                path = _find_binary(name)
+                entry = engines.get(name)
+                if entry is None or self._stale(entry, path):
+                    engines[name] = {'path': path, 'mtime': _mtime(path), 'failed': False,
+                                     'seconds_per_mb': None, 'renders': 0}
+                    changed = True
+            if changed:
+                self._save()
+
+            usable = [(name, entry) for name, entry in engines.items()
+                      if name in PDF_ENGINES and entry['path']]
+
+            def order(item):
+                name, entry = item
+                speed = entry['seconds_per_mb']
+                return (entry['failed'], speed is None, speed or 0, name != preferred, PDF_ENGINES.index(name))
+
+            return [(name, entry['path']) for name, entry in sorted(usable, key=order)]
+
+    def record_render(self, engine, seconds, source_bytes, success):
+        """Registra o resultado de uma renderização de PDF"""
+        with self._lock:
+            entry = self._load()['pdf_engines'].get(engine)
+            if entry is None:
+                return
+            if not success:
+                entry['failed'] = True
+            else:
+                entry['failed'] = False
+                speed = seconds / max(source_bytes / 1_000_000, 0.001)
+                previous = entry['seconds_per_mb']
+                entry['seconds_per_mb'] = round(speed if previous is None
+                                                else previous + SMOOTHING * (speed - previous), 3)
+                entry['renders'] = entry.get('renders', 0) + 1
+            self._save()
+
+    def summary(self):
+        """Descrição curta das capacidades conhecidas, para o log"""
+        data = self._load()
+        engines = ", ".join(
+            f"{name}={'falhou' if entry['failed'] else entry['seconds_per_mb'] or 'não medido'}"
+            for name, entry in data['pdf_engines'].items() if entry.get('path')
+        )
+        return f"pandoc {data['pandoc'].get('version')}; motores de PDF: {engines or 'nenhum'}"
+
@@ -0,0 +1,24 @@
+from types import SimpleNamespace
+
+from src.chunk_cache import ChunkCache
+from src.simple_ebook_manager import SimpleEbookManager
+
+
+def bare_manager(tmp_path, config=None):
+    """Gerenciador sem diretórios nem cliente, para testar métodos isolados"""
+    manager = SimpleEbookManager.__new__(SimpleEbookManager)
+    manager.config = config or {'ai': {}, 'formatting': {}}
+    manager.log_file = tmp_path / "test.log"
+    manager.temp_dir = tmp_path
+    manager.cache = ChunkCache(tmp_path / "cache")
+    manager.model_router = None
+    manager.unique_output_names = False
+    manager._token_estimators = {}
+    return manager
+
+
+def final_message(stop_reason='end_turn', input_tokens=100, output_tokens=50):
+    """Mensagem final no formato devolvido pelo SDK da Anthropic"""
+    usage = SimpleNamespace(input_tokens=input_tokens, output_tokens=output_tokens,
+                            cache_creation_input_tokens=0, cache_read_input_tokens=0)
+    return SimpleNamespace(stop_reason=stop_reason, usage=usage)
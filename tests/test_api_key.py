@@ -0,0 +1,48 @@
+from src import simple_ebook_manager
+from src.simple_ebook_manager import SimpleEbookManager
+
+from tests.helpers import bare_manager
+
+
+def test_needs_api_only_for_modes_that_call_it(tmp_path):
+    manager = bare_manager(tmp_path, {'ai': {}, 'formatting': {'formatter': 'local'}})
+    assert not manager._needs_api()
+    assert manager._needs_api(streaming=True)
+
+    manager.config['formatting']['consistency_pass'] = 'llm'
+    assert manager._needs_api()
+
+    manager.config['formatting'] = {'formatter': 'hybrid'}
+    assert manager._needs_api()
+
+
+def test_api_key_is_resolved_before_formatting(tmp_path, monkeypatch):
+    source = tmp_path / "livro.txt"
+    source.write_text("Texto do livro.\n", encoding='utf-8')
+    manager = bare_manager(tmp_path, {'ai': {}, 'formatting': {'formatter': 'ai'}})
+    # setenv antes de delenv para que o valor gravado pelo prompt seja desfeito ao final
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "")
+    monkeypatch.delenv("ANTHROPIC_API_KEY")
+    events = []
+
+    def fake_input(prompt):
+        events.append('prompt')
+        return 'chave-de-teste'
+
+    def fake_format(*args, **kwargs):
+        events.append('format')
+        return None
+
+    monkeypatch.setattr(simple_ebook_manager.console, 'input', fake_input, raising=False)
+    monkeypatch.setattr(manager, '_use_streaming', lambda filepath, stream: False)
+    monkeypatch.setattr(manager, '_extract_text_from_document', lambda filepath: "Texto do livro.")
+    monkeypatch.setattr(manager, '_extract_document_info',
+                        lambda *args: {'title': 'Livro', 'author': '', 'language': 'pt-BR', 'date': ''})
+    monkeypatch.setattr(manager, '_build_document_index', lambda *args: None)
+    monkeypatch.setattr(manager, '_infer_headings', lambda *args: None)
+    monkeypatch.setattr(manager, '_format_document', fake_format)
+    monkeypatch.setattr(manager, '_report_cache_stats', lambda: None)
+    monkeypatch.setattr(manager, '_report_token_usage', lambda: None)
+
+    assert SimpleEbookManager.process_document(manager, str(source)) is False
+    assert events == ['prompt', 'format']
@@ -0,0 +1,48 @@
+import csv
+import os
+
+from src.batch import batch_needs_api, collect_documents, write_summary
+
+
+def test_local_batch_does_not_need_the_api(tmp_path):
+    document = tmp_path / "livro.txt"
+    document.write_text("Texto.\n", encoding='utf-8')
+    config = {'formatting': {'formatter': 'local', 'consistency_pass': 'local'}}
+
+    assert not batch_needs_api([str(document)], config)
+    assert batch_needs_api([str(document)], config, stream=True)
+    assert batch_needs_api([str(document)], {'formatting': {'formatter': 'hybrid'}})
+    assert batch_needs_api([str(document)], {'formatting': {'formatter': 'local', 'consistency_pass': 'seams'}})
+
+
+def test_large_files_stream_and_need_the_api(tmp_path):
+    document = tmp_path / "grande.txt"
+    document.write_text("palavra " * 200_000, encoding='utf-8')
+    config = {'formatting': {'formatter': 'local', 'streaming_min_mb': 1}}
+
+    assert batch_needs_api([str(document)], config)
+    assert not batch_needs_api([str(document)], config, stream=False)
+
+
+def test_collect_documents_filters_and_sorts(tmp_path):
+    for name in ("b.docx", "a.TXT", "notas.md", "capa.png", "sub/c.docx"):
+        path = tmp_path / name
+        path.parent.mkdir(exist_ok=True)
+        path.write_text("x", encoding='utf-8')
+    (tmp_path / "pasta.docx").mkdir()
+
+    def names(paths):
+        return [os.path.relpath(path, tmp_path) for path in paths]
+
+    assert names(collect_documents(str(tmp_path))) == ["a.TXT", "b.docx", "notas.md"]
+    assert names(collect_documents(str(tmp_path), recursive=True)) == ["a.TXT", "b.docx", "notas.md", "sub/c.docx"]
+    assert names(collect_documents(str(tmp_path / "*.docx"))) == ["b.docx"]
+
+
+def test_summary_is_written_as_csv(tmp_path):
+    summary = [{'document': 'livro.docx', 'status': 'ok', 'duration': 1.5, 'requests': 3}]
+    path = tmp_path / "logs" / "batch.csv"
+    write_summary(summary, path)
+    with open(path, encoding='utf-8', newline='') as f:
+        assert list(csv.DictReader(f)) == [{'document': 'livro.docx', 'status': 'ok', 'duration': '1.5',
+                                            'requests': '3'}]
@@ -0,0 +1,37 @@
+from src.simple_ebook_manager import read_config
+
+from tests.helpers import bare_manager
+
+
+def _info(source, title='Meu Livro'):
+    return {'title': title, 'author': '', 'language': 'pt-BR', 'date': '2026-01-01', 'source': source}
+
+
+def test_same_title_documents_use_separate_temp_files(tmp_path):
+    manager = bare_manager(tmp_path)
+    first = _info(str(tmp_path / 'a' / 'livro.docx'))
+    second = _info(str(tmp_path / 'b' / 'livro.docx'))
+
+    assert manager._journal_path(first) != manager._journal_path(second)
+    assert manager._markdown_filepath(first) != manager._markdown_filepath(second)
+    assert manager._markdown_filepath(first) == manager._markdown_filepath(dict(first))
+
+
+def test_batch_output_names_include_input_hash(tmp_path):
+    manager = bare_manager(tmp_path)
+    manager.output_dir = tmp_path / 'output'
+    first = _info(str(tmp_path / 'a' / 'livro.docx'))
+    second = _info(str(tmp_path / 'b' / 'livro.docx'))
+
+    assert manager._output_path('epub', first) == manager._output_path('epub', second)
+    manager.unique_output_names = True
+    assert manager._output_path('epub', first) != manager._output_path('epub', second)
+    assert manager._output_path('epub', first).endswith('.epub')
+
+
+def test_read_config_resolves_relative_to_base_dir(tmp_path):
+    (tmp_path / 'lote.yaml').write_text("ai:\n  concurrency: 7\n", encoding='utf-8')
+
+    config, config_file = read_config('lote.yaml', tmp_path)
+    assert config['ai']['concurrency'] == 7
+    assert read_config('ausente.yaml', tmp_path)[0] is None
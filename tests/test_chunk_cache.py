@@ -0,0 +1,40 @@
+from tests.helpers import bare_manager, final_message
+
+
+def test_renaming_the_document_keeps_cached_chunks(tmp_path):
+    manager = bare_manager(tmp_path)
+    requests = []
+
+    def stream(model, temperature, system_prompt, messages, metrics=None, cache_prompt=False):
+        requests.append(system_prompt)
+        return "texto formatado", final_message()
+
+    manager._stream_message = stream
+    formatted, entry = manager._format_content_chunk("texto original", {'title': 'Primeiro Título'})
+    manager.cache.put(*entry)
+    assert 'Primeiro Título' in requests[0]
+
+    formatted, entry = manager._format_content_chunk("texto original", {'title': 'Outro Título'})
+    assert (formatted, entry) == ("texto formatado", None)
+    assert len(requests) == 1
+
+
+def test_cached_title_heading_follows_a_rename(tmp_path):
+    manager = bare_manager(tmp_path)
+    manager._stream_message = lambda *args, **kwargs: ("# Primeiro Título\n\ntexto original", final_message())
+    formatted, entry = manager._format_content_chunk("texto original", {'title': 'Primeiro Título'})
+    manager.cache.put(*entry)
+    assert formatted.startswith("# Primeiro Título")
+
+    formatted, _ = manager._format_content_chunk("texto original", {'title': 'Outro Título'})
+    assert formatted == "# Outro Título\n\ntexto original"
+
+
+def test_cached_heading_from_the_source_is_kept(tmp_path):
+    manager = bare_manager(tmp_path)
+    manager._stream_message = lambda *args, **kwargs: ("# Capítulo Um\n\ntexto", final_message())
+    _, entry = manager._format_content_chunk("Capítulo Um\n\ntexto", {'title': 'Livro'})
+    manager.cache.put(*entry)
+
+    formatted, _ = manager._format_content_chunk("Capítulo Um\n\ntexto", {'title': 'Livro Renomeado'})
+    assert formatted == "# Capítulo Um\n\ntexto"
@@ -0,0 +1,41 @@
+from src.content_verifier import markdown_words, verify_content
+from src.markdown_normalizer import normalize_markdown
+
+
+def test_list_numbers_are_not_counted_as_words():
+    assert markdown_words("1. Primeiro\n2) Segundo\n- Terceiro\na) Quarto\nb) Quinto") == \
+        ['primeiro', 'segundo', 'terceiro', 'quarto', 'quinto']
+
+
+def test_letter_items_keep_their_words_in_prose():
+    source = "Ela leu as alternativas com calma\ne) nenhuma delas servia, então saiu."
+    assert markdown_words(source)[:8] == ['ela', 'leu', 'as', 'alternativas', 'com', 'calma', 'e', 'nenhuma']
+
+    formatted = "Ela leu as alternativas com calma nenhuma delas servia, então saiu."
+    assert verify_content(source, formatted).deletions == 1
+
+
+def test_letter_list_turned_into_bullets_is_not_an_insertion():
+    source = "Opções:\n\na) Café\nb) Chá\nc) Água"
+    formatted = "Opções:\n\n- a) Café\n- b) Chá\n- c) Água"
+    result = verify_content(source, formatted)
+    assert result.insertions == 0 and result.deletions == 0
+
+
+def test_renumbered_list_is_not_an_insertion():
+    source = "Passos:\n\n1. Abrir o arquivo\n1. Editar o texto\n1. Salvar"
+    formatted = "Passos:\n\n1. Abrir o arquivo\n2. Editar o texto\n3. Salvar"
+
+    result = verify_content(source, formatted)
+    assert result.insertions == 0 and result.deletions == 0
+
+
+def test_list_created_from_plain_lines_is_not_an_insertion():
+    source = "Ingredientes\n\nFarinha\n\nAçúcar\n\nOvos"
+    formatted, _ = normalize_markdown("## Ingredientes\n\n1. Farinha\n1. Açúcar\n1. Ovos")
+
+    assert verify_content(source, formatted).insertions == 0
+
+
+def test_numbers_inside_text_still_count():
+    assert markdown_words("Foram 3 dias e 2. capítulos") == ['foram', '3', 'dias', 'e', '2', 'capítulos']
@@ -0,0 +1,79 @@
+import zipfile
+
+from src.docx_reader import read_docx_markdown
+
+NS = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+STYLES = f"""<w:styles {NS}>
+  <w:style w:styleId="Title"><w:name w:val="Title"/></w:style>
+  <w:style w:styleId="Heading1"><w:name w:val="heading 1"/></w:style>
+  <w:style w:styleId="Ttulo2"><w:name w:val="Título 2"/></w:style>
+  <w:style w:styleId="Destaque"><w:name w:val="Destaque"/><w:pPr><w:outlineLvl w:val="2"/></w:pPr></w:style>
+</w:styles>"""
+
+NUMBERING = f"""<w:numbering {NS}>
+  <w:abstractNum w:abstractNumId="0"><w:lvl w:ilvl="0"><w:numFmt w:val="bullet"/></w:lvl></w:abstractNum>
+  <w:abstractNum w:abstractNumId="1"><w:lvl w:ilvl="0"><w:numFmt w:val="decimal"/></w:lvl></w:abstractNum>
+  <w:num w:numId="1"><w:abstractNumId w:val="0"/></w:num>
+  <w:num w:numId="2"><w:abstractNumId w:val="1"/></w:num>
+</w:numbering>"""
+
+
+def _paragraph(text, style=None, num_id=None):
+    properties = ''
+    if style:
+        properties += f'<w:pStyle w:val="{style}"/>'
+    if num_id:
+        properties += f'<w:numPr><w:ilvl w:val="0"/><w:numId w:val="{num_id}"/></w:numPr>'
+    return f'<w:p><w:pPr>{properties}</w:pPr><w:r><w:t>{text}</w:t></w:r></w:p>'
+
+
+def _table(rows):
+    cells = ''.join('<w:tr>' + ''.join(f'<w:tc>{_paragraph(cell)}</w:tc>' for cell in row) + '</w:tr>'
+                    for row in rows)
+    return f'<w:tbl>{cells}</w:tbl>'
+
+
+def _docx(path, body, numbering=True):
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr('word/document.xml', f'<w:document {NS}><w:body>{body}</w:body></w:document>')
+        archive.writestr('word/styles.xml', STYLES)
+        if numbering:
+            archive.writestr('word/numbering.xml', NUMBERING)
+    return path
+
+
+def test_headings_lists_and_tables_become_markdown(tmp_path):
+    body = ''.join([
+        _paragraph("Meu Livro", "Title"),
+        _paragraph("Capítulo 1", "Heading1"),
+        _paragraph("Seção 1.1", "Ttulo2"),
+        _paragraph("Um parágrafo comum."),
+        _paragraph("Nota importante", "Destaque"),
+        _paragraph("farinha", num_id="1"),
+        _paragraph("açúcar", num_id="1"),
+        _paragraph("Misture", num_id="2"),
+        _paragraph("Asse", num_id="2"),
+        _table([["Plano", "Preço"], ["Básico", "R$ 20"]]),
+        _table([["Caixa de texto"]]),
+    ])
+    text, stats = read_docx_markdown(_docx(tmp_path / "livro.docx", body))
+
+    assert text.split('\n\n') == [
+        "# Meu Livro",
+        "## Capítulo 1",
+        "### Seção 1.1",
+        "Um parágrafo comum.",
+        "#### Nota importante",
+        "- farinha\n- açúcar",
+        "1. Misture\n1. Asse",
+        "| Plano | Preço |\n| --- | --- |\n| Básico | R$ 20 |",
+        "Caixa de texto",
+    ]
+    assert stats == {'paragraphs': 9, 'headings': 4, 'list_items': 4, 'tables': 2}
+
+
+def test_breaks_and_tabs_are_kept(tmp_path):
+    body = '<w:p><w:r><w:t>linha 1</w:t><w:br/><w:t>coluna</w:t><w:tab/><w:t>valor</w:t></w:r></w:p>'
+    text, _ = read_docx_markdown(_docx(tmp_path / "quebras.docx", body, numbering=False))
+    assert text == "linha 1\ncoluna\tvalor"
@@ -0,0 +1,61 @@
+import re
+
+from src.content_verifier import markdown_words
+from src.edit_script import apply_edit_script, number_lines, parse_edit_script
+from src.formatting_examples import EDIT_SCRIPT_EXAMPLES
+
+CONTENT = "\n".join([
+    "Modo de preparo",
+    "1) Misture os ingredientes secos.",
+    "2) Acrescente os ovos um a um.",
+    "Plano\tUsuários\tPreço",
+    "Básico\t1\tR$ 20",
+    "Atenção: nunca abra o forno.",
+])
+
+
+def _keeps_every_word(source, markdown):
+    """As palavras do texto original aparecem, em ordem, no Markdown gerado"""
+    remaining = iter(markdown_words(markdown))
+    return all(word in remaining for word in markdown_words(source))
+
+
+def test_script_builds_markdown_from_the_original_text():
+    markdown, ignored = apply_edit_script(CONTENT, "H 1 3\nOL 2-3\nTABLE 4-5\nB 6 Atenção:")
+    assert ignored == 0
+    assert markdown == (
+        "### Modo de preparo\n\n"
+        "1. Misture os ingredientes secos.\n"
+        "2. Acrescente os ovos um a um.\n\n"
+        "| Plano | Usuários | Preço |\n"
+        "| --- | --- | --- |\n"
+        "| Básico | 1 | R$ 20 |\n\n"
+        "**Atenção:** nunca abra o forno.\n"
+    )
+
+
+def test_invalid_and_overlapping_instructions_are_ignored():
+    script = "```\nUL 2-3\nOL 3-4\nH 9 2\nH 1 x\nremova a linha 6\n```"
+    headings, blocks, _, ignored = parse_edit_script(script, 6)
+    assert headings == {}
+    assert blocks == [('UL', 2, 3, '')]
+    assert ignored == 4
+
+    markdown, _ = apply_edit_script(CONTENT, script)
+    assert _keeps_every_word(CONTENT, markdown)
+
+
+def test_numbered_lines_are_one_based_and_aligned():
+    numbered = number_lines("\n".join(f"linha {i}" for i in range(1, 11)))
+    assert numbered.split("\n")[0] == " 1| linha 1"
+    assert numbered.split("\n")[-1] == "10| linha 10"
+
+
+def test_prompt_examples_apply_cleanly():
+    examples = re.findall(r'DOCUMENTO:\n(.*?)\nSCRIPT:\n(.*?)\n\n', EDIT_SCRIPT_EXAMPLES, re.DOTALL)
+    assert len(examples) == 8
+    for document, script in examples:
+        content = "\n".join(re.sub(r'^\s*\d+\| ', '', line) for line in document.split("\n"))
+        markdown, ignored = apply_edit_script(content, script)
+        assert ignored == 0, script
+        assert _keeps_every_word(content, markdown)
@@ -0,0 +1,38 @@
+from src.document_index import DocumentIndex
+from src.heading_inference import infer_headings
+from src.local_formatter import LocalFormatter
+
+PROSE = "Um parágrafo curto de prosa com algumas palavras que explicam a seção em detalhe suficiente."
+
+
+def _book():
+    paragraphs = []
+    for part in range(1, 4):
+        paragraphs += [f"Parte {part}", PROSE]
+        for chapter in range(1, 3):
+            paragraphs += [f"Capítulo {chapter}", PROSE]
+            for section in range(1, 4):
+                paragraphs += [f"{chapter}.{section} Seção curta {section}", PROSE, PROSE]
+    return paragraphs
+
+
+def test_short_numbered_sections_are_headings():
+    inferred = infer_headings(_book())
+    assert [shape for shape, _, _, _ in inferred.families] == ['parte N', 'capítulo N', 'N.N']
+
+
+def test_items_alternating_with_short_lines_are_not_headings():
+    paragraphs = [PROSE * 3]
+    for item in range(1, 31):
+        paragraphs += [f"{item}. Primeiro passo", "Faça isso com cuidado antes de continuar."]
+    assert not infer_headings(paragraphs)
+
+
+def test_local_formatter_keeps_inferred_levels():
+    paragraphs = _book()
+    index = DocumentIndex("\n\n".join(paragraphs))
+    index.set_headings(infer_headings(index.paragraphs(), index.words).levels)
+    outline_levels = index.outline_levels()
+    result = LocalFormatter().format(index.paragraphs(), [outline_levels.get(level, 0) for level in index.levels])
+    headings = [block for block in result.blocks if block and block.startswith('#')]
+    assert headings[:4] == ['## Parte 1', '### Capítulo 1', '#### 1.1 Seção curta 1', '#### 1.2 Seção curta 2']
@@ -0,0 +1,36 @@
+from src.document_index import DocumentIndex
+
+from tests.helpers import bare_manager
+
+PARAGRAPHS = [
+    "Capítulo 1",
+    "Um parágrafo de prosa comum com várias palavras e ponto final.",
+    "Linha curta sem ponto",
+    "Capítulo 2",
+    "Outro parágrafo de prosa com bastante texto aqui.",
+    "Outra linha curta",
+]
+
+
+def test_hybrid_ai_half_keeps_the_document_headings(tmp_path):
+    manager = bare_manager(tmp_path, {'ai': {}, 'formatting': {'formatter': 'hybrid'}})
+    manager._normalize_markdown = lambda content, document_info: content
+    text = '\n\n'.join(PARAGRAPHS)
+    received = {}
+
+    def fake_ai(ai_text, document_info, headings_pattern=None, resume=False, incremental=False,
+                document_index=None):
+        received['text'], received['index'] = ai_text, document_index
+        return ai_text
+
+    manager._format_document_with_ai = fake_ai
+    manager._format_document(text, {'title': 'Livro'}, document_index=DocumentIndex(text))
+
+    index = received['index']
+    assert index is not None and len(index) == len(received['text'].split('\n\n'))
+    assert [index.heading_text(i) for i in range(len(index)) if index.is_heading(i)] == ['Capítulo 1', 'Capítulo 2']
+
+    spans = [(0, 2, ''), (2, 4, '')]
+    contexts = manager._chunk_context(index, spans)
+    assert contexts[0]['chunk_headings'] == [(2, 'Capítulo 1')]
+    assert contexts[1]['chunk_headings'] == [(2, 'Capítulo 2')]
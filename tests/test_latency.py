@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pytest
+
+from src.latency import LatencyTracker, StreamControl, StreamStalled
+
+from tests.helpers import bare_manager, final_message
+
+
+class FakeStream:
+    def __init__(self):
+        self.closed = threading.Event()
+
+    def close(self):
+        self.closed.set()
+
+
+def test_first_token_timer_starts_when_the_stream_opens():
+    control = StreamControl(first_token_timeout=0.2)
+    control.watch()
+    time.sleep(0.4)  # espera nos limitadores, antes de a resposta abrir
+    assert control.reason is None
+
+    stream = FakeStream()
+    control.attach(stream)
+    assert stream.closed.wait(1.0)
+    assert control.reason == 'stall'
+    with pytest.raises(StreamStalled):
+        control.raise_if_cancelled()
+    control.close()
+
+
+def test_activity_keeps_the_stream_alive():
+    control = StreamControl(first_token_timeout=0.2, stall_timeout=0.2)
+    stream = FakeStream()
+    control.attach(stream)
+    control.watch()
+    for _ in range(6):
+        time.sleep(0.1)
+        control.feed("texto ")
+    assert control.reason is None
+    assert stream.closed.wait(1.0)
+    control.close()
+
+
+def test_stream_that_stops_mid_response_is_stalled():
+    control = StreamControl(first_token_timeout=5, stall_timeout=0.2)
+    stream = FakeStream()
+    control.attach(stream)
+    control.watch()
+    control.feed("primeiro trecho ")
+    # Bem antes do prazo do primeiro trecho: vale o prazo entre trechos
+    assert stream.closed.wait(1.0)
+    assert control.reason == 'stall'
+    with pytest.raises(StreamStalled, match="0.2s"):
+        control.raise_if_cancelled()
+    control.close()
+
+
+def test_no_watcher_without_timeouts():
+    control = StreamControl()
+    stream = FakeStream()
+    control.attach(stream)
+    control.watch()
+    assert not stream.closed.wait(0.3)
+    assert control.reason is None
+    control.raise_if_cancelled()
+    control.close()
+
+
+def test_hedge_threshold_ignores_time_spent_in_the_limiter(tmp_path):
+    manager = bare_manager(tmp_path, {'ai': {'hedging': True, 'hedge_min_samples': 1,
+                                             'first_token_timeout': 0, 'stall_timeout': 0}, 'formatting': {}})
+    manager.latency = LatencyTracker()
+    expected = manager._token_estimator().estimate_output("x" * 300)
+    manager.latency.record(0.2, expected)  # limiar de ~0,2 s para esta requisição
+    attempts = []
+
+    def attempt(model, temperature, system_prompt, messages, max_tokens, expected_tokens, control, metrics=None,
+                cache_prompt=False):
+        attempts.append(control)
+        time.sleep(0.5)  # parada no limitador
+        control.attach(FakeStream())
+        time.sleep(0.1)
+        return "texto", final_message()
+
+    manager._stream_attempt = attempt
+    manager._output_token_budget = lambda model=None: 4096
+    content, _ = manager._stream_message('modelo', 0, 'sistema', [{'role': 'user', 'content': "x" * 300}])
+    assert content == "texto"
+    assert len(attempts) == 1
@@ -0,0 +1,24 @@
+from src.markdown_normalizer import MarkdownNormalizer, normalize_markdown
+
+
+def _headings(text):
+    return [line for line in text.splitlines() if line.startswith('#')]
+
+
+def test_skipped_level_is_fixed_for_every_sibling():
+    text, stats = normalize_markdown("# T\n\n## A\n\n#### a1\n\ntexto\n\n#### a2\n\ntexto\n\n## B\n\n#### b1\n")
+    assert _headings(text) == ['# T', '## A', '### a1', '### a2', '## B', '### b1']
+    assert stats['headings_fixed'] == 3
+
+
+def test_top_level_is_not_promoted_without_h1():
+    text, stats = normalize_markdown("## Cap 1\n\ntexto\n\n### Seção\n\n## Cap 2\n\ntexto\n")
+    assert _headings(text) == ['## Cap 1', '### Seção', '## Cap 2']
+    assert stats['headings_fixed'] == 0
+
+
+def test_levels_stay_consistent_across_fed_chunks():
+    normalizer = MarkdownNormalizer('T')
+    text = normalizer.feed("# T\n\n### Cap 1\n\ntexto\n\n") + normalizer.feed("### Cap 2\n\n#### 2.1\n") \
+        + normalizer.finish()
+    assert _headings(text) == ['# T', '## Cap 1', '## Cap 2', '### 2.1']
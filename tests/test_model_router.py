@@ -0,0 +1,40 @@
+from src.model_router import ModelRouter, chunk_complexity
+
+from tests.helpers import bare_manager
+
+PROSE = "\n\n".join("Um parágrafo de prosa corrida, sem nenhuma estrutura especial." for _ in range(20))
+CODE = "    def f(x):\n        return x == 1\n\n| a | b |\n| 1 | 2 |\n\n- item\n- item"
+
+
+def test_prose_is_simple_and_code_is_complex():
+    assert chunk_complexity(PROSE).score == 0
+    assert chunk_complexity(CODE).score > 0.5
+
+
+def _routed_manager(tmp_path):
+    manager = bare_manager(tmp_path)
+    manager.model_router = ModelRouter('principal', 'rapido')
+    return manager
+
+
+def test_retries_reuse_the_routing_decision(tmp_path):
+    manager = _routed_manager(tmp_path)
+    model = manager._route_model(CODE, words=10)
+    assert model == 'principal'
+    assert manager._route_model(CODE, words=10, previous_model=model) == 'principal'
+    summary = manager.model_router.summary()
+    assert (summary['premium_parts'], summary['premium_words'], summary['escalated']) == (1, 10, 0)
+
+
+def test_fast_model_retry_is_escalated_once(tmp_path):
+    manager = _routed_manager(tmp_path)
+    model = manager._route_model(PROSE, words=10)
+    assert model == 'rapido'
+    assert manager._route_model(PROSE, words=10, previous_model=model) == 'principal'
+    summary = manager.model_router.summary()
+    assert (summary['fast_parts'], summary['premium_parts'], summary['escalated']) == (1, 0, 1)
+
+
+def test_routing_is_opt_in(tmp_path):
+    manager = bare_manager(tmp_path, {'ai': {'routing': {'fast_model': 'rapido'}}, 'formatting': {}})
+    assert manager._create_model_router() is None
@@ -0,0 +1,43 @@
+from tests.helpers import bare_manager, final_message
+
+OPUS = 'claude-3-opus-20240229'
+HAIKU = 'claude-3-haiku-20240307'
+
+
+def _manager(tmp_path, protocol='markdown'):
+    return bare_manager(tmp_path, {'ai': {'model': OPUS}, 'formatting': {'protocol': protocol}})
+
+
+def test_chunk_prefix_reaches_the_cache_minimum(tmp_path):
+    for protocol, build in (('markdown', '_create_formatting_system_prompt'),
+                            ('edit_script', '_create_edit_script_system_prompt')):
+        manager = _manager(tmp_path, protocol)
+        system_prompt = getattr(manager, build)({'title': 'Livro'})
+        blocks = manager._system_blocks(system_prompt, OPUS, cache_prompt=True)
+        assert isinstance(blocks, list) and blocks[0]['cache_control'] == {'type': 'ephemeral'}
+
+
+def test_single_use_and_short_prefixes_are_not_marked(tmp_path):
+    manager = _manager(tmp_path)
+    system_prompt = manager._create_formatting_system_prompt({'title': 'Livro'})
+
+    assert manager._system_blocks(system_prompt, OPUS) == system_prompt
+    # Haiku exige 2048 tokens; o prefixo das partes não chega a isso
+    assert manager._system_blocks(system_prompt, HAIKU, cache_prompt=True) == system_prompt
+    manager.config['ai']['prompt_caching'] = False
+    assert manager._system_blocks(system_prompt, OPUS, cache_prompt=True) == system_prompt
+
+
+def test_only_split_documents_ask_for_prompt_caching(tmp_path):
+    manager = _manager(tmp_path)
+    flags = []
+
+    def stream(model, temperature, system_prompt, messages, metrics=None, cache_prompt=False):
+        flags.append(cache_prompt)
+        return "texto", final_message()
+
+    manager._stream_message = stream
+    manager._format_content_chunk("texto", {'title': 'Livro'})
+    context = {'part': 1, 'total_parts': 2, 'is_first': True, 'is_last': False}
+    manager._format_content_chunk("outro texto", {'title': 'Livro'}, context=context)
+    assert flags == [False, True]
@@ -0,0 +1,75 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src import rate_limiter
+from src.rate_limiter import RateLimiter
+
+
+class FakeClock:
+    """Relógio simulado: sleep() apenas avança o tempo"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, 'time', clock)
+    monkeypatch.setattr(rate_limiter.random, 'uniform', lambda low, high: low)
+    return clock
+
+
+def _headers(limit, remaining, bucket='requests'):
+    return {f"anthropic-ratelimit-{bucket}-limit": str(limit),
+            f"anthropic-ratelimit-{bucket}-remaining": str(remaining)}
+
+
+def _rate_limit_error(status, seconds):
+    response = SimpleNamespace(status_code=status, headers={'retry-after': str(seconds)})
+    return SimpleNamespace(status_code=status, response=response)
+
+
+def test_bucket_refills_at_the_per_minute_rate(tmp_path, clock):
+    limiter = RateLimiter(tmp_path / "limits.json")
+    limiter.update(_headers(60, 0))  # 60 por minuto: uma requisição por segundo
+
+    assert limiter.acquire() == pytest.approx(1.0)
+    assert limiter.acquire() == pytest.approx(1.0)
+
+    clock.sleep(30)
+    for _ in range(30):
+        assert limiter.acquire() == 0
+    assert limiter.acquire() == pytest.approx(1.0)
+
+
+def test_token_bucket_waits_for_the_estimated_input(tmp_path, clock):
+    limiter = RateLimiter(tmp_path / "limits.json")
+    limiter.update(_headers(6000, 1000, 'input-tokens'))  # repõe 100 tokens por segundo
+
+    assert limiter.acquire(input_tokens=500) == 0
+    assert limiter.acquire(input_tokens=1000) == pytest.approx(5.0)
+
+
+def test_retry_after_pauses_every_limiter_sharing_the_state(tmp_path, clock):
+    first = RateLimiter(tmp_path / "limits.json")
+    second = RateLimiter(tmp_path / "limits.json")
+
+    assert first.backoff(0, _rate_limit_error(429, 10)) == pytest.approx(10)
+    assert second.acquire() == pytest.approx(10)
+    assert first.acquire() == 0
+
+
+def test_retry_after_of_other_errors_does_not_block(tmp_path, clock):
+    first = RateLimiter(tmp_path / "limits.json")
+    second = RateLimiter(tmp_path / "limits.json")
+
+    assert first.backoff(0, _rate_limit_error(500, 10)) == pytest.approx(10)
+    assert second.acquire() == 0
@@ -0,0 +1,114 @@
+import pytest
+
+from src.chunk_planner import ChunkPlanner, TokenEstimator
+from src.document_index import DocumentIndex
+from src.run_journal import RunJournal
+
+from tests.helpers import bare_manager, final_message
+
+
+def _document():
+    paragraphs = []
+    for chapter in range(1, 11):
+        paragraphs.append(f"Capítulo {chapter}")
+        paragraphs.extend(f"Parágrafo {chapter}.{i} " + "palavra " * (20 + (i * 7) % 30) for i in range(30))
+    return DocumentIndex("\n\n".join(paragraphs))
+
+
+def test_resume_keeps_previous_boundaries_after_recalibration(tmp_path):
+    index = _document()
+    estimator = TokenEstimator('modelo')
+    planner = ChunkPlanner(estimator, 1200)
+    manager = bare_manager(tmp_path)
+    spans = manager._split_into_chunks(index, planner)
+    assert len(spans) > 5
+
+    journal = RunJournal(tmp_path / "journal.json", "hash", "modelo")
+    journal.start([text for _, _, text in spans])
+    journal.mark_done(0, tmp_path / "part_1.txt", "saída")
+
+    # A calibração muda depois da primeira resposta; uma nova divisão já seria diferente
+    estimator.observe(10000, 2000, source_tokens=1000, output_tokens=700)
+    assert manager._split_into_chunks(index, planner) != spans
+
+    previous = RunJournal.load(tmp_path / "journal.json")
+    assert manager._resume_chunks(index, previous) == spans
+    assert manager._align_chunks_with_previous(index, previous, planner) == spans
+
+
+def test_resume_rebuilds_the_pieces_of_an_oversized_paragraph(tmp_path):
+    long_paragraph = " ".join(f"Frase número {i} do parágrafo muito longo." for i in range(120))
+    index = DocumentIndex("Capítulo 1\n\nAbertura curta.\n\n" + long_paragraph + "\n\nFecho.")
+    estimator = TokenEstimator('modelo')
+    planner = ChunkPlanner(estimator, 300)
+    manager = bare_manager(tmp_path)
+    spans = manager._split_into_chunks(index, planner)
+    assert sum(1 for start, end, _ in spans if start == end) > 1
+
+    journal = RunJournal(tmp_path / "journal.json", "hash", "modelo")
+    journal.start([text for _, _, text in spans])
+    estimator.observe(10000, 2000, source_tokens=1000, output_tokens=700)
+
+    assert manager._resume_chunks(index, RunJournal.load(tmp_path / "journal.json")) == spans
+
+
+def test_resume_refuses_a_changed_document(tmp_path):
+    index = _document()
+    planner = ChunkPlanner(TokenEstimator('modelo'), 1200)
+    manager = bare_manager(tmp_path)
+    document_info = {'title': 'Livro', 'source': 'livro.docx'}
+    spans = manager._split_into_chunks(index, planner)
+    RunJournal(manager._journal_path(document_info), "hash", "modelo").start([text for _, _, text in spans])
+
+    edited = DocumentIndex(index.text.replace("Parágrafo 5.3 ", "Parágrafo 5.3 revisado "))
+    previous = RunJournal.load(manager._journal_path(document_info))
+    assert manager._resume_chunks(edited, previous) is None
+
+    manager._format_chunks = lambda *args, **kwargs: pytest.fail("nenhuma parte deveria ser enviada")
+    assert manager._process_large_document(edited, document_info, None, planner, resume=True) is None
+
+
+def test_incremental_uses_the_journal_of_a_renamed_version(tmp_path):
+    index = _document()
+    planner = ChunkPlanner(TokenEstimator('modelo'), 1200)
+    manager = bare_manager(tmp_path)
+    spans = manager._split_into_chunks(index, planner)
+    first = {'title': 'Meu Livro', 'source': 'livro.docx'}
+    RunJournal(manager._journal_path(first), "hash", "modelo").start([text for _, _, text in spans])
+    # Outro livro cujo título começa igual não conta como versão anterior
+    RunJournal(tmp_path / "meu_livro_2_0123abcd_journal.json", "outro", "modelo").start(["outro livro"])
+
+    revised = {'title': 'Meu Livro', 'source': 'livro_v2.docx'}
+    assert manager._load_previous_journal(revised) is None
+    previous = manager._load_previous_journal(revised, other_versions=True)
+    assert previous is not None and previous.document_hash == "hash"
+
+    edited = DocumentIndex(index.text.replace("Parágrafo 5.3 ", "Parágrafo 5.3 revisado "))
+    aligned = manager._align_chunks_with_previous(edited, previous, planner)
+    unchanged = [span for span in aligned if span in spans]
+    assert len(spans) - 2 <= len(unchanged) < len(spans)
+
+
+def test_estimator_learns_from_the_whole_continued_response(tmp_path):
+    manager = bare_manager(tmp_path)
+    content = "palavra " * 400
+    responses = [(content[:1000], final_message('max_tokens', output_tokens=300)),
+                 (content[1000:], final_message('end_turn', output_tokens=200))]
+    manager._stream_message = lambda *args, **kwargs: responses.pop(0)
+    observed = []
+    manager._token_estimator().observe = lambda *args, **kwargs: observed.append(kwargs)
+
+    formatted, _ = manager._format_content_chunk(content, {'title': 'Livro'})
+    assert formatted
+    assert [call['output_tokens'] for call in observed] == [500]
+
+
+def test_estimator_ignores_responses_still_truncated(tmp_path):
+    manager = bare_manager(tmp_path, {'ai': {'max_continuations': 1}, 'formatting': {}})
+    responses = [("a " * 10, final_message('max_tokens')), ("b " * 10, final_message('max_tokens'))]
+    manager._stream_message = lambda *args, **kwargs: responses.pop(0)
+    observed = []
+    manager._token_estimator().observe = lambda *args, **kwargs: observed.append(kwargs)
+
+    assert manager._format_content_chunk("texto " * 50, {'title': 'Livro'}) == (None, None)
+    assert observed == []
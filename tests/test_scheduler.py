@@ -0,0 +1,23 @@
+from src import simple_ebook_manager
+
+from tests.helpers import bare_manager
+
+
+def test_chunks_run_longest_first_without_pacing_sleeps(tmp_path, monkeypatch):
+    manager = bare_manager(tmp_path, {'ai': {'concurrency': 1}, 'formatting': {}})
+    info = {'title': 'Livro', 'author': '', 'language': 'pt-BR', 'date': '', 'source': str(tmp_path / 'livro.txt')}
+    chunks = ["curta", "a parte mais longa de todas", "média aqui"]
+    order = []
+
+    def fake_format(chunk, *args, **kwargs):
+        order.append(chunk)
+        return chunk.upper()
+
+    def no_sleep(seconds):
+        raise AssertionError(f"pausa de {seconds} s entre partes; o ritmo é do rate limiter")
+
+    monkeypatch.setattr(manager, '_format_and_verify_chunk', fake_format)
+    monkeypatch.setattr(simple_ebook_manager.time, 'sleep', no_sleep)
+
+    assert manager._format_chunks(chunks, info) == [chunk.upper() for chunk in chunks]
+    assert order == ["a parte mais longa de todas", "média aqui", "curta"]
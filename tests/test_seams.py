@@ -0,0 +1,36 @@
+from src.seams import SeamPlan, plain_words, split_markdown_blocks
+
+
+def _chunk(name, blocks):
+    return '\n\n'.join(f"{name} bloco {i}" for i in range(blocks))
+
+
+def test_code_blocks_with_blank_lines_stay_whole():
+    text = "Antes\n\n```python\nx = 1\n\ny = 2\n```\n\nDepois"
+    assert split_markdown_blocks(text) == ["Antes", "```python\nx = 1\n\ny = 2\n```", "Depois"]
+
+
+def test_plain_words_ignore_markdown():
+    assert plain_words("## Título com **negrito** e _itálico_") == ["Título", "com", "negrito", "e", "itálico"]
+
+
+def test_seam_windows_do_not_overlap_in_a_short_middle_chunk():
+    plan = SeamPlan([_chunk('A', 10), _chunk('B', 3), _chunk('C', 10)], window=3)
+    seams = plan.seams()
+    assert [index for index, _, _ in seams] == [0, 1]
+    assert seams[0][1] == "A bloco 7\n\nA bloco 8\n\nA bloco 9"
+    # A parte do meio divide seus blocos entre as duas fronteiras
+    assert seams[0][2] == "B bloco 0"
+    assert seams[1][1] == "B bloco 1\n\nB bloco 2"
+    assert seams[1][2] == "C bloco 0\n\nC bloco 1\n\nC bloco 2"
+
+
+def test_splice_replaces_only_the_fixed_seam():
+    chunks = [_chunk('A', 5), _chunk('B', 5), _chunk('C', 5)]
+    plan = SeamPlan(chunks, window=2)
+    assert plan.splice({}) == chunks
+
+    spliced = plan.splice({1: ("B bloco 3\n\nB bloco 4 corrigido", "## C bloco 0\n\nC bloco 1")})
+    assert spliced[0] == chunks[0]
+    assert spliced[1].endswith("B bloco 2\n\nB bloco 3\n\nB bloco 4 corrigido")
+    assert spliced[2].startswith("## C bloco 0\n\nC bloco 1\n\nC bloco 2")
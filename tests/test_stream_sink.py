@@ -0,0 +1,53 @@
+from types import SimpleNamespace
+
+from src import stream_sink
+from src.stream_sink import StreamSink, ThrottledProgress, WordCounter
+
+
+def test_sink_spills_to_disk_and_keeps_the_order():
+    deltas = [f"trecho {i} " for i in range(50)]
+    with StreamSink(spool_threshold=100) as sink:
+        for delta in deltas[:10]:
+            sink.write(delta)
+        assert sink._file is None
+        for delta in deltas[10:30]:
+            sink.write(delta)
+        assert sink._file is not None and sink._parts == []
+        assert sink.getvalue() == ''.join(deltas[:30])
+
+        # Continua gravando depois de uma leitura parcial
+        for delta in deltas[30:]:
+            sink.write(delta)
+        assert sink.getvalue() == ''.join(deltas)
+        assert sink.size == len(''.join(deltas))
+    assert sink._file is None
+
+
+def test_sink_feeds_and_closes_the_consumers():
+    counter = WordCounter()
+    closed = []
+    counter.close = lambda: closed.append(True)
+    with StreamSink([counter]) as sink:
+        sink.write("uma resposta ")
+        sink.write("curta")
+    assert sink.getvalue() == "uma resposta curta"
+    assert counter.count == 3
+    assert closed == [True]
+
+
+def test_word_split_across_two_deltas_counts_once():
+    counter = WordCounter()
+    for delta in ["forma", "tação do", " livro", "", "\n\n## Capí", "tulo 1"]:
+        counter.feed(delta)
+    assert counter.count == len("formatação do livro ## Capítulo 1".split())
+
+
+def test_progress_renders_at_most_once_per_interval(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(stream_sink, 'time', SimpleNamespace(monotonic=lambda: now[0]))
+    rendered = []
+    progress = ThrottledProgress(interval=1.0, render=rendered.append)
+    for _ in range(10):
+        now[0] += 0.25
+        progress.feed("abc")
+    assert rendered == [12, 24]
@@ -0,0 +1,31 @@
+from src.streaming import detect_encoding, file_size_mb, iter_text_paragraphs
+
+
+def test_paragraphs_are_split_on_blank_lines(tmp_path):
+    path = tmp_path / "livro.txt"
+    path.write_bytes("Capítulo 1\r\n\r\nPrimeira linha\r\nsegunda linha\r\n   \r\n\r\nFim\r\n".encode('utf-8'))
+    assert list(iter_text_paragraphs(path)) == ["Capítulo 1", "Primeira linha\nsegunda linha", "Fim"]
+
+
+def test_long_paragraph_is_delivered_in_line_pieces(tmp_path):
+    path = tmp_path / "sem_linhas_em_branco.txt"
+    lines = [f"linha {i:03d}" for i in range(100)]
+    path.write_text("\n".join(lines), encoding='utf-8')
+    pieces = list(iter_text_paragraphs(path, max_chars=100))
+    assert len(pieces) > 1
+    assert all(len(piece) < 100 + len(lines[0]) for piece in pieces)
+    assert "\n".join(pieces) == "\n".join(lines)
+
+
+def test_encoding_falls_back_when_a_later_block_is_not_utf8(tmp_path):
+    path = tmp_path / "misto.txt"
+    path.write_bytes("ação ".encode('utf-8') * 100 + "ação".encode('latin-1'))
+    assert detect_encoding(path, block_size=64) == 'latin-1'
+
+    # Caracteres de vários bytes divididos entre dois blocos continuam sendo UTF-8
+    path.write_bytes("ação ".encode('utf-8') * 100)
+    assert detect_encoding(path, block_size=3) == 'utf-8'
+
+
+def test_size_of_a_missing_file_is_zero(tmp_path):
+    assert file_size_mb(tmp_path / "inexistente.txt") == 0.0
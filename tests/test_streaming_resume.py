@@ -0,0 +1,38 @@
+from tests.helpers import bare_manager, final_message
+
+PARAGRAPHS = [f"Parágrafo {i} com algumas palavras de texto corrido para ocupar espaço na parte."
+              for i in range(60)]
+
+
+def _manager(tmp_path):
+    manager = bare_manager(tmp_path, {'ai': {'model': 'claude-3-opus-20240229', 'max_tokens': 200,
+                                             'concurrency': 2},
+                                      'formatting': {}})
+    manager._markdown_filepath = lambda document_info: tmp_path / "livro_formatted.md"
+    requests = []
+
+    def stream(model, temperature, system_prompt, messages, metrics=None, cache_prompt=False):
+        content = messages[0]['content']
+        requests.append(content)
+        body = content.split("CONTEÚDO:\n", 1)[1].split("\nPOSIÇÃO DESTA PARTE:", 1)[0].strip()
+        # Uso real bem diferente da estimativa: a calibração muda a cada resposta
+        return body, final_message(input_tokens=len(content) // 8, output_tokens=len(body) // 2)
+
+    manager._stream_message = stream
+    return manager, requests
+
+
+def test_second_streaming_run_is_served_from_the_cache(tmp_path):
+    info = {'title': 'Livro', 'author': '', 'language': 'pt-BR', 'date': '', 'source': str(tmp_path / 'livro.txt')}
+    manager, first_requests = _manager(tmp_path)
+    assert manager._format_streaming(iter(PARAGRAPHS), info)
+    first_output = (tmp_path / "livro_formatted.md").read_text(encoding='utf-8')
+    assert len(first_requests) > 3
+    assert manager._token_estimator().chars_per_token != 3.3
+
+    # Nova execução (novo processo): a calibração salva já é outra
+    manager, second_requests = _manager(tmp_path)
+    assert manager._format_streaming(iter(PARAGRAPHS), info)
+    assert second_requests == []
+    assert manager.cache.stats()['hits'] == len(first_requests)
+    assert (tmp_path / "livro_formatted.md").read_text(encoding='utf-8') == first_output
@@ -0,0 +1,22 @@
+import json
+import os
+
+from src import toolchain as toolchain_module
+from src.toolchain import Toolchain
+
+
+def test_cache_is_written_through_a_process_unique_temp_file(tmp_path, monkeypatch):
+    cache_path = tmp_path / "toolchain.json"
+    replaced = []
+    real_replace = os.replace
+
+    def recording_replace(src, dst):
+        replaced.append(os.path.basename(src))
+        real_replace(src, dst)
+
+    monkeypatch.setattr(toolchain_module.os, 'replace', recording_replace)
+    assert Toolchain(cache_path).pandoc_version(lambda: '3.1') == '3.1'
+
+    assert replaced and all(f".{os.getpid()}." in name for name in replaced)
+    assert json.loads(cache_path.read_text(encoding='utf-8'))['pandoc']
+    assert [path.name for path in tmp_path.iterdir()] == ["toolchain.json"]
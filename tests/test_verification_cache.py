@@ -0,0 +1,27 @@
+from tests.helpers import bare_manager, final_message
+
+SOURCE = " ".join(f"palavra{i}" for i in range(100))
+
+
+def _manager(tmp_path, responses):
+    manager = bare_manager(tmp_path, {'ai': {}, 'formatting': {'word_count_tolerance': 5,
+                                                               'max_verification_retries': 1}})
+    manager._stream_message = lambda *args, **kwargs: (responses.pop(0), final_message())
+    return manager
+
+
+def test_rejected_response_is_not_cached(tmp_path):
+    manager = _manager(tmp_path, [" ".join(SOURCE.split()[:50]), SOURCE])
+    assert manager._format_and_verify_chunk(SOURCE, {'title': 'Livro'}) == SOURCE
+    assert manager.cache.writes == 1
+
+    # Uma nova execução usa a resposta aceita, sem nova requisição
+    rerun = _manager(tmp_path, [])
+    assert rerun._format_and_verify_chunk(SOURCE, {'title': 'Livro'}) == SOURCE
+
+
+def test_best_response_is_cached_when_none_is_accepted(tmp_path):
+    worse, better = " ".join(SOURCE.split()[:40]), " ".join(SOURCE.split()[:80])
+    manager = _manager(tmp_path, [worse, better])
+    assert manager._format_and_verify_chunk(SOURCE, {'title': 'Livro'}) == better
+    assert manager.cache.writes == 1